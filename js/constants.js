@@ -91,6 +91,9 @@ const COLLISION_CELL_WIDTH = FIELD_WIDTH / COLLISION_GRID_COLS;   // 40
 const COLLISION_CELL_HEIGHT = FIELD_HEIGHT / COLLISION_GRID_ROWS; // ~41
 const CELL_WALKABLE = 0;
 const CELL_WALL = 1;
+// (dr, dc) per 2-bit next-hop code: up, down, left, right (tools/collision_nexthop.py)
+const NEXT_HOP_STEPS = [[-1, 0], [1, 0], [0, -1], [0, 1]];
+const ENEMY_PATH_LOOKAHEAD = 2; // Cells ahead on the next-hop path that chasing enemies steer toward
 
 // Area layout templates
 const AREA_LAYOUTS = {
@@ -106,3 +109,8 @@ const AREA_LAYOUTS = {
 // Animation frame counts and speeds
 const ANIM_FRAMES = { idle: 3, walk: 4, fire: 2, hit: 1, death: 3 };
 const ANIM_FPS = { idle: 4, walk: 8, fire: 12, hit: 10, death: 6 };
+
+// Pre-rendered effect atlas (tools/render_effect_sheets.py)
+const FX_ATLAS_KEY = 'fx_atlas';
+const FX_POOL_SIZE = 64;            // max baked effect sprites alive at once
+const FX_EXPLOSION_BASE_RADIUS = 60; // radius the explosion frames were rendered at
@@ -188,6 +188,10 @@ class Enemy extends Phaser.Physics.Arcade.Sprite {
         if (this.animState !== 'hit' && this.animState !== 'death') this.playEnemyAnim('idle');
         this.fireTimer -= delta;
         if (this.fireTimer <= 0) {
+            // Hold the shot (ready to fire) while a wall is in the way; precomputed
+            // visibility table, so no raycast. Unknown visibility fires as before.
+            const cm = this.scene.collisionMapManager;
+            if (cm && cm.hasLineOfSight(this.x, this.y, player.x, player.y) === false) return;
             this.shootAt(player, bulletPool);
             this.fireTimer = 1000 / this.fireRate;
         }
@@ -228,7 +232,12 @@ class Enemy extends Phaser.Physics.Arcade.Sprite {
     }
 
     moveToward(target, speed) {
-        const angle = Phaser.Math.Angle.Between(this.x, this.y, target.x, target.y);
+        // Follow the shortest path around walls (precomputed next-hop table,
+        // a couple of cells ahead for smoother turns); straight line without one
+        const cm = this.scene.collisionMapManager;
+        const pathStep = cm ? cm.getPathStep(this.x, this.y, target.x, target.y, ENEMY_PATH_LOOKAHEAD) : null;
+        const aim = pathStep || target;
+        const angle = Phaser.Math.Angle.Between(this.x, this.y, aim.x, aim.y);
 
         // Check if we're stuck (body blocked by wall)
         const body = this.body;
@@ -240,18 +249,26 @@ class Enemy extends Phaser.Physics.Arcade.Sprite {
             if (body.blocked.left || body.blocked.right) {
                 // Blocked horizontally → move vertically only
                 slideX = 0;
-                slideY = (target.y > this.y ? 1 : -1) * speed;
+                slideY = (aim.y > this.y ? 1 : -1) * speed;
             }
             if (body.blocked.up || body.blocked.down) {
                 // Blocked vertically → move horizontally only
                 slideY = 0;
-                slideX = (target.x > this.x ? 1 : -1) * speed;
+                slideX = (aim.x > this.x ? 1 : -1) * speed;
             }
-            // If blocked on both axes, try a jitter to escape
+            // If blocked on both axes, follow the precomputed nav field out of the
+            // corner (toward the open spawn area); jitter if no field is loaded
             if ((body.blocked.left || body.blocked.right) && (body.blocked.up || body.blocked.down)) {
-                const jitter = (Math.random() - 0.5) * 2;
-                slideX = jitter * speed;
-                slideY = jitter * speed;
+                const step = cm ? cm.getNavStep(this.x, this.y) : null;
+                if (step) {
+                    const stepAngle = Phaser.Math.Angle.Between(this.x, this.y, step.x, step.y);
+                    slideX = Math.cos(stepAngle) * speed;
+                    slideY = Math.sin(stepAngle) * speed;
+                } else {
+                    const jitter = (Math.random() - 0.5) * 2;
+                    slideX = jitter * speed;
+                    slideY = jitter * speed;
+                }
             }
 
             this.setVelocity(slideX, slideY);
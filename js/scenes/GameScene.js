@@ -69,6 +69,15 @@ class GameScene extends Phaser.Scene {
         this.collisionMapManager = new CollisionMapManager(this);
         const collisionKey = `collision_${this.stageId}`;
         this.collisionData = this.cache.json.get(collisionKey) || null;
+        // All-pairs next-hop tables for chase pathing (tools/collision_nexthop.py)
+        this.nextHopData = this.cache.binary.get(`nexthop_${this.stageId}`) || null;
+        // Cell-to-cell line of sight for stationary shooters (tools/collision_visibility.py)
+        this.visibilityData = this.cache.binary.get(`visibility_${this.stageId}`) || null;
+        // Precomputed spawn points and obstacle layouts per area (tools/stage_placement.py)
+        const placement = this.cache.json.get('stage_placement');
+        this.stagePlacement = (placement && placement.stages && placement.stages[this.stageId]) || null;
+        this.areaSpawns = null;
+        this.spawnCursor = {};
 
         // Wave manager
         this.waveManager = new WaveManager(this);
@@ -160,13 +169,18 @@ class GameScene extends Phaser.Scene {
         }
 
         // Try collision map, fall back to procedural obstacles
-        if (this.collisionData && this.collisionMapManager.loadGrid(this.collisionData, areaIndex)) {
+        const hasGrid = !!this.collisionData &&
+            this.collisionMapManager.loadGrid(this.collisionData, areaIndex, this.nextHopData, this.visibilityData);
+        const placement = this.getAreaPlacement(areaIndex, area, hasGrid);
+        if (hasGrid) {
             this.collisionMapManager.createColliders();
             this.setupCollisionMapCollisions();
         } else {
-            this.obstacleManager.generateForArea(area.layout);
+            this.obstacleManager.generateForArea(area.layout, placement ? placement.obstacles : null);
             this.setupObstacleCollisions();
         }
+        this.areaSpawns = placement ? placement.spawns : null;
+        this.spawnCursor = { top: 0, right: 0, bottom: 0, left: 0 };
 
         // Reset player positions to center
         this.players.forEach((p, i) => {
@@ -199,6 +213,36 @@ class GameScene extends Phaser.Scene {
         });
     }
 
+    /**
+     * Precomputed placement for this area, or null if there is none or it was
+     * computed for a different layout or collision map (stale file). Without a
+     * grid, an area that has one in the file uses its no-grid fallback entry.
+     */
+    getAreaPlacement(areaIndex, area, hasGrid) {
+        const entry = this.stagePlacement && this.stagePlacement[areaIndex];
+        if (!entry || entry.layout !== area.layout) return null;
+        const nav = hasGrid ? this.collisionData.areas[areaIndex].nav : null;
+        const navKey = nav && nav.nextHop !== undefined ? nav.nextHop : null;
+        if (entry.navKey === navKey) return entry;
+        return !hasGrid && entry.fallback ? entry.fallback : null;
+    }
+
+    /**
+     * Next precomputed spawn point on an edge (cycling through its shuffled
+     * list), trying the other edges if it has none. Returns [x, y] or null.
+     */
+    nextPlannedSpawn(preferredEdge) {
+        if (!this.areaSpawns) return null;
+        const edges = [preferredEdge, ...['top', 'right', 'bottom', 'left'].filter(e => e !== preferredEdge)];
+        for (const edge of edges) {
+            const points = this.areaSpawns[edge];
+            if (points && points.length > 0) {
+                return points[this.spawnCursor[edge]++ % points.length];
+            }
+        }
+        return null;
+    }
+
     showAreaName(name, areaIndex) {
         // Clean up previous splash
         this.areaSplashObjects.forEach(obj => { if (obj && obj.destroy) obj.destroy(); });
@@ -813,7 +857,10 @@ class GameScene extends Phaser.Scene {
                     const side = Math.floor(Math.random() * 4);
                     const edgeName = edges[side];
 
-                    if (hasCollisionMap) {
+                    const planned = this.nextPlannedSpawn(edgeName);
+                    if (planned) {
+                        [x, y] = planned;
+                    } else if (hasCollisionMap) {
                         // Collision map active: always use connected spawn points
                         const cmSpawn = this.collisionMapManager.getWalkableSpawnPoint(edgeName);
                         x = cmSpawn.x;
@@ -32,11 +32,14 @@ class PreloadScene extends Phaser.Scene {
         this.load.json('scenario_gallery', 'assets/data/scenario_gallery.json');
         this.load.json('drop_tables', 'assets/data/drop_tables.json');
         this.load.json('weapon_parts', 'assets/data/weapon_parts.json');
+        this.load.json('stage_placement', 'assets/data/stage_placement.json');
 
         // Load collision maps for each stage
         for (let s = 1; s <= 12; s++) {
             const stageId = `stage_1_${s}`;
             this.load.json(`collision_${stageId}`, `assets/data/collision_maps/collision_${stageId}.json`);
+            this.load.binary(`nexthop_${stageId}`, `assets/data/collision_maps/nexthop_${stageId}.bin`);
+            this.load.binary(`visibility_${stageId}`, `assets/data/collision_maps/visibility_${stageId}.bin`);
         }
 
         // Load area-specific backgrounds and stage thumbnails
@@ -90,6 +93,9 @@ class PreloadScene extends Phaser.Scene {
             this.load.image(id, `assets/images/game/ui/skills/${id}.png`);
         });
 
+        // Pre-rendered effect frames (optional - EffectSystem falls back to live particles)
+        this.load.atlas(FX_ATLAS_KEY, 'assets/images/game/effects/fx_atlas.png', 'assets/images/game/effects/fx_atlas.json');
+
         // Key visual & title logo (optional - fallback if missing)
         this.load.image('key_visual', 'assets/images/key_visual.png');
         this.load.image('title_logo', 'assets/images/title_logo.png');
@@ -191,6 +197,26 @@ class PreloadScene extends Phaser.Scene {
             this.anims.create({ key: `${k}_hit`, frames: this.anims.generateFrameNumbers(k, { start: 5, end: 5 }), frameRate: ANIM_FPS.hit, repeat: 0 });
             this.anims.create({ key: `${k}_death`, frames: this.anims.generateFrameNumbers(k, { start: 6, end: 7 }), frameRate: ANIM_FPS.death, repeat: 0 });
         });
+
+        // Baked effect animations: frames are named "<animKey>/<index>" in the atlas
+        if (this.textures.exists(FX_ATLAS_KEY)) {
+            const tex = this.textures.get(FX_ATLAS_KEY);
+            const meta = (tex.customData && tex.customData.meta) || {};
+            const groups = {};
+            tex.getFrameNames().forEach(name => {
+                const [animKey] = name.split('/');
+                (groups[animKey] = groups[animKey] || []).push(name);
+            });
+            Object.entries(groups).forEach(([animKey, names]) => {
+                names.sort();
+                this.anims.create({
+                    key: animKey,
+                    frames: names.map(frame => ({ key: FX_ATLAS_KEY, frame })),
+                    frameRate: meta.frameRate || 30,
+                    repeat: 0
+                });
+            });
+        }
     }
 
     generatePlaceholderTextures() {
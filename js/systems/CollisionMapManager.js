@@ -5,21 +5,155 @@ class CollisionMapManager {
         this.staticGroup = null;
         this.wallBodies = [];
         this.debugGraphics = null;
-        this.connectedCells = null; // Set of "r,c" strings connected to center
+        this.connectedMask = null; // Uint8Array (row-major), 1 = walkable and connected to center
+        this.navFields = null;     // { distSpawn, distEdges: { top, bottom, left, right } }
+        this.wallRects = null;     // [{ row, col, w, h }] precomputed by tools/collision_rects.py
+        this.cellIndex = null;     // Int16Array: cell -> connected cell number (-1 if not connected)
+        this.cellCoords = null;    // Uint8Array [r0, c0, r1, c1, ...] per connected cell number
+        this.nextHop = null;       // { rowBytes, table: Uint8Array } (tools/collision_nexthop.py)
+        this.visibility = null;    // { rowBytes, table: Uint8Array } bitsets (tools/collision_visibility.py)
     }
 
-    loadGrid(collisionData, areaIndex) {
+    loadGrid(collisionData, areaIndex, nextHopBuffer, visibilityBuffer) {
         if (!collisionData || !collisionData.areas) return false;
         const areaData = collisionData.areas[areaIndex];
-        if (!areaData || !areaData.grid) return false;
-        this.grid = areaData.grid;
+        if (!areaData) return false;
+        // Only maps with nav carry distance fields; legacy areas must not see the previous area's
+        this.navFields = null;
+        if (areaData.rows) {
+            this.grid = this._decodeRows(areaData.rows);
+        } else if (areaData.grid) {
+            this.grid = areaData.grid; // legacy v1 nested-list format
+        } else {
+            return false;
+        }
 
-        // Fix isolated walkable cells: convert to walls
-        this._fixIsolatedCells();
+        if (areaData.nav) {
+            // Connectivity and distance fields precomputed by tools/collision_nav.py
+            this._applyNav(areaData.nav);
+        } else {
+            // Legacy maps: fix isolated walkable cells at load time
+            this._fixIsolatedCells();
+        }
+
+        // Precomputed rects are only valid for the grid the tool saw (post nav fix)
+        this.wallRects = (areaData.wallRects && areaData.nav)
+            ? areaData.wallRects.map(([row, col, w, h]) => ({ row, col, w, h }))
+            : null;
+
+        // Per-cell tables over the connected cells (tools/collision_nexthop.py,
+        // tools/collision_visibility.py); unused if a sidecar is stale
+        this.cellIndex = null;
+        this.cellCoords = null;
+        this.nextHop = null;
+        this.visibility = null;
+        if (areaData.nav) {
+            const nextHop = this._findSidecarTable(nextHopBuffer, 'SGNH', areaIndex, areaData.nav.nextHop);
+            if (nextHop) this.nextHop = { rowBytes: Math.ceil(nextHop.cells / 4), table: nextHop.table };
+            const visibility = this._findSidecarTable(visibilityBuffer, 'SGVS', areaIndex, areaData.nav.visibility);
+            if (visibility) this.visibility = { rowBytes: Math.ceil(visibility.cells / 8), table: visibility.table };
+        }
 
         return true;
     }
 
+    /**
+     * Number the connected cells row-major (the numbering the sidecar tables
+     * use). Built on first use per area.
+     */
+    _buildCellIndex() {
+        const cellCount = COLLISION_GRID_ROWS * COLLISION_GRID_COLS;
+        this.cellIndex = new Int16Array(cellCount).fill(-1);
+        const coords = [];
+        for (let i = 0; i < cellCount; i++) {
+            if (!this.connectedMask[i]) continue;
+            this.cellIndex[i] = coords.length / 2;
+            coords.push(Math.floor(i / COLLISION_GRID_COLS), i % COLLISION_GRID_COLS);
+        }
+        this.cellCoords = Uint8Array.from(coords);
+    }
+
+    /**
+     * Find this area's table in a sidecar (4-char magic, u8 version 1, u8 area
+     * count, then 16-byte directory entries). Returns { cells, table } or null
+     * if missing, or if the key or cell count does not match the loaded nav
+     * data (stale sidecar).
+     */
+    _findSidecarTable(buffer, magic, areaIndex, key) {
+        if (!buffer || key === undefined) return null;
+        const view = new DataView(buffer);
+        if (view.byteLength < 8 || String.fromCharCode(
+            view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3)) !== magic
+            || view.getUint8(4) !== 1) return null;
+
+        if (!this.cellIndex) this._buildCellIndex();
+        const count = view.getUint8(5);
+        for (let i = 0; i < count; i++) {
+            const base = 8 + i * 16;
+            if (view.getUint8(base) !== areaIndex) continue;
+            const cells = view.getUint16(base + 2, true);
+            if (view.getUint32(base + 4, true) !== key || cells !== this.cellCoords.length / 2) return null;
+            const offset = view.getUint32(base + 8, true);
+            const length = view.getUint32(base + 12, true);
+            return { cells, table: new Uint8Array(buffer, offset, length) };
+        }
+        return null;
+    }
+
+    _applyNav(nav) {
+        const connectedRows = this._decodeRows(nav.connected);
+        this.connectedMask = new Uint8Array(COLLISION_GRID_ROWS * COLLISION_GRID_COLS);
+        for (let r = 0; r < COLLISION_GRID_ROWS; r++) {
+            for (let c = 0; c < COLLISION_GRID_COLS; c++) {
+                if (connectedRows[r][c]) {
+                    this.connectedMask[r * COLLISION_GRID_COLS + c] = 1;
+                } else {
+                    this.grid[r][c] = CELL_WALL;
+                }
+            }
+        }
+        const distEdges = {};
+        Object.entries(nav.distEdges || {}).forEach(([edge, text]) => {
+            distEdges[edge] = this._decodeField(text, nav.dtype);
+        });
+        this.navFields = { distSpawn: this._decodeField(nav.distSpawn, nav.dtype), distEdges };
+    }
+
+    /**
+     * Decode a base64 little-endian u8/u16 distance field. Unreachable cells hold
+     * the type's max value (0xff / 0xffff).
+     */
+    _decodeField(text, dtype) {
+        const bin = atob(text);
+        const bytes = new Uint8Array(bin.length);
+        for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+        if (dtype === 'u16') {
+            const view = new DataView(bytes.buffer);
+            const out = new Uint16Array(bytes.length / 2);
+            for (let i = 0; i < out.length; i++) out[i] = view.getUint16(i * 2, true);
+            return out;
+        }
+        return bytes;
+    }
+
+    _isConnected(r, c) {
+        return this.connectedMask !== null && this.connectedMask[r * COLLISION_GRID_COLS + c] === 1;
+    }
+
+    /**
+     * Decode compact (v2) rows: one hex string per row, character k holds
+     * columns 4k..4k+3 with bit j = column 4k+j (see tools/collision_format.py).
+     */
+    _decodeRows(rows) {
+        return rows.map(text => {
+            const row = new Array(COLLISION_GRID_COLS);
+            for (let c = 0; c < COLLISION_GRID_COLS; c++) {
+                row[c] = (parseInt(text[c >> 2], 16) >> (c & 3)) & 1;
+            }
+            return row;
+        });
+    }
+
     /**
      * BFS flood-fill from center to find all connected walkable cells.
      * Any walkable cell NOT connected to center is converted to wall.
@@ -49,23 +183,24 @@ class CollisionMapManager {
         }
 
         // BFS flood fill from center
-        this.connectedCells = new Set();
-        const queue = [[startR, startC]];
-        const visited = new Set();
-        visited.add(`${startR},${startC}`);
-
-        while (queue.length > 0) {
-            const [r, c] = queue.shift();
+        const cols = COLLISION_GRID_COLS;
+        this.connectedMask = new Uint8Array(COLLISION_GRID_ROWS * cols);
+        const queue = [startR * cols + startC];
+        const visited = new Uint8Array(COLLISION_GRID_ROWS * cols);
+        visited[queue[0]] = 1;
+
+        for (let head = 0; head < queue.length; head++) {
+            const r = Math.floor(queue[head] / cols), c = queue[head] % cols;
             if (this.grid[r][c] === CELL_WALKABLE) {
-                this.connectedCells.add(`${r},${c}`);
+                this.connectedMask[queue[head]] = 1;
             }
             for (const [dr, dc] of [[-1,0],[1,0],[0,-1],[0,1]]) {
                 const nr = r + dr, nc = c + dc;
-                const key = `${nr},${nc}`;
-                if (nr >= 0 && nr < COLLISION_GRID_ROWS && nc >= 0 && nc < COLLISION_GRID_COLS
-                    && !visited.has(key) && this.grid[nr][nc] === CELL_WALKABLE) {
-                    visited.add(key);
-                    queue.push([nr, nc]);
+                const idx = nr * cols + nc;
+                if (nr >= 0 && nr < COLLISION_GRID_ROWS && nc >= 0 && nc < cols
+                    && !visited[idx] && this.grid[nr][nc] === CELL_WALKABLE) {
+                    visited[idx] = 1;
+                    queue.push(idx);
                 }
             }
         }
@@ -74,7 +209,7 @@ class CollisionMapManager {
         let fixedCount = 0;
         for (let r = 0; r < COLLISION_GRID_ROWS; r++) {
             for (let c = 0; c < COLLISION_GRID_COLS; c++) {
-                if (this.grid[r][c] === CELL_WALKABLE && !this.connectedCells.has(`${r},${c}`)) {
+                if (this.grid[r][c] === CELL_WALKABLE && !this._isConnected(r, c)) {
                     this.grid[r][c] = CELL_WALL;
                     fixedCount++;
                 }
@@ -96,7 +231,7 @@ class CollisionMapManager {
         if (!this.grid) return;
 
         this.staticGroup = this.scene.physics.add.staticGroup();
-        const merged = this.mergeWallRects(this.grid);
+        const merged = this.wallRects || this.mergeWallRects(this.grid);
 
         merged.forEach(rect => {
             const x = rect.col * COLLISION_CELL_WIDTH + (rect.w * COLLISION_CELL_WIDTH) / 2;
@@ -200,28 +335,28 @@ class CollisionMapManager {
         switch (edge) {
             case 'top':
                 for (let c = 0; c < COLLISION_GRID_COLS; c++) {
-                    if (this.grid[0][c] === CELL_WALKABLE && this.connectedCells.has(`0,${c}`)) {
+                    if (this.grid[0][c] === CELL_WALKABLE && this._isConnected(0, c)) {
                         cells.push({ r: 0, c });
                     }
                 }
                 break;
             case 'bottom':
                 for (let c = 0; c < COLLISION_GRID_COLS; c++) {
-                    if (this.grid[COLLISION_GRID_ROWS - 1][c] === CELL_WALKABLE && this.connectedCells.has(`${COLLISION_GRID_ROWS - 1},${c}`)) {
+                    if (this.grid[COLLISION_GRID_ROWS - 1][c] === CELL_WALKABLE && this._isConnected(COLLISION_GRID_ROWS - 1, c)) {
                         cells.push({ r: COLLISION_GRID_ROWS - 1, c });
                     }
                 }
                 break;
             case 'left':
                 for (let r = 0; r < COLLISION_GRID_ROWS; r++) {
-                    if (this.grid[r][0] === CELL_WALKABLE && this.connectedCells.has(`${r},0`)) {
+                    if (this.grid[r][0] === CELL_WALKABLE && this._isConnected(r, 0)) {
                         cells.push({ r, c: 0 });
                     }
                 }
                 break;
             case 'right':
                 for (let r = 0; r < COLLISION_GRID_ROWS; r++) {
-                    if (this.grid[r][COLLISION_GRID_COLS - 1] === CELL_WALKABLE && this.connectedCells.has(`${r},${COLLISION_GRID_COLS - 1}`)) {
+                    if (this.grid[r][COLLISION_GRID_COLS - 1] === CELL_WALKABLE && this._isConnected(r, COLLISION_GRID_COLS - 1)) {
                         cells.push({ r, c: COLLISION_GRID_COLS - 1 });
                     }
                 }
@@ -234,20 +369,21 @@ class CollisionMapManager {
      * Find nearest walkable position connected to center, from given world coords.
      */
     getNearestWalkablePosition(worldX, worldY) {
-        if (!this.grid || !this.connectedCells) return { x: worldX, y: worldY };
+        if (!this.grid || !this.connectedMask) return { x: worldX, y: worldY };
 
         const col = Math.max(0, Math.min(COLLISION_GRID_COLS - 1, Math.floor(worldX / COLLISION_CELL_WIDTH)));
         const row = Math.max(0, Math.min(COLLISION_GRID_ROWS - 1, Math.floor(worldY / COLLISION_CELL_HEIGHT)));
 
-        if (this.connectedCells.has(`${row},${col}`)) {
+        if (this._isConnected(row, col)) {
             return { x: worldX, y: worldY }; // Already in good position
         }
 
         // BFS outward to find nearest connected cell
         let bestDist = Infinity;
         let bestR = row, bestC = col;
-        for (const key of this.connectedCells) {
-            const [r, c] = key.split(',').map(Number);
+        for (let i = 0; i < this.connectedMask.length; i++) {
+            if (!this.connectedMask[i]) continue;
+            const r = Math.floor(i / COLLISION_GRID_COLS), c = i % COLLISION_GRID_COLS;
             const dist = Math.abs(r - row) + Math.abs(c - col);
             if (dist < bestDist) {
                 bestDist = dist;
@@ -262,6 +398,82 @@ class CollisionMapManager {
         };
     }
 
+    /**
+     * Next cell center one BFS step closer to the player spawn (or to an edge if
+     * edge is given), using the precomputed distance fields. Null if unavailable.
+     */
+    getNavStep(worldX, worldY, edge) {
+        if (!this.navFields) return null;
+        const field = edge ? this.navFields.distEdges[edge] : this.navFields.distSpawn;
+        if (!field) return null;
+        const unreachable = field instanceof Uint16Array ? 0xffff : 0xff;
+        const col = Math.floor(worldX / COLLISION_CELL_WIDTH);
+        const row = Math.floor(worldY / COLLISION_CELL_HEIGHT);
+        if (row < 0 || row >= COLLISION_GRID_ROWS || col < 0 || col >= COLLISION_GRID_COLS) return null;
+
+        let best = field[row * COLLISION_GRID_COLS + col];
+        let bestR = -1, bestC = -1;
+        for (const [dr, dc] of [[-1,0],[1,0],[0,-1],[0,1]]) {
+            const r = row + dr, c = col + dc;
+            if (r < 0 || r >= COLLISION_GRID_ROWS || c < 0 || c >= COLLISION_GRID_COLS) continue;
+            const d = field[r * COLLISION_GRID_COLS + c];
+            if (d !== unreachable && d < best) {
+                best = d; bestR = r; bestC = c;
+            }
+        }
+        if (bestR < 0) return null;
+        return {
+            x: bestC * COLLISION_CELL_WIDTH + COLLISION_CELL_WIDTH / 2,
+            y: bestR * COLLISION_CELL_HEIGHT + COLLISION_CELL_HEIGHT / 2
+        };
+    }
+
+    /**
+     * Center of the cell `lookahead` steps along a shortest path from
+     * (fromX, fromY) toward (toX, toY), from the precomputed next-hop table:
+     * one lookup per step, no search. Null if there is no table, either point
+     * is off the connected cells, or both are in the same cell.
+     */
+    getPathStep(fromX, fromY, toX, toY, lookahead = 1) {
+        if (!this.nextHop) return null;
+        let src = this._cellNumber(fromX, fromY);
+        const dst = this._cellNumber(toX, toY);
+        if (src < 0 || dst < 0 || src === dst) return null;
+
+        let r, c;
+        for (let i = 0; i < lookahead && src !== dst; i++) {
+            const byte = this.nextHop.table[dst * this.nextHop.rowBytes + (src >> 2)];
+            const [dr, dc] = NEXT_HOP_STEPS[(byte >> ((src & 3) * 2)) & 3];
+            r = this.cellCoords[src * 2] + dr;
+            c = this.cellCoords[src * 2 + 1] + dc;
+            src = this.cellIndex[r * COLLISION_GRID_COLS + c];
+        }
+        return {
+            x: c * COLLISION_CELL_WIDTH + COLLISION_CELL_WIDTH / 2,
+            y: r * COLLISION_CELL_HEIGHT + COLLISION_CELL_HEIGHT / 2
+        };
+    }
+
+    /**
+     * Whether walls block the straight line between two points, from the
+     * precomputed cell-to-cell visibility bitsets: one bit read, no raycast.
+     * Null if unknown (no table, or a point off the connected cells).
+     */
+    hasLineOfSight(fromX, fromY, toX, toY) {
+        if (!this.visibility) return null;
+        const a = this._cellNumber(fromX, fromY);
+        const b = this._cellNumber(toX, toY);
+        if (a < 0 || b < 0) return null;
+        return ((this.visibility.table[a * this.visibility.rowBytes + (b >> 3)] >> (b & 7)) & 1) === 1;
+    }
+
+    _cellNumber(worldX, worldY) {
+        const col = Math.floor(worldX / COLLISION_CELL_WIDTH);
+        const row = Math.floor(worldY / COLLISION_CELL_HEIGHT);
+        if (row < 0 || row >= COLLISION_GRID_ROWS || col < 0 || col >= COLLISION_GRID_COLS) return -1;
+        return this.cellIndex[row * COLLISION_GRID_COLS + col];
+    }
+
     hasGrid() {
         return this.grid !== null;
     }
@@ -284,7 +496,13 @@ class CollisionMapManager {
             this.debugGraphics = null;
         }
         this.grid = null;
-        this.connectedCells = null;
+        this.connectedMask = null;
+        this.navFields = null;
+        this.wallRects = null;
+        this.cellIndex = null;
+        this.cellCoords = null;
+        this.nextHop = null;
+        this.visibility = null;
     }
 
     drawDebug() {
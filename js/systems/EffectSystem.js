@@ -1,11 +1,41 @@
 class EffectSystem {
     constructor(scene) {
         this.scene = scene;
+        // Pooled sprites for effects pre-rendered by tools/render_effect_sheets.py
+        this.fxPool = scene.textures.exists(FX_ATLAS_KEY)
+            ? scene.add.group({ classType: Phaser.GameObjects.Sprite, maxSize: FX_POOL_SIZE })
+            : null;
+    }
+
+    // --- Baked playback (random rotation hides the fixed particle layout): returns false if the animation or a free sprite is unavailable ---
+    _playBaked(animKey, x, y, scale, depth, rotation = 0) {
+        if (!this.fxPool || !this.scene.anims.exists(animKey)) return false;
+        const sprite = this.fxPool.get(x, y, FX_ATLAS_KEY);
+        if (!sprite) return false;
+        sprite.setActive(true).setVisible(true)
+            .setScale(scale).setAlpha(1).setDepth(depth).setRotation(rotation);
+        sprite.play(animKey);
+        sprite.once(Phaser.Animations.Events.ANIMATION_COMPLETE, () => {
+            this.fxPool.killAndHide(sprite);
+        });
+        return true;
+    }
+
+    // Map a tint to its baked color variant (attribute name, or 'neutral' for grey impacts)
+    _variantFor(color) {
+        if (color === 0x888888) return 'neutral';
+        for (const [attr, col] of Object.entries(ATTRIBUTE_COLORS)) {
+            if (col === color) return attr;
+        }
+        return null;
     }
 
     // --- Hit impact: small burst of particles at bullet impact point ---
     hitImpact(x, y, color) {
         const col = color || 0xffffff;
+        const variant = this._variantFor(col);
+        if (variant && this._playBaked(`fx_hitImpact_${variant}`, x, y, 1, 70, Math.random() * Math.PI * 2)) return;
+
         // Quick flash circle
         const flash = this.scene.add.image(x, y, 'particle_white')
             .setTint(col).setScale(0.3).setAlpha(0.8).setDepth(70);
@@ -35,6 +65,8 @@ class EffectSystem {
 
     // --- Crit spark: bigger, brighter hit with star burst ---
     critSpark(x, y) {
+        if (this._playBaked('fx_critSpark_default', x, y, 1, 72)) return;
+
         // Bright flash
         const flash = this.scene.add.image(x, y, 'particle_white')
             .setTint(0xffff00).setScale(0.5).setAlpha(1).setDepth(72);
@@ -73,6 +105,7 @@ class EffectSystem {
     explosion(x, y, radius) {
         const r = radius || 60;
         const scale = r / 32;
+        if (this._playBaked('fx_explosion_default', x, y, r / FX_EXPLOSION_BASE_RADIUS, 71)) return;
 
         // Shockwave ring
         const ring = this.scene.add.image(x, y, 'particle_ring')
@@ -147,6 +180,8 @@ class EffectSystem {
         const col = color || 0xff4444;
         const s = size || 28;
         const scale = s / 28;
+        const variant = this._variantFor(col);
+        if (variant && this._playBaked(`fx_enemyDeath_${variant}`, x, y, scale, 71, Math.random() * Math.PI * 2)) return;
 
         // Flash
         const flash = this.scene.add.image(x, y, 'particle_white')
@@ -335,6 +370,8 @@ class EffectSystem {
 
     // --- Boss break: dramatic shattering effect ---
     bossBreak(x, y) {
+        if (this._playBaked('fx_bossBreak_default', x, y, 1, 73)) return;
+
         // Bright flash
         const flash = this.scene.add.image(x, y, 'particle_white')
             .setTint(0xffff00).setScale(1).setAlpha(1).setDepth(73);
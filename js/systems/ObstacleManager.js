@@ -5,8 +5,17 @@ class ObstacleManager {
         this.obstacles = [];
     }
 
-    generateForArea(layoutName) {
+    /**
+     * Place the area's obstacles. placements ([[type, x, y], ...] from
+     * tools/stage_placement.py) are used as-is; without them, positions are
+     * rejection-sampled here.
+     */
+    generateForArea(layoutName, placements) {
         this.clearAll();
+        if (placements) {
+            placements.forEach(([type, x, y]) => this._addObstacle(type, x, y));
+            return;
+        }
         const layout = AREA_LAYOUTS[layoutName];
         if (!layout || layout.count === 0) return;
 
@@ -35,13 +44,16 @@ class ObstacleManager {
 
             if (!valid) continue;
 
-            const textureKey = `obstacle_${type}`;
-            const obstacle = new Obstacle(this.scene, x, y, textureKey, type);
-            this.staticGroup.add(obstacle);
-            this.obstacles.push(obstacle);
+            this._addObstacle(type, x, y);
         }
     }
 
+    _addObstacle(type, x, y) {
+        const obstacle = new Obstacle(this.scene, x, y, `obstacle_${type}`, type);
+        this.staticGroup.add(obstacle);
+        this.obstacles.push(obstacle);
+    }
+
     _overlapsZone(x, y, config, zone) {
         const hw = config.width / 2;
         const hh = config.height / 2;
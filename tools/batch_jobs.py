@@ -0,0 +1,205 @@
+"""
+Stellar Gunners - Batch Request Files
+Offline path for bulk image generation through the Gemini Batch API instead of
+online calls at 15 RPM: a tool writes every request it would send to a JSONL
+file, the file is uploaded (File API) and submitted to
+models/<model>:batchGenerateContent, and the results JSONL that comes back is
+ingested into the asset tree later.
+
+  requests  <name>.jsonl           one {"key", "request"} per line
+  manifest  <name>.manifest.json   per key: output path (relative to the
+                                   project), prompt and image cache key
+  results   any .jsonl             one {"key", "response"} or {"key", "error"}
+                                   per line, in any order
+
+Ingest decodes each line's inline image without building the response dict
+(inline_stream.py) into a staging file, then moves it to the key's output.
+Lines that failed or hold no image are reported and left for an online run.
+
+Usage:
+  python tools/batch_jobs.py show FILE.jsonl
+      Line count, keys and sizes of a request or results file
+  python tools/batch_jobs.py fabricate REQUESTS.jsonl RESULTS.jsonl [--fail-every N]
+      Results file with stub images for every request (every Nth an error),
+      for testing ingest without the API
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from inline_stream import InlineImageReader
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def manifest_path(requests_path):
+    requests_path = Path(requests_path)
+    return requests_path.with_name(f"{requests_path.stem}.manifest.json")
+
+
+def write_batch(requests_path, entries, endpoint):
+    """Write a batch request file and its manifest.
+
+    entries: dicts with key, payload (generateContent body), output (path),
+    prompt and cacheKey. Returns the number of requests written.
+    """
+    requests_path = Path(requests_path)
+    requests_path.parent.mkdir(parents=True, exist_ok=True)
+    jobs = {}
+    tmp = requests_path.with_name(f".{requests_path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for entry in entries:
+            if entry["key"] in jobs:
+                raise ValueError(f"Duplicate batch key: {entry['key']}")
+            f.write(json.dumps({"key": entry["key"], "request": entry["payload"]}, separators=(",", ":")))
+            f.write("\n")
+            jobs[entry["key"]] = {"output": _relative(entry["output"]), "prompt": entry["prompt"],
+                                  "cacheKey": entry["cacheKey"]}
+    os.replace(tmp, requests_path)
+
+    manifest = {"requests": requests_path.name, "endpoint": endpoint, "jobs": jobs}
+    with open(manifest_path(requests_path), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    return len(jobs)
+
+
+def _relative(path):
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(PROJECT_ROOT.resolve()).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def load_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ingest_results(results_path, manifest, on_image=None):
+    """Move each result's image to its manifest output.
+
+    on_image(key, job, output_path, model_text) runs after each saved image.
+    Returns {"saved": n, "failed": {key: reason}, "unknown": [keys]}.
+    """
+    from gemini_async import response_text
+
+    results_path = Path(results_path)
+    report = {"saved": 0, "failed": {}, "unknown": []}
+    fd, staging = tempfile.mkstemp(dir=results_path.parent, prefix=".ingest.", suffix=".png")
+    os.close(fd)
+    try:
+        with open(results_path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                reader = InlineImageReader(staging)
+                try:
+                    reader.feed(line)
+                    size, result = reader.finish()
+                except ValueError as e:
+                    report["failed"][f"line {number}"] = f"unreadable: {e}"
+                    continue
+
+                key = result.get("key")
+                job = manifest["jobs"].get(key)
+                if job is None:
+                    report["unknown"].append(key)
+                    continue
+                if "error" in result:
+                    report["failed"][key] = json.dumps(result["error"])[:200]
+                    continue
+                if size is None:
+                    report["failed"][key] = "no image in response"
+                    continue
+
+                output_path = Path(job["output"])
+                if not output_path.is_absolute():
+                    output_path = PROJECT_ROOT / output_path
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(staging, output_path)
+                report["saved"] += 1
+                if on_image:
+                    on_image(key, job, output_path, response_text(result.get("response", {})))
+    finally:
+        if os.path.exists(staging):
+            os.unlink(staging)
+    return report
+
+
+# ============================================================
+# Inspection / fabricated results
+# ============================================================
+
+def show(path):
+    count = size = 0
+    keys = []
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            count += 1
+            size += len(line)
+            # Keys are written first by write_batch; results may put them last
+            head = line[:200].decode("utf-8", "replace")
+            tail = line[-200:].decode("utf-8", "replace")
+            for text in (head, tail):
+                marker = text.find('"key":')
+                if marker >= 0:
+                    keys.append(text[marker + 6:].split('"')[1])
+                    break
+    print(f"  {Path(path).name}: {count} lines, {size / 1024 / 1024:.1f} MB")
+    for key in keys[:10]:
+        print(f"    {key}")
+    if len(keys) > 10:
+        print(f"    ... {len(keys) - 10} more")
+
+
+def fabricate(requests_path, results_path, fail_every=0, image_kb=64):
+    """Write a results file answering every request with a stub image."""
+    import base64
+
+    from gemini_stub import image_response
+
+    written = failed = 0
+    with open(requests_path, "rb") as src, open(results_path, "w", encoding="utf-8") as out:
+        for number, line in enumerate(src, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if fail_every and number % fail_every == 0:
+                out.write(json.dumps({"key": entry["key"], "error": {
+                    "code": 400, "message": "Fabricated failure", "status": "INVALID_ARGUMENT"}}) + "\n")
+                failed += 1
+                continue
+            response = image_response(base64.b64encode(entry["key"].encode()), image_kb)
+            # Batch results put the response before the key
+            out.write(json.dumps({"response": response, "key": entry["key"]}) + "\n")
+            written += 1
+    print(f"  {results_path}: {written} images, {failed} errors")
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Batch Request Files")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    if len(args) >= 2 and args[0] == "show":
+        for path in args[1:]:
+            show(path)
+    elif len(args) >= 3 and args[0] == "fabricate":
+        fail_every = int(args[args.index("--fail-every") + 1]) if "--fail-every" in args else 0
+        fabricate(args[1], args[2], fail_every)
+    else:
+        print(__doc__)
+        return
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
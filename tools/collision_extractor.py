@@ -0,0 +1,233 @@
+"""
+Stellar Gunners - Local Collision Extractor
+Classifies the 30x22 collision grid directly from an area background image,
+without a Gemini Vision call.
+
+Area backgrounds are prompted to render walkable floor LIGHTER and FLATTER and
+obstacles DARKER and visually RAISED (see generate_area_backgrounds.py), so each
+cell is scored from vectorized per-cell statistics:
+  - darkness: how far the cell's mean luminance sits below the floor level
+  - contrast: luminance standard deviation inside the cell (texture/detail)
+  - edges:    mean gradient magnitude inside the cell (outlines, rubble, 3D shading)
+
+Not a collision map source yet. On the existing maps it agrees on 62.6% of
+cells, below the 65.4% of an all-floor grid, and its wall density mostly ends
+at the min/max clamp; a sweep of the weights, cut and smoothing tops out near
+68.5% in-sample. generate_collision_maps.py uses Vision only; this module is
+kept to measure classifier changes against that baseline.
+
+Usage:
+  python tools/collision_extractor.py [stage_id ...]   # Compare against existing maps
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from collision_format import load_collision_file
+
+PROJECT_ROOT = Path(__file__).parent.parent
+STAGES_PATH = PROJECT_ROOT / "assets" / "data" / "stages.json"
+RAW_BG_DIR = PROJECT_ROOT / "assets" / "images" / "area_backgrounds"
+GAME_BG_DIR = PROJECT_ROOT / "assets" / "images" / "game" / "area_backgrounds"
+COLLISION_DIR = PROJECT_ROOT / "assets" / "data" / "collision_maps"
+
+GRID_COLS = 30
+GRID_ROWS = 22
+ANALYSIS_WIDTH = 1200   # Images are analyzed at game resolution
+ANALYSIS_HEIGHT = 900
+
+# Tunable classification thresholds (override with key=value on the CLI)
+THRESHOLDS = {
+    'floor_percentile': 75,   # Luminance percentile taken as the walkable floor level
+    'w_darkness': 1.0,        # Weight of relative darkness vs floor
+    'w_contrast': 0.5,        # Weight of per-cell luminance std
+    'w_edges': 0.5,           # Weight of per-cell gradient magnitude
+    'wall_score': 0.56,       # Cells scoring above this are walls
+    'min_density': 0.15,      # Clamp wall density into [min, max] by moving the cut
+    'max_density': 0.35,      # (same 15-35% band VISION_PROMPT asks for)
+    'smooth_passes': 1,       # 3x3 majority-filter passes to drop speckle
+}
+
+
+def find_area_image(stage_id, area_idx):
+    """Prefer the raw generated image, fall back to the processed game copy."""
+    for base in (RAW_BG_DIR, GAME_BG_DIR):
+        path = base / f"area_{stage_id}_{area_idx}.png"
+        if path.exists():
+            return path
+    return None
+
+
+def load_luminance(image_path):
+    """Load image as float32 luminance (Rec.601) at analysis resolution."""
+    img = Image.open(image_path).convert('RGB')
+    if img.size != (ANALYSIS_WIDTH, ANALYSIS_HEIGHT):
+        img = img.resize((ANALYSIS_WIDTH, ANALYSIS_HEIGHT), Image.BILINEAR)
+    rgb = np.asarray(img, dtype=np.float32) / 255.0
+    return rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def cell_means(values, rows=GRID_ROWS, cols=GRID_COLS):
+    """Mean of a 2D array over each grid cell (handles non-integer cell sizes)."""
+    h, w = values.shape
+    row_edges = np.linspace(0, h, rows + 1).astype(int)
+    col_edges = np.linspace(0, w, cols + 1).astype(int)
+    sums = np.add.reduceat(np.add.reduceat(values, row_edges[:-1], axis=0), col_edges[:-1], axis=1)
+    counts = np.outer(np.diff(row_edges), np.diff(col_edges))
+    return sums / counts
+
+
+def cell_features(lum, rows=GRID_ROWS, cols=GRID_COLS):
+    """Per-cell (darkness, contrast, edges), each normalized to roughly [0, 1]."""
+    floor = np.percentile(lum, THRESHOLDS['floor_percentile'])
+    mean = cell_means(lum, rows, cols)
+    std = np.sqrt(np.maximum(cell_means(lum * lum, rows, cols) - mean * mean, 0))
+
+    gy = np.zeros_like(lum)
+    gx = np.zeros_like(lum)
+    gy[1:-1] = (lum[2:] - lum[:-2]) * 0.5
+    gx[:, 1:-1] = (lum[:, 2:] - lum[:, :-2]) * 0.5
+    edges = cell_means(np.sqrt(gx * gx + gy * gy), rows, cols)
+
+    darkness = np.clip((floor - mean) / max(floor, 1e-3), 0, 1)
+
+    def _norm(a):
+        lo, hi = np.percentile(a, 5), np.percentile(a, 95)
+        return np.clip((a - lo) / max(hi - lo, 1e-6), 0, 1)
+
+    return darkness, _norm(std), _norm(edges)
+
+
+def _stretch(a):
+    hi = np.percentile(a, 95)
+    return np.clip(a / max(hi, 1e-6), 0, 1)
+
+
+def score_cells(lum, rows=GRID_ROWS, cols=GRID_COLS):
+    """Combined wall score per cell in [0, 1]."""
+    darkness, contrast, edges = cell_features(lum, rows, cols)
+    t = THRESHOLDS
+    total = t['w_darkness'] + t['w_contrast'] + t['w_edges']
+    return (t['w_darkness'] * _stretch(darkness) + t['w_contrast'] * contrast
+            + t['w_edges'] * edges) / total
+
+
+def majority_filter(walls, passes=1):
+    """3x3 majority vote (edge-padded) to remove isolated speckle cells."""
+    for _ in range(passes):
+        padded = np.pad(walls.astype(np.int8), 1, mode='edge')
+        votes = sum(padded[1 + dr:1 + dr + walls.shape[0], 1 + dc:1 + dc + walls.shape[1]]
+                    for dr in (-1, 0, 1) for dc in (-1, 0, 1))
+        walls = votes >= 5
+    return walls
+
+
+def classify(scores, smooth_passes=None):
+    """Threshold scores into a wall mask, clamping density. Returns (walls, cut).
+
+    The density clamp applies to the smoothed mask: smoothing erodes thin walls,
+    so a cut chosen on the raw scores can end well below min_density.
+    """
+    t = THRESHOLDS
+    if smooth_passes is None:
+        smooth_passes = t['smooth_passes']
+
+    def walls_at(cut):
+        return majority_filter(scores > cut, smooth_passes)
+
+    cut = t['wall_score']
+    walls = walls_at(cut)
+    density = float(walls.mean())
+    if t['min_density'] <= density <= t['max_density']:
+        return walls, cut
+    # Bisect on the score quantile for the band edge; smoothed density falls as the cut rises
+    target = t['min_density'] if density < t['min_density'] else t['max_density']
+    lo, hi = 0.0, 1.0
+    for _ in range(16):
+        q = (lo + hi) / 2
+        cut = float(np.quantile(scores, q))
+        walls = walls_at(cut)
+        if walls.mean() < target:
+            hi = q
+        else:
+            lo = q
+    # lo keeps the density at or above min_density, hi at or below max_density
+    cut = float(np.quantile(scores, lo if target == t['min_density'] else hi))
+    return walls_at(cut), cut
+
+
+def extract_grid(image_path):
+    """Classify an area background into a GRID_ROWS x GRID_COLS list grid (1 = wall)."""
+    walls, _ = classify(score_cells(load_luminance(image_path)))
+    return walls.astype(int).tolist()
+
+
+def apply_overrides(pairs):
+    """Apply key=value threshold overrides from the command line."""
+    for pair in pairs:
+        key, _, value = pair.partition('=')
+        if key not in THRESHOLDS:
+            raise KeyError(f"Unknown threshold '{key}'. Available: {list(THRESHOLDS.keys())}")
+        THRESHOLDS[key] = type(THRESHOLDS[key])(float(value))
+
+
+def compare_with_existing(target_stages=None):
+    """Extract every area locally and report agreement with the saved collision maps."""
+    with open(STAGES_PATH, 'r', encoding='utf-8') as f:
+        stages = json.load(f)
+
+    total_cells = agree_cells = floor_cells = 0
+    for stage in stages:
+        stage_id = stage['id']
+        if target_stages and stage_id not in target_stages:
+            continue
+        existing_path = COLLISION_DIR / f"collision_{stage_id}.json"
+        existing = None
+        if existing_path.exists():
+            existing = load_collision_file(existing_path)
+
+        start = time.perf_counter()
+        line = []
+        for area_idx, _ in enumerate(stage.get('areas', [])):
+            image_path = find_area_image(stage_id, area_idx)
+            if image_path is None:
+                line.append(f"a{area_idx}: no image")
+                continue
+            local = np.asarray(extract_grid(image_path))
+            if existing and area_idx < len(existing.get('areas', [])):
+                ref = np.asarray(existing['areas'][area_idx]['grid'])
+                agree = int((local == ref).sum())
+                total_cells += ref.size
+                agree_cells += agree
+                floor_cells += int((ref == 0).sum())
+                line.append(f"a{area_idx}: {agree / ref.size * 100:.0f}% ({local.mean() * 100:.0f}% walls)")
+            else:
+                line.append(f"a{area_idx}: {local.mean() * 100:.0f}% walls")
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"  {stage_id:<11} {elapsed:5.0f} ms  " + " | ".join(line))
+
+    if total_cells:
+        print(f"\n  Overall agreement with existing maps: {agree_cells / total_cells * 100:.1f}%")
+        print(f"  All-floor baseline (every cell walkable): {floor_cells / total_cells * 100:.1f}%")
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Local Collision Extractor")
+    print(f"Grid: {GRID_COLS}x{GRID_ROWS}")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    apply_overrides([a for a in args if '=' in a])
+    target_stages = [a for a in args if '=' not in a] or None
+    compare_with_existing(target_stages)
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
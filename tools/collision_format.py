@@ -0,0 +1,187 @@
+"""
+Stellar Gunners - Collision Map File Format
+Reads and writes collision_<stage>.json.
+
+Version 1 (legacy): every area stores "grid" as nested 0/1 lists, written with
+indent=2 (one cell per line).
+
+Version 2 (compact row bitmasks): each area stores "rows", one hex string per
+grid row. Character k of a row holds columns 4k..4k+3, bit j = column 4k+j
+(1 = wall). Files are written without indentation.
+
+  {"version": 2, "encoding": "rowmask-hex", "gridCols": 30, "gridRows": 22,
+   "stageId": "stage_1_1",
+   "areas": [{"areaIndex": 0, "areaName": "...", "rows": ["f000003c", ...]}]}
+
+Usage:
+  python tools/collision_format.py migrate [stage_id ...]   # Rewrite files as v2, report sizes/parse times
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+COLLISION_DIR = PROJECT_ROOT / "assets" / "data" / "collision_maps"
+
+FORMAT_VERSION = 2
+ENCODING = "rowmask-hex"
+GRID_COLS = 30
+GRID_ROWS = 22
+
+
+def encode_row(row):
+    """Encode one row of 0/1 cells as a hex string (4 columns per character)."""
+    chars = []
+    for k in range(0, len(row), 4):
+        nibble = 0
+        for j, cell in enumerate(row[k:k + 4]):
+            if cell:
+                nibble |= 1 << j
+        chars.append("0123456789abcdef"[nibble])
+    return "".join(chars)
+
+
+# hex char -> its 4 cells, so decoding is one table lookup per 4 columns
+_NIBBLE_CELLS = {f"{n:x}": [(n >> j) & 1 for j in range(4)] for n in range(16)}
+
+
+def decode_row(text, cols):
+    """Decode a hex row string back into a list of cols 0/1 cells."""
+    row = []
+    for ch in text:
+        row += _NIBBLE_CELLS[ch]
+    return row[:cols]
+
+
+def encode_grid(grid):
+    return [encode_row(row) for row in grid]
+
+
+def decode_grid(rows, cols):
+    return [decode_row(text, cols) for text in rows]
+
+
+def area_grid(area, cols):
+    """Return the nested-list grid of an area in either format version."""
+    if "rows" in area:
+        return decode_grid(area["rows"], cols)
+    return area["grid"]
+
+
+def to_compact(collision_data):
+    """Convert stage collision data (v1 or v2) into the v2 compact structure."""
+    src_cols = collision_data.get("gridCols")
+    grid_cols, grid_rows = src_cols or GRID_COLS, GRID_ROWS
+    areas = []
+    for area in collision_data.get("areas", []):
+        grid = area_grid(area, src_cols)
+        grid_rows, grid_cols = len(grid), len(grid[0])
+        compact = {k: v for k, v in area.items() if k not in ("grid", "rows")}
+        compact["rows"] = encode_grid(grid)
+        areas.append(compact)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "encoding": ENCODING,
+        "gridCols": grid_cols,
+        "gridRows": grid_rows,
+    }
+    body = {k: v for k, v in collision_data.items() if k not in header and k != "areas"}
+    return {**header, **body, "areas": areas}
+
+
+def load_collision_file(path):
+    """Load a collision file and return it with decoded nested-list grids on every area."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    cols = data.get("gridCols")
+    for area in data.get("areas", []):
+        if "rows" in area:
+            area["grid"] = decode_grid(area.pop("rows"), cols)
+    return data
+
+
+def save_collision_file(path, collision_data):
+    """Write collision data in the compact v2 format.
+
+    Written to a temp file in the same directory and renamed over the target,
+    so a crash mid-write leaves the previous file intact.
+    """
+    compact = to_compact(collision_data)
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(compact, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _parse_time_ms(text, repeat=200):
+    """Average time to json.loads + decode every area grid."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        data = json.loads(text)
+        cols = data.get("gridCols")
+        for area in data["areas"]:
+            area_grid(area, cols)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def migrate(target_stages=None):
+    """Rewrite collision files as v2 and report size and parse-time deltas."""
+    total_before = total_after = 0
+    parse_before = parse_after = 0.0
+    for path in sorted(COLLISION_DIR.glob("collision_*.json")):
+        stage_id = path.stem[len("collision_"):]
+        if target_stages and stage_id not in target_stages:
+            continue
+
+        before_text = path.read_text(encoding='utf-8')
+        data = json.loads(before_text)
+        if data.get("version") == FORMAT_VERSION:
+            print(f"  SKIP (already v{FORMAT_VERSION}): {path.name}")
+            continue
+
+        save_collision_file(path, data)
+        after_text = path.read_text(encoding='utf-8')
+
+        # Round-trip check before moving on
+        reloaded = load_collision_file(path)
+        for old, new in zip(data["areas"], reloaded["areas"]):
+            if old["grid"] != new["grid"]:
+                raise ValueError(f"{path.name}: area {old.get('areaIndex')} did not round-trip")
+
+        size_before, size_after = len(before_text.encode()), len(after_text.encode())
+        t_before, t_after = _parse_time_ms(before_text), _parse_time_ms(after_text)
+        total_before += size_before
+        total_after += size_after
+        parse_before += t_before
+        parse_after += t_after
+        print(f"  {path.name:<28} {size_before / 1024:6.1f} KB -> {size_after / 1024:5.1f} KB"
+              f"  parse {t_before:.3f} -> {t_after:.3f} ms")
+
+    if total_before:
+        print(f"\n  Total: {total_before / 1024:.1f} KB -> {total_after / 1024:.1f} KB "
+              f"({(1 - total_after / total_before) * 100:.1f}% smaller)")
+        print(f"  Parse+decode: {parse_before:.2f} -> {parse_after:.2f} ms "
+              f"(json.loads + grid decode, all stages)")
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Collision Map Format")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    if not args or args[0] != "migrate":
+        print("Usage: python tools/collision_format.py migrate [stage_id ...]")
+        return
+
+    migrate(args[1:] or None)
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
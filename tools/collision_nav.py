@@ -0,0 +1,174 @@
+"""
+Stellar Gunners - Collision Navigation Fields
+Precomputes per-area navigation data stored alongside the collision grid so
+CollisionMapManager does no graph search when an area loads.
+
+Per area ("nav" key):
+  spawn      - {"r", "c"}: walkable cell nearest the grid center (player spawn)
+  connected  - hex row bitmask (same encoding as "rows") of walkable cells
+               4-connected to the spawn cell
+  dtype      - "u8" or "u16" for the distance fields below
+  distSpawn  - base64 row-major BFS distance (in cells) from the spawn cell
+  distEdges  - {"top", "bottom", "left", "right"}: base64 BFS distance from the
+               connected walkable cells on that edge
+  nextHop    - key of the area's table in nexthop_<stage>.bin (see
+               collision_nexthop.py); written with the sidecar
+  visibility - same for visibility_<stage>.bin (collision_visibility.py)
+Unreachable and wall cells hold the dtype's max value (255 / 65535).
+
+Usage:
+  python tools/collision_nav.py [stage_id ...]   # Add/refresh nav fields in existing maps
+"""
+
+import base64
+import sys
+import time
+
+import numpy as np
+
+from collision_format import COLLISION_DIR, encode_grid, load_collision_file, save_collision_file
+from collision_nexthop import nexthop_path, save_nexthop_file
+from collision_visibility import save_visibility_file, visibility_path
+
+EDGES = ('top', 'bottom', 'left', 'right')
+
+
+def find_spawn_cell(walkable):
+    """Walkable cell nearest the center, scanning square rings outward
+    (same order as CollisionMapManager's legacy search)."""
+    rows, cols = walkable.shape
+    center_r, center_c = rows // 2, cols // 2
+    if walkable[center_r, center_c]:
+        return center_r, center_c
+    for radius in range(1, max(rows, cols)):
+        for dr in range(-radius, radius + 1):
+            for dc in range(-radius, radius + 1):
+                r, c = center_r + dr, center_c + dc
+                if 0 <= r < rows and 0 <= c < cols and walkable[r, c]:
+                    return r, c
+    return None
+
+
+def bfs_distance(walkable, sources):
+    """4-connected BFS distance from a boolean source mask, as vectorized wavefronts.
+
+    Returns int32 array; -1 where unreachable (including walls).
+    """
+    dist = np.full(walkable.shape, -1, dtype=np.int32)
+    frontier = sources & walkable
+    visited = frontier.copy()
+    step = 0
+    while frontier.any():
+        dist[frontier] = step
+        grown = np.zeros_like(frontier)
+        grown[1:] |= frontier[:-1]
+        grown[:-1] |= frontier[1:]
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        frontier = grown & walkable & ~visited
+        visited |= frontier
+        step += 1
+    return dist
+
+
+def edge_mask(shape, edge):
+    mask = np.zeros(shape, dtype=bool)
+    if edge == 'top':
+        mask[0, :] = True
+    elif edge == 'bottom':
+        mask[-1, :] = True
+    elif edge == 'left':
+        mask[:, 0] = True
+    else:
+        mask[:, -1] = True
+    return mask
+
+
+def pack_field(dist, dtype):
+    """Encode an int distance field as base64 little-endian u8/u16 (max value = unreachable)."""
+    np_dtype = np.uint8 if dtype == 'u8' else np.dtype('<u2')
+    fill = np.iinfo(np_dtype).max
+    packed = np.where(dist < 0, fill, dist).astype(np_dtype)
+    return base64.b64encode(packed.tobytes()).decode('ascii')
+
+
+def unpack_field(text, shape, dtype):
+    """Decode a packed field back to int32 with -1 for unreachable."""
+    np_dtype = np.uint8 if dtype == 'u8' else np.dtype('<u2')
+    raw = np.frombuffer(base64.b64decode(text), dtype=np_dtype).reshape(shape).astype(np.int32)
+    raw[raw == np.iinfo(np_dtype).max] = -1
+    return raw
+
+
+def compute_nav(grid):
+    """Compute nav fields for one grid. Returns (grid with isolated cells walled, nav dict)."""
+    walls = np.asarray(grid, dtype=bool)
+    walkable = ~walls
+    spawn = find_spawn_cell(walkable)
+    if spawn is None:
+        return grid, None
+
+    spawn_mask = np.zeros_like(walkable)
+    spawn_mask[spawn] = True
+    dist_spawn = bfs_distance(walkable, spawn_mask)
+    connected = dist_spawn >= 0
+
+    edge_fields = {edge: bfs_distance(connected, edge_mask(connected.shape, edge)) for edge in EDGES}
+    max_dist = max(int(dist_spawn.max()), *(int(f.max()) for f in edge_fields.values()))
+    dtype = 'u8' if max_dist < 255 else 'u16'
+
+    fixed = np.where(connected, 0, 1).astype(int).tolist()
+    nav = {
+        "spawn": {"r": int(spawn[0]), "c": int(spawn[1])},
+        "connected": encode_grid(connected.astype(int).tolist()),
+        "dtype": dtype,
+        "distSpawn": pack_field(dist_spawn, dtype),
+        "distEdges": {edge: pack_field(field, dtype) for edge, field in edge_fields.items()},
+    }
+    return fixed, nav
+
+
+def add_nav_to_area(area):
+    """Compute nav for one area in place. Returns number of isolated cells walled."""
+    fixed, nav = compute_nav(area["grid"])
+    if nav is None:
+        area.pop("nav", None)
+        return 0
+    walled = sum(map(sum, fixed)) - sum(map(sum, area["grid"]))
+    area["grid"] = fixed
+    area["nav"] = nav
+    return walled
+
+
+def add_nav_to_stage(collision_data):
+    """Compute nav for every area in place. Returns number of isolated cells walled."""
+    return sum(add_nav_to_area(area) for area in collision_data.get("areas", []))
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Collision Navigation Fields")
+    print("=" * 60)
+
+    target_stages = sys.argv[1:] or None
+    for path in sorted(COLLISION_DIR.glob("collision_*.json")):
+        stage_id = path.stem[len("collision_"):]
+        if target_stages and stage_id not in target_stages:
+            continue
+        size_before = path.stat().st_size
+        data = load_collision_file(path)
+        start = time.perf_counter()
+        fixed = add_nav_to_stage(data)
+        elapsed = (time.perf_counter() - start) * 1000
+        # New connectivity invalidates the next-hop/visibility tables; rebuild them alongside
+        save_nexthop_file(nexthop_path(stage_id), data)
+        save_visibility_file(visibility_path(stage_id), data)
+        save_collision_file(path, data)
+        print(f"  {path.name:<28} {len(data['areas'])} areas, {fixed} isolated cells walled, "
+              f"{elapsed:.1f} ms, {size_before / 1024:.1f} -> {path.stat().st_size / 1024:.1f} KB")
+
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
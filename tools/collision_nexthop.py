@@ -0,0 +1,229 @@
+"""
+Stellar Gunners - Collision Next-Hop Tables
+Precomputes all-pairs shortest-path next hops over each area's connected
+walkable cells, so enemy chase AI gets the next cell toward the player with
+one table lookup (CollisionMapManager.getPathStep) instead of a search.
+
+Cells are numbered 0..N-1 in row-major order of the area's nav "connected"
+mask. For target t and source s the table holds the 4-neighbor step from s
+along a shortest path to t, as a 2-bit code (0 up, 1 down, 2 left, 3 right);
+every connected cell reaches every other, so no "unreachable" code is
+needed. Among equally short steps the one along the larger of the row/column
+offsets to t is chosen, giving staircase paths instead of L-shapes.
+
+Sidecar file nexthop_<stage_id>.bin (little-endian):
+  header    "SGNH", u8 version, u8 area count, u16 reserved
+  directory per area, 16 bytes: u8 areaIndex, u8 reserved, u16 cells (N),
+            u32 key, u32 offset, u32 length
+  tables    N rows (one per target) of ceil(N/4) bytes; source s is bits
+            2*(s%4)..2*(s%4)+1 of byte s//4
+
+key is crc32 of the area's "connected" rows and is also stored as
+nav["nextHop"] in the collision JSON; the game ignores a table whose key
+does not match, so a stale sidecar only disables path lookups.
+
+Usage:
+  python tools/collision_nexthop.py [stage_id ...]   # Write sidecars for existing maps, report sizes and timing
+"""
+
+import os
+import struct
+import sys
+import time
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from collision_format import COLLISION_DIR, decode_grid, load_collision_file, save_collision_file
+
+MAGIC = b"SGNH"
+VERSION = 1
+HEADER = struct.Struct("<4sBBH")
+ENTRY = struct.Struct("<BBHIII")
+
+# (dr, dc) per 2-bit code
+STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def nexthop_path(stage_id):
+    return COLLISION_DIR / f"nexthop_{stage_id}.bin"
+
+
+def nexthop_key(connected_rows):
+    """crc32 of an area's nav "connected" hex rows."""
+    return zlib.crc32("".join(connected_rows).encode("ascii"))
+
+
+def all_pairs_distance(walkable):
+    """BFS distance from every walkable cell at once.
+
+    Returns (cells, dist): cells is (N, 2) row/col of the walkable cells in
+    row-major order, dist is (N, rows, cols) int16 with dist[t] the distance
+    field from cells[t] (-1 where unreachable).
+    """
+    cells = np.argwhere(walkable)
+    n = len(cells)
+    rows, cols = walkable.shape
+    dist = np.full((n, rows, cols), -1, dtype=np.int16)
+    frontier = np.zeros((n, rows, cols), dtype=bool)
+    frontier[np.arange(n), cells[:, 0], cells[:, 1]] = True
+    visited = frontier.copy()
+    step = 0
+    while frontier.any():
+        dist[frontier] = step
+        grown = np.zeros_like(frontier)
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        grown[:, :, 1:] |= frontier[:, :, :-1]
+        grown[:, :, :-1] |= frontier[:, :, 1:]
+        frontier = grown & walkable & ~visited
+        visited |= frontier
+        step += 1
+    return cells, dist
+
+
+def next_hop_codes(walkable):
+    """(N, N) uint8 step codes: [t, s] is the first step from cell s toward cell t."""
+    cells, dist = all_pairs_distance(walkable)
+    n = len(cells)
+    rows, cols = walkable.shape
+    d = dist.astype(np.int32)
+    d[d < 0] = 1 << 20
+
+    # Offset from each source cell to each target, for the tie-break
+    grid_r, grid_c = np.indices((rows, cols))
+    dr = cells[:, 0, None, None] - grid_r
+    dc = cells[:, 1, None, None] - grid_c
+    vertical = np.abs(dr) >= np.abs(dc)
+    prefer = (vertical & (dr < 0), vertical & (dr > 0), ~vertical & (dc < 0), ~vertical & (dc > 0))
+
+    best = np.zeros((n, rows, cols), dtype=np.uint8)
+    best_score = np.zeros((n, rows, cols), dtype=np.int8)
+    for code, ((sr, sc), pref) in enumerate(zip(STEPS, prefer)):
+        neighbor = np.full_like(d, 1 << 20)
+        neighbor[:, max(0, -sr):rows - max(0, sr), max(0, -sc):cols - max(0, sc)] = \
+            d[:, max(0, sr):rows + min(0, sr), max(0, sc):cols + min(0, sc)]
+        score = (neighbor == d - 1).astype(np.int8) * (1 + pref.astype(np.int8))
+        better = score > best_score
+        best[better] = code
+        best_score[better] = score[better]
+    return best[:, cells[:, 0], cells[:, 1]]
+
+
+def pack_codes(codes):
+    """Pack (N, N) 2-bit codes into (N, ceil(N/4)) bytes, 4 sources per byte."""
+    n = codes.shape[0]
+    padded = np.zeros((n, -(-n // 4) * 4), dtype=np.uint8)
+    padded[:, :n] = codes
+    quads = padded.reshape(n, -1, 4)
+    return quads[..., 0] | quads[..., 1] << 2 | quads[..., 2] << 4 | quads[..., 3] << 6
+
+
+@lru_cache(maxsize=64)
+def _table_for(connected_rows, cols):
+    walkable = np.asarray(decode_grid(connected_rows, cols), dtype=bool)
+    return int(walkable.sum()), pack_codes(next_hop_codes(walkable)).tobytes()
+
+
+def build_nexthop(collision_data):
+    """Stamp nav["nextHop"] keys in place and return the sidecar bytes."""
+    cols = collision_data.get("gridCols") or len(collision_data["areas"][0]["grid"][0])
+    entries = []
+    for area in collision_data.get("areas", []):
+        nav = area.get("nav")
+        if not nav:
+            continue
+        rows = tuple(nav["connected"])
+        nav["nextHop"] = nexthop_key(rows)
+        cells, table = _table_for(rows, cols)
+        entries.append((area["areaIndex"], cells, nav["nextHop"], table))
+
+    offset = HEADER.size + ENTRY.size * len(entries)
+    directory, tables = [], []
+    for area_index, cells, key, table in entries:
+        directory.append(ENTRY.pack(area_index, 0, cells, key, offset, len(table)))
+        tables.append(table)
+        offset += len(table)
+    return HEADER.pack(MAGIC, VERSION, len(entries), 0) + b"".join(directory) + b"".join(tables)
+
+
+def save_nexthop_file(path, collision_data):
+    """Write the sidecar for a stage (temp file + rename) and stamp nav keys."""
+    data = build_nexthop(collision_data)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+def read_nexthop_file(path):
+    """Parse a sidecar into {areaIndex: (cells, key, (N, ceil(N/4)) uint8 table)}."""
+    data = path.read_bytes()
+    magic, version, count, _ = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path.name}: not a v{VERSION} next-hop file")
+    areas = {}
+    for i in range(count):
+        area_index, _, cells, key, offset, length = ENTRY.unpack_from(data, HEADER.size + i * ENTRY.size)
+        table = np.frombuffer(data, dtype=np.uint8, count=length, offset=offset).reshape(cells, -1)
+        areas[area_index] = (cells, key, table)
+    return areas
+
+
+def lookup(table, target, source):
+    """Step code from source toward target (cell numbers), as the game reads it."""
+    return (table[target, source >> 2] >> ((source & 3) * 2)) & 3
+
+
+def verify_area(walkable, table, samples=2000, seed=0):
+    """Follow table steps between random cell pairs; returns mismatches vs BFS length."""
+    cells, dist = all_pairs_distance(walkable)
+    index = {tuple(cell): i for i, cell in enumerate(cells.tolist())}
+    rng = np.random.default_rng(seed)
+    bad = 0
+    for t, s in rng.integers(0, len(cells), size=(samples, 2)):
+        r, c = cells[s]
+        hops = 0
+        while (r, c) != tuple(cells[t]) and hops <= walkable.size:
+            dr, dc = STEPS[lookup(table, t, index[(r, c)])]
+            r, c = r + dr, c + dc
+            if not walkable[r, c]:
+                break
+            hops += 1
+        bad += (r, c) != tuple(cells[t]) or hops != dist[t, cells[s][0], cells[s][1]]
+    return bad
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Collision Next-Hop Tables")
+    print("=" * 60)
+
+    target_stages = sys.argv[1:] or None
+    for path in sorted(COLLISION_DIR.glob("collision_*.json")):
+        stage_id = path.stem[len("collision_"):]
+        if target_stages and stage_id not in target_stages:
+            continue
+        data = load_collision_file(path)
+        start = time.perf_counter()
+        out_path = nexthop_path(stage_id)
+        size = save_nexthop_file(out_path, data)
+        elapsed = (time.perf_counter() - start) * 1000
+        save_collision_file(path, data)
+
+        bad = 0
+        for area_index, (cells, _, table) in read_nexthop_file(out_path).items():
+            area = next(a for a in data["areas"] if a["areaIndex"] == area_index)
+            walkable = np.asarray(decode_grid(area["nav"]["connected"], len(area["grid"][0])), dtype=bool)
+            bad += verify_area(walkable, table)
+        cells = [c for c, _, _ in read_nexthop_file(out_path).values()]
+        print(f"  {out_path.name:<26} {len(cells)} areas, {min(cells)}-{max(cells)} cells, "
+              f"{size / 1024:6.1f} KB, {elapsed:6.0f} ms, {bad} path mismatches")
+
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Stellar Gunners - Collision Wall Rectangles
+Merges the blocked cells of each collision area into a small set of
+non-overlapping axis-aligned rectangles, stored per area as "wallRects"
+([[row, col, w, h], ...] in cells), so CollisionMapManager can create one
+static body per rectangle without merging at load time.
+
+Three greedy partitions are tried and the one with the fewest rectangles wins:
+  - row scan:     expand right, then down (what CollisionMapManager.mergeWallRects does)
+  - column scan:  expand down, then right
+  - largest-first: repeatedly take the largest all-wall rectangle (histogram method)
+
+Usage:
+  python tools/collision_rects.py [stage_id ...]   # Add/refresh wallRects, print body-count stats
+"""
+
+import sys
+
+from collision_format import COLLISION_DIR, load_collision_file, save_collision_file
+
+
+def _scan_rects(grid, transpose=False):
+    """Greedy scan partition: grow along the primary axis, then the secondary one."""
+    cells = [list(r) for r in zip(*grid)] if transpose else [list(r) for r in grid]
+    rows, cols = len(cells), len(cells[0])
+    used = [[False] * cols for _ in range(rows)]
+    rects = []
+    for r in range(rows):
+        for c in range(cols):
+            if not cells[r][c] or used[r][c]:
+                continue
+            w = 0
+            while c + w < cols and cells[r][c + w] and not used[r][c + w]:
+                w += 1
+            h = 1
+            while r + h < rows and all(cells[r + h][cc] and not used[r + h][cc] for cc in range(c, c + w)):
+                h += 1
+            for rr in range(r, r + h):
+                for cc in range(c, c + w):
+                    used[rr][cc] = True
+            rects.append([c, r, h, w] if transpose else [r, c, w, h])
+    return rects
+
+
+def _largest_rect(free):
+    """Largest all-True rectangle in a 2D bool list (histogram + stack). Returns [r, c, w, h] or None."""
+    rows, cols = len(free), len(free[0])
+    heights = [0] * cols
+    best, best_area = None, 0
+    for r in range(rows):
+        for c in range(cols):
+            heights[c] = heights[c] + 1 if free[r][c] else 0
+        stack = []
+        for c in range(cols + 1):
+            h = heights[c] if c < cols else 0
+            start = c
+            while stack and stack[-1][1] >= h:
+                start, sh = stack.pop()
+                area = sh * (c - start)
+                if area > best_area:
+                    best_area = area
+                    best = [r - sh + 1, start, c - start, sh]
+            stack.append((start, h))
+    return best
+
+
+def _largest_first_rects(grid):
+    free = [[bool(v) for v in row] for row in grid]
+    rects = []
+    while True:
+        rect = _largest_rect(free)
+        if rect is None:
+            return rects
+        r, c, w, h = rect
+        for rr in range(r, r + h):
+            for cc in range(c, c + w):
+                free[rr][cc] = False
+        rects.append(rect)
+
+
+def merge_wall_rects(grid):
+    """Fewest-rectangle partition of the wall cells among the greedy strategies."""
+    candidates = [_scan_rects(grid), _scan_rects(grid, transpose=True), _largest_first_rects(grid)]
+    return min(candidates, key=len)
+
+
+def add_rects_to_area(area):
+    """Store wallRects on one area. Returns (cells, runtime_rects, merged_rects)."""
+    grid = area["grid"]
+    rects = merge_wall_rects(grid)
+    area["wallRects"] = rects
+    return sum(map(sum, grid)), len(_scan_rects(grid)), len(rects)
+
+
+def add_rects_to_stage(collision_data):
+    """add_rects_to_area for every area. Returns the list of per-area stats."""
+    return [add_rects_to_area(area) for area in collision_data.get("areas", [])]
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Collision Wall Rectangles")
+    print("=" * 60)
+    print(f"  {'stage':<12} {'wall cells':>10} {'runtime':>8} {'merged':>7} {'vs cells':>9}")
+
+    target_stages = sys.argv[1:] or None
+    totals = [0, 0, 0]
+    for path in sorted(COLLISION_DIR.glob("collision_*.json")):
+        stage_id = path.stem[len("collision_"):]
+        if target_stages and stage_id not in target_stages:
+            continue
+        data = load_collision_file(path)
+        stats = add_rects_to_stage(data)
+        save_collision_file(path, data)
+
+        cells, runtime, merged = (sum(s[i] for s in stats) for i in range(3))
+        totals = [totals[0] + cells, totals[1] + runtime, totals[2] + merged]
+        print(f"  {stage_id:<12} {cells:>10} {runtime:>8} {merged:>7} {cells - merged:>+9}")
+
+    cells, runtime, merged = totals
+    if cells:
+        print(f"\n  Total: {cells} wall cells -> {merged} bodies "
+              f"({cells - merged} eliminated vs per-cell, {runtime - merged} vs runtime row-scan merge)")
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Stellar Gunners - Collision Grid Repair
+NumPy engine that makes raw collision grids playable (1 = wall):
+  1. Clear a spawn block at the grid center
+  2. Label walkable components (scanline union-find over horizontal runs)
+  3. For every edge with too few reachable cells, carve the corridor that
+     removes the fewest walls between the spawn component and that edge
+  4. Cap wall density, removing interior walls in seeded random order
+
+Grids are processed as a (count, rows, cols) batch so every step is one array
+operation for all maps; repair_grid() is the single-map wrapper. Any grid size
+works: the spawn block and edge openings scale relative to the 30x22 game grid.
+Same grid + seed always gives the same result, batched or not.
+
+Usage:
+  python tools/collision_repair.py [--bench N] [--size COLSxROWS]   # Benchmark on random grids
+"""
+
+import sys
+import time
+
+import numpy as np
+
+BASE_COLS = 30
+BASE_ROWS = 22
+
+SPAWN_ROWS = 4           # Spawn block at 30x22 (rows center-2..center+1)
+SPAWN_COLS = 6           # (cols center-3..center+2)
+EDGE_OPENING = 2         # Edge cells cleared on each side of a carved corridor's exit
+MIN_EDGE_CELLS = 2       # Each edge needs at least this many reachable cells
+MAX_DENSITY = 0.40       # Above this, walls are removed...
+TARGET_DENSITY = 0.35    # ...down to this
+CHUNK_CELLS = 1 << 17    # Cells per batch chunk (keeps the working set cache-sized)
+
+EDGES = ('top', 'bottom', 'left', 'right')
+_NEIGHBORS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def _scaled(value, cells, base):
+    return max(1, round(value * cells / base))
+
+
+# ============================================================
+# Connected components
+# ============================================================
+
+def label_components(walkable):
+    """4-connected component labels for walkable cells (-1 for walls).
+
+    Accepts one grid or a (count, rows, cols) batch; components never span maps.
+    Scanline union-find: every horizontal run of walkable cells is a node,
+    vertically touching runs are unioned by hooking the larger root onto the
+    smaller and pointer jumping until stable. Labels are root run ids.
+    """
+    walkable = np.asarray(walkable, dtype=bool)
+    starts = walkable.copy()
+    starts[..., 1:] &= ~walkable[..., :-1]
+    run_id = np.cumsum(starts.ravel()).reshape(walkable.shape) - 1
+    vert = walkable[..., :-1, :] & walkable[..., 1:, :]
+    u, v = run_id[..., :-1, :][vert], run_id[..., 1:, :][vert]
+
+    parent = np.arange(int(starts.sum()))
+    if parent.size == 0:
+        return np.full(walkable.shape, -1)
+    while True:
+        pu, pv = parent[u], parent[v]
+        diff = pu != pv
+        if not diff.any():
+            break
+        np.minimum.at(parent, np.maximum(pu[diff], pv[diff]), np.minimum(pu[diff], pv[diff]))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+    return np.where(walkable, parent[np.maximum(run_id, 0)], -1)
+
+
+def _center_component(walls):
+    """Walkable cells connected to each map's center cell, for a (count, rows, cols) batch."""
+    labels = label_components(~walls)
+    center = labels[:, walls.shape[1] // 2, walls.shape[2] // 2][:, None, None]
+    return (labels == center) & (center >= 0)
+
+
+def _edge_view(a, edge):
+    """(count, length) view of one edge of a batch."""
+    if edge == 'top':
+        return a[:, 0, :]
+    if edge == 'bottom':
+        return a[:, -1, :]
+    if edge == 'left':
+        return a[:, :, 0]
+    return a[:, :, -1]
+
+
+def _edge_cell(shape, edge, i):
+    rows, cols = shape
+    return {'top': (0, i), 'bottom': (rows - 1, i), 'left': (i, 0), 'right': (i, cols - 1)}[edge]
+
+
+# ============================================================
+# Corridor carving
+# ============================================================
+
+def _sweep(d, prefix, axis, reverse):
+    """One directional min-plus pass: d[i] = min over j before i of d[j] + cost(j+1..i).
+
+    With prefix sums P of the cost this is P[i] + cummin(d - P), so whole rows
+    (or columns) of every map relax in a single vectorized step.
+    """
+    if reverse:
+        d = np.flip(d, axis)
+    out = np.minimum(d, prefix + np.minimum.accumulate(d - prefix, axis=axis))
+    return np.flip(out, axis) if reverse else out
+
+
+def wall_cost_field(walls, sources):
+    """Cost to reach each cell from the source mask: walls crossed first, then steps.
+
+    Entering a cell costs 1 step plus rows*cols + 1 if it is a wall, so the
+    field is strictly decreasing along any optimal path back to the sources.
+    Each map converges in (turns on its optimal paths + 1) rounds of four
+    sweeps and drops out of the active set once stable.
+    Returns (d, cost), both shaped like walls (count, rows, cols).
+    """
+    cells = walls.shape[-1] * walls.shape[-2]
+    # int32 halves memory traffic; costs peak near cells**2 (every cell a wall)
+    dtype = np.int32 if (cells + 2) ** 2 < 1 << 29 else np.int64
+    inf = dtype(1 << 29) if dtype is np.int32 else dtype(1 << 50)
+    cost = 1 + walls.astype(dtype) * dtype(cells + 1)
+    prefixes = [(axis, reverse, np.cumsum(np.flip(cost, axis) if reverse else cost, axis=axis))
+                for axis in (-2, -1) for reverse in (False, True)]
+    d = np.where(sources, 0, inf)
+    active = np.arange(len(d))
+    while active.size:
+        prev = cur = d[active]
+        for axis, reverse, prefix in prefixes:
+            cur = _sweep(cur, prefix[active], axis, reverse)
+        d[active] = cur
+        changed = (cur != prev).any(axis=(1, 2))
+        active = active[changed]
+    return d, cost
+
+
+def _carve_edge(walls, reachable, edge, opening):
+    """Carve the cheapest corridor to one edge on every map of the batch, in place."""
+    d, cost = wall_cost_field(walls, reachable)
+    edge_d = _edge_view(d, edge)
+    length = edge_d.shape[1]
+    # Cheapest exit; ties go to the cell nearest the middle of the edge
+    offset = np.abs(np.arange(length) - length // 2)
+    exits = np.argmin(edge_d.astype(np.int64) * (length + 1) + offset, axis=1)
+    rows, cols = walls.shape[1:]
+
+    for m, k in enumerate(exits.tolist()):
+        dm, cm, wm, rm = d[m], cost[m], walls[m], reachable[m]
+        if not rm.any():
+            # Nothing to walk back to: the corridor walk below would never end
+            raise ValueError("No walkable cells reachable from the spawn block to carve from")
+        r, c = _edge_cell((rows, cols), edge, k)
+        while not rm[r, c]:
+            wm[r, c] = False
+            for dr, dc in _NEIGHBORS:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < rows and 0 <= nc < cols and dm[nr, nc] + cm[r, c] == dm[r, c]:
+                    r, c = nr, nc
+                    break
+        lo, hi = max(0, k - opening), min(length, k + opening + 1)
+        _edge_view(walls, edge)[m, lo:hi] = False
+
+
+# ============================================================
+# Repair
+# ============================================================
+
+def repair_grids(grids, seeds=None):
+    """Repair a batch of same-sized grids (1 = wall). Returns an int8 (count, rows, cols) array.
+
+    seeds: per-grid ints for the density cap (default: grid index).
+    """
+    walls = np.array(grids, dtype=bool)
+    count, rows, cols = walls.shape
+    seeds = list(range(count) if seeds is None else seeds)
+    chunk = max(1, CHUNK_CELLS // (rows * cols))
+    if count > chunk:
+        return np.concatenate([repair_grids(walls[i:i + chunk], seeds[i:i + chunk])
+                               for i in range(0, count, chunk)])
+    center_r, center_c = rows // 2, cols // 2
+
+    # 1. Spawn block (at least 2x2 around the center, so the center cell is always floor)
+    half_h = max(1, _scaled(SPAWN_ROWS, rows, BASE_ROWS) // 2)
+    half_w = max(1, _scaled(SPAWN_COLS, cols, BASE_COLS) // 2)
+    walls[:, max(0, center_r - half_h):center_r + half_h, max(0, center_c - half_w):center_c + half_w] = False
+
+    # 2-3. Edge reachability (only maps that need a corridor are carved and relabeled)
+    min_edge = _scaled(MIN_EDGE_CELLS, cols, BASE_COLS)
+    opening = _scaled(EDGE_OPENING, cols, BASE_COLS)
+    reachable = _center_component(walls)
+    for edge in EDGES:
+        need = np.flatnonzero(_edge_view(reachable, edge).sum(axis=1) < min_edge)
+        if need.size:
+            sub_walls, sub_reach = walls[need], reachable[need]
+            _carve_edge(sub_walls, sub_reach, edge, opening)
+            walls[need] = sub_walls
+            reachable[need] = _center_component(sub_walls)
+
+    # 4. Density cap (interior walls only, seeded order)
+    target = int(rows * cols * TARGET_DENSITY)
+    wall_counts = walls.sum(axis=(1, 2))
+    for m in np.flatnonzero(wall_counts > rows * cols * MAX_DENSITY):
+        interior = np.zeros((rows, cols), dtype=bool)
+        interior[1:-1, 1:-1] = walls[m, 1:-1, 1:-1]
+        rng = np.random.default_rng(seeds[m])
+        drop = rng.permutation(np.flatnonzero(interior))[:wall_counts[m] - target]
+        walls[m].ravel()[drop] = False
+
+    return walls.astype(np.int8)
+
+
+def repair_grid(grid, seed=0):
+    """Repair one grid (list or array, 1 = wall). Returns an int8 (rows, cols) array."""
+    return repair_grids([grid], [seed])[0]
+
+
+def edge_reach_counts(grid):
+    """Cells reachable from the grid center on each edge: {'top', 'bottom', 'left', 'right'}."""
+    reachable = _center_component(np.asarray(grid)[None] != 0)
+    return {edge: int(_edge_view(reachable, edge).sum()) for edge in EDGES}
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def random_grids(rng, count, cols, rows):
+    """Blobby random grids for benchmarking: upscaled coarse noise plus speckle."""
+    blob = max(1, cols // 15)
+    density = rng.uniform(0.2, 0.55, size=(count, 1, 1))
+    coarse = rng.random((count, rows // blob + 1, cols // blob + 1)) < density
+    grids = np.kron(coarse, np.ones((1, blob, blob), dtype=bool))[:, :rows, :cols]
+    return grids ^ (rng.random((count, rows, cols)) < 0.03)
+
+
+def benchmark(count, cols, rows):
+    """Repair count random grids (batched and one by one) and check the invariants."""
+    grids = random_grids(np.random.default_rng(1234), count, cols, rows)
+    min_edge = _scaled(MIN_EDGE_CELLS, cols, BASE_COLS)
+
+    start = time.perf_counter()
+    repaired = repair_grids(grids)
+    batched = time.perf_counter() - start
+
+    single_count = min(count, 200)
+    start = time.perf_counter()
+    singles = [repair_grid(grids[i], seed=i) for i in range(single_count)]
+    single = (time.perf_counter() - start) / single_count * count
+
+    failures = sum(not np.array_equal(repaired[i], singles[i]) for i in range(single_count))
+    for out in repaired:
+        if min(edge_reach_counts(out).values()) < min_edge or out.mean() > MAX_DENSITY:
+            failures += 1
+    print(f"  {cols}x{rows}: {count} grids batched {batched * 1000:.0f} ms "
+          f"({count / batched:,.0f} grids/s), one-by-one {count / single:,.0f} grids/s, "
+          f"{failures} invariant failures")
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Collision Grid Repair")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    count = 2000
+    sizes = [(BASE_COLS, BASE_ROWS), (BASE_COLS * 4, BASE_ROWS * 4)]
+    i = 0
+    while i < len(args):
+        if args[i] == "--bench" and i + 1 < len(args):
+            count = int(args[i + 1])
+            i += 2
+        elif args[i] == "--size" and i + 1 < len(args):
+            cols, rows = args[i + 1].lower().split("x")
+            sizes = [(int(cols), int(rows))]
+            i += 2
+        else:
+            i += 1
+
+    for cols, rows in sizes:
+        benchmark(count, cols, rows)
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
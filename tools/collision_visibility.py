@@ -0,0 +1,229 @@
+"""
+Stellar Gunners - Collision Visibility Tables
+Precomputes cell-to-cell line of sight over each area's connected walkable
+cells, so stationary shooters can check whether walls block their shot with
+one bit lookup (CollisionMapManager.hasLineOfSight) instead of a raycast.
+
+Cells are numbered as in collision_nexthop.py (row-major over the nav
+"connected" mask). Two cells see each other if the segment between their
+centers touches no wall cell: supercover traversal, stepping one cell at a
+time and, where the segment passes exactly through a grid corner, requiring
+both cells beside the corner to be open (a shot cannot squeeze through a
+diagonal wall joint). The test is symmetric, so only pairs a < b are traced
+and the result is mirrored.
+
+Sidecar file visibility_<stage_id>.bin (little-endian):
+  header    "SGVS", u8 version, u8 area count, u16 reserved
+  directory per area, 16 bytes: u8 areaIndex, u8 reserved, u16 cells (N),
+            u32 key, u32 offset, u32 length
+  bitsets   N rows of ceil(N/8) bytes; cell b is bit b%8 of byte b//8 in row a
+
+key matches nav["visibility"] in the collision JSON (crc32 of the area's
+"connected" rows, as for next-hop tables); a stale sidecar is ignored.
+
+Usage:
+  python tools/collision_visibility.py [stage_id ...]   # Write sidecars for existing maps, benchmark bytes vs lookup speed
+"""
+
+import os
+import struct
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from collision_format import COLLISION_DIR, decode_grid, encode_grid, load_collision_file, save_collision_file
+from collision_nexthop import nexthop_key
+
+MAGIC = b"SGVS"
+VERSION = 1
+HEADER = struct.Struct("<4sBBH")
+ENTRY = struct.Struct("<BBHIII")
+
+
+def visibility_path(stage_id):
+    return COLLISION_DIR / f"visibility_{stage_id}.bin"
+
+
+def trace_pairs(walls, a, b):
+    """Supercover line of sight between cell centers for arrays of (row, col) pairs.
+
+    walls: (rows, cols) bool; a, b: (P, 2) int cell coordinates.
+    Returns (P,) bool, True where no wall cell lies on the segment.
+    """
+    y, x = a[:, 0].copy(), a[:, 1].copy()
+    ny, nx = np.abs(b[:, 0] - y), np.abs(b[:, 1] - x)
+    sy, sx = np.sign(b[:, 0] - y), np.sign(b[:, 1] - x)
+    iy = np.zeros_like(y)
+    ix = np.zeros_like(x)
+    clear = ~walls[y, x]
+
+    active = np.flatnonzero(clear & ((nx > 0) | (ny > 0)))
+    while active.size:
+        cy, cx, cny, cnx, ciy, cix = y[active], x[active], ny[active], nx[active], iy[active], ix[active]
+        # Sign of where the segment leaves the current cell: <0 side wall, >0 top/bottom, 0 corner
+        decision = (1 + 2 * cix) * cny - (1 + 2 * ciy) * cnx
+        step_x = decision <= 0
+        step_y = decision >= 0
+        corner = step_x & step_y
+        if corner.any():
+            # Both cells beside the corner must be open
+            k = np.flatnonzero(corner)
+            side = walls[cy[k], cx[k] + sx[active][k]] | walls[cy[k] + sy[active][k], cx[k]]
+            clear[active[k[side]]] = False
+        cx = cx + sx[active] * step_x
+        cy = cy + sy[active] * step_y
+        x[active], y[active] = cx, cy
+        ix[active] = cix + step_x
+        iy[active] = ciy + step_y
+        clear[active] &= ~walls[cy, cx]
+        active = active[clear[active] & ((ix[active] < nx[active]) | (iy[active] < ny[active]))]
+    return clear
+
+
+def visibility_matrix(walkable, walls=None):
+    """(N, N) bool line of sight between the walkable cells (row-major numbering)."""
+    walls = ~walkable if walls is None else walls
+    cells = np.argwhere(walkable)
+    n = len(cells)
+    ia, ib = np.triu_indices(n, k=1)
+    seen = np.eye(n, dtype=bool)
+    seen[ia, ib] = trace_pairs(walls, cells[ia], cells[ib])
+    seen[ib, ia] = seen[ia, ib]
+    return seen
+
+
+def pack_bits(matrix):
+    """Pack an (N, N) bool matrix into (N, ceil(N/8)) bytes, LSB first."""
+    return np.packbits(matrix, axis=1, bitorder="little")
+
+
+@lru_cache(maxsize=64)
+def _table_for(connected_rows, grid_rows, cols):
+    walkable = np.asarray(decode_grid(connected_rows, cols), dtype=bool)
+    walls = np.asarray(decode_grid(grid_rows, cols), dtype=bool)
+    return int(walkable.sum()), pack_bits(visibility_matrix(walkable, walls)).tobytes()
+
+
+def build_visibility(collision_data):
+    """Stamp nav["visibility"] keys in place and return the sidecar bytes."""
+    cols = collision_data.get("gridCols") or len(collision_data["areas"][0]["grid"][0])
+    entries = []
+    for area in collision_data.get("areas", []):
+        nav = area.get("nav")
+        if not nav:
+            continue
+        rows = tuple(nav["connected"])
+        nav["visibility"] = nexthop_key(rows)
+        cells, table = _table_for(rows, tuple(encode_grid(area["grid"])), cols)
+        entries.append((area["areaIndex"], cells, nav["visibility"], table))
+
+    offset = HEADER.size + ENTRY.size * len(entries)
+    directory, tables = [], []
+    for area_index, cells, key, table in entries:
+        directory.append(ENTRY.pack(area_index, 0, cells, key, offset, len(table)))
+        tables.append(table)
+        offset += len(table)
+    return HEADER.pack(MAGIC, VERSION, len(entries), 0) + b"".join(directory) + b"".join(tables)
+
+
+def save_visibility_file(path, collision_data):
+    """Write the sidecar for a stage (temp file + rename) and stamp nav keys."""
+    data = build_visibility(collision_data)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+def read_visibility_file(path):
+    """Parse a sidecar into {areaIndex: (cells, key, (N, ceil(N/8)) uint8 bitsets)}."""
+    data = path.read_bytes()
+    magic, version, count, _ = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path.name}: not a v{VERSION} visibility file")
+    areas = {}
+    for i in range(count):
+        area_index, _, cells, key, offset, length = ENTRY.unpack_from(data, HEADER.size + i * ENTRY.size)
+        table = np.frombuffer(data, dtype=np.uint8, count=length, offset=offset).reshape(cells, -1)
+        areas[area_index] = (cells, key, table)
+    return areas
+
+
+def can_see(table, a, b):
+    """Line of sight between cell numbers a and b, as the game reads it."""
+    return bool((table[a, b >> 3] >> (b & 7)) & 1)
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def benchmark_area(walkable, walls, table, queries=20000, seed=0):
+    """Compare table lookups with per-query raycasts on random cell pairs.
+
+    Returns (lookup_us, raycast_us, mismatches).
+    """
+    cells = np.argwhere(walkable)
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, len(cells), size=(queries, 2)).tolist()
+
+    start = time.perf_counter()
+    looked_up = [can_see(table, a, b) for a, b in pairs]
+    lookup_us = (time.perf_counter() - start) * 1e6 / queries
+
+    start = time.perf_counter()
+    traced = [bool(trace_pairs(walls, cells[a][None], cells[b][None])[0]) for a, b in pairs]
+    raycast_us = (time.perf_counter() - start) * 1e6 / queries
+
+    return lookup_us, raycast_us, sum(p != q for p, q in zip(looked_up, traced))
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Collision Visibility Tables")
+    print("=" * 60)
+
+    target_stages = sys.argv[1:] or None
+    total_bits = total_bytes = 0
+    for path in sorted(COLLISION_DIR.glob("collision_*.json")):
+        stage_id = path.stem[len("collision_"):]
+        if target_stages and stage_id not in target_stages:
+            continue
+        data = load_collision_file(path)
+        start = time.perf_counter()
+        out_path = visibility_path(stage_id)
+        size = save_visibility_file(out_path, data)
+        elapsed = (time.perf_counter() - start) * 1000
+        save_collision_file(path, data)
+
+        lookup_us = raycast_us = 0.0
+        bad = visible = pairs = 0
+        tables = read_visibility_file(out_path)
+        for area_index, (cells, _, table) in tables.items():
+            area = next(a for a in data["areas"] if a["areaIndex"] == area_index)
+            cols = len(area["grid"][0])
+            walkable = np.asarray(decode_grid(area["nav"]["connected"], cols), dtype=bool)
+            walls = np.asarray(area["grid"], dtype=bool)
+            lu, rc, mismatches = benchmark_area(walkable, walls, table, queries=5000)
+            lookup_us += lu / len(tables)
+            raycast_us += rc / len(tables)
+            bad += mismatches
+            visible += int(np.unpackbits(table, axis=1, count=cells, bitorder="little").sum())
+            pairs += cells * cells
+            total_bytes += cells * cells
+        total_bits += size
+        print(f"  {out_path.name:<29} {size / 1024:6.1f} KB ({pairs / 1024:6.1f} KB as bytes), "
+              f"{visible / pairs * 100:4.1f}% visible, {elapsed:5.0f} ms, "
+              f"lookup {lookup_us:.2f} us vs raycast {raycast_us:.1f} us, {bad} mismatches")
+
+    if total_bytes:
+        print(f"\n  Packed bits: {total_bits / 1024:.0f} KB total "
+              f"(one byte per pair would be {total_bytes / 1024:.0f} KB)")
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Stellar Gunners - Async Gemini Client
+asyncio client for Gemini generateContent shared by concurrent callers:
+  - token bucket on requests per minute (RPM) plus a cap on requests in flight
+  - 429/5xx retries honoring Retry-After (header or the RetryInfo retryDelay in
+    the error body); a 429 pauses the shared bucket so every caller backs off
+    together instead of each sleeping a fixed 90-360s
+  - each call runs GeminiClient.request (gemini_client.py) on a worker thread,
+    over one pooled session: retries, backoff and call metrics are the
+    blocking client's, with the bucket as its limiter
+
+Usage:
+  python tools/gemini_async.py [--requests 60] [--rpm 120] [--in-flight 8]
+                               [--stub-rpm 100] [--latency 0.5]
+      Benchmark against a local stub server (gemini_stub.py)
+"""
+
+import asyncio
+import sys
+import time
+
+from gemini_client import GeminiClient, GeminiError
+
+
+class TokenBucket:
+    """Async token bucket: rpm tokens per minute, at most burst stored."""
+
+    def __init__(self, rpm, burst=1):
+        self.rate = rpm / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for seconds (server said we are over quota)."""
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self._refill(now)
+        self.tokens = 0.0
+
+
+class LoopLimiter:
+    """TokenBucket on an event loop, usable from GeminiClient's worker threads."""
+
+    def __init__(self, bucket, loop):
+        self.bucket = bucket
+        self.loop = loop
+
+    def wait(self):
+        asyncio.run_coroutine_threadsafe(self.bucket.acquire(), self.loop).result()
+
+    def pause(self, seconds):
+        self.loop.call_soon_threadsafe(self.bucket.pause, seconds)
+
+
+class AsyncGeminiClient:
+    """Rate-limited generateContent client for use from many coroutines at once."""
+
+    def __init__(self, endpoint, api_key, rpm=10, max_in_flight=4, burst=1,
+                 timeout=180, max_retries=4):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.timeout = timeout
+        self.bucket = TokenBucket(rpm, burst)
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.client = GeminiClient(api_key, max_retries=max_retries, pool_size=max_in_flight,
+                                   log_retries=False)
+        self.metrics = self.client.metrics
+
+    @property
+    def stats(self):
+        return self.metrics.counts
+
+    async def generate(self, payload, label="generateContent"):
+        """POST payload and return the parsed JSON response. Raises GeminiError."""
+        return await self._call(payload, label, lambda response: response.json())
+
+    async def generate_stream(self, payload, handle, label="generateContent"):
+        """POST payload and return handle(response), called on the worker thread
+        with the body not yet read (e.g. inline_stream.stream_inline_image).
+        A connection error while handle reads is retried like any other."""
+        return await self._call(payload, label, handle)
+
+    async def _call(self, payload, label, read):
+        if not self.api_key:
+            raise GeminiError("No API key configured")
+        if self.client.limiter is None:
+            self.client.limiter = LoopLimiter(self.bucket, asyncio.get_running_loop())
+        async with self.in_flight:
+            return await asyncio.to_thread(self.client.request, "POST", self.endpoint, label,
+                                           timeout=self.timeout, json=payload, stream=True,
+                                           read=read)
+
+
+def response_text(result):
+    """Concatenated text parts of the first candidate ("" if none)."""
+    candidates = result.get("candidates", [])
+    if not candidates:
+        return ""
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+async def _bench_requests(client, count):
+    payloads = [{"contents": [{"parts": [{"text": f"bench request {i}"}]}]} for i in range(count)]
+    results = await asyncio.gather(*(client.generate(p) for p in payloads), return_exceptions=True)
+    return sum(not isinstance(r, Exception) for r in results)
+
+
+def benchmark(count, rpm, in_flight, stub_rpm, latency):
+    from gemini_stub import start_stub_server
+
+    server, base_url = start_stub_server(rpm=stub_rpm, latency=latency)
+    endpoint = f"{base_url}/v1beta/models/stub:generateContent"
+    try:
+        async def run():
+            client = AsyncGeminiClient(endpoint, "stub", rpm=rpm, max_in_flight=in_flight)
+            start = time.perf_counter()
+            ok = await _bench_requests(client, count)
+            return client, ok, time.perf_counter() - start
+
+        client, ok, elapsed = asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    serial = count * (latency + 15)  # previous loop: one call, then a fixed 15s sleep
+    print(f"  Client: {rpm} RPM, {in_flight} in flight | Stub: {stub_rpm} RPM quota, {latency}s latency")
+    print(f"  {ok}/{count} ok in {elapsed:.1f}s ({ok / elapsed * 60:.0f} req/min), "
+          f"peak in flight {server.state.stats['peak_in_flight']}")
+    print(f"  Client stats: {client.stats}")
+    print(f"  Stub stats:   {server.state.stats}")
+    print(f"  Serial with 15s spacing would take ~{serial:.0f}s ({elapsed / serial * 100:.1f}% of that)")
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Async Gemini Client Benchmark")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    options = {"--requests": 60, "--rpm": 120, "--in-flight": 8, "--stub-rpm": 100, "--latency": 0.5}
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = type(options[args[i]])(args[i + 1])
+            i += 2
+        else:
+            i += 1
+
+    benchmark(options["--requests"], options["--rpm"], options["--in-flight"],
+              options["--stub-rpm"], options["--latency"])
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
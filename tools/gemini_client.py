@@ -0,0 +1,394 @@
+"""
+Stellar Gunners - Gemini HTTP Client
+Pooled, retrying HTTP client shared by the generate_* tools (image generation,
+VEO clips), and run on worker threads by gemini_async.py:
+  - one requests.Session per client: connections are kept alive and reused
+    instead of a new TCP + TLS handshake per call
+  - retryable errors (429, 408, 5xx, connection errors and timeouts) are
+    retried with exponential backoff and full jitter; a server-given delay
+    (Retry-After header or Gemini RetryInfo) takes precedence. Anything else
+    (400, 403, 404, ...) fails at once with GeminiError
+  - per-label call latency and retry counts, printed by each tool at the end
+    (CallMetrics.report)
+  - streamed downloads (VEO videos) into a .part file that is resumed with an
+    HTTP Range + If-Range (ETag) request after a dropped connection, in this
+    run or the next, checked against the server's size and MD5 (x-goog-hash)
+    and only then renamed into place
+
+Usage:
+  python tools/gemini_client.py [--requests 20] [--latency 0.2] [--stub-rpm 0]
+      Compare pooled vs per-call connections against the local stub (gemini_stub.py)
+  python tools/gemini_client.py --download-mb 8 [--drop-kb 1500]
+      Download from the stub with dropped connections and check the resumed file
+"""
+
+import base64
+import email.utils
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+BACKOFF_BASE = 2.0     # seconds, doubled per attempt when no Retry-After is given
+BACKOFF_MAX = 120.0
+POOL_SIZE = 8          # keep-alive connections per host
+DOWNLOAD_CHUNK = 256 * 1024
+
+
+class GeminiError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def is_retryable(status):
+    """Whether a failed call is worth repeating. status None = no response (network error)."""
+    return status is None or status in RETRYABLE_STATUS
+
+
+def retry_after_seconds(headers, body):
+    """Server-requested delay from a Retry-After header or Gemini RetryInfo, else None."""
+    value = headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            if when is not None:
+                return max(0.0, when.timestamp() - time.time())
+    try:
+        details = json.loads(body).get("error", {}).get("details", [])
+    except (ValueError, AttributeError):
+        return None
+    for detail in details:
+        match = re.fullmatch(r"([\d.]+)s", str(detail.get("retryDelay", "")))
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Exponential backoff with jitter for retry number attempt (0-based)."""
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class CallMetrics:
+    """Request counts and per-label call latencies (seconds, including retries)."""
+
+    def __init__(self):
+        self.counts = {"requests": 0, "ok": 0, "rate_limited": 0, "retries": 0, "errors": 0}
+        self.latencies = {}
+        self.retries = {}
+
+    def record(self, label, seconds, retries):
+        self.latencies.setdefault(label, []).append(seconds)
+        self.retries[label] = self.retries.get(label, 0) + retries
+
+    def report(self):
+        """Lines summarizing calls per label, for the end of a tool run."""
+        lines = []
+        for label, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            p50 = values[len(values) // 2]
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            lines.append(f"{label}: {len(values)} calls, {self.retries[label]} retries, "
+                         f"latency p50 {p50:.2f}s p95 {p95:.2f}s max {values[-1]:.2f}s")
+        c = self.counts
+        lines.append(f"HTTP: {c['requests']} requests, {c['ok']} ok, {c['retries']} retried "
+                     f"({c['rate_limited']} rate limited), {c['errors']} failed calls")
+        return lines
+
+
+class GeminiClient:
+    """Blocking Gemini/VEO client over one pooled keep-alive session."""
+
+    def __init__(self, api_key, max_retries=4, backoff_base=BACKOFF_BASE, pool_size=POOL_SIZE,
+                 limiter=None, log_retries=True):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.limiter = limiter  # optional: wait() before every send, pause(seconds) on a 429
+        self.log_retries = log_retries
+        self.metrics = CallMetrics()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["x-goog-api-key"] = api_key
+
+    def request(self, method, url, label, timeout=180, max_retries=None, ok_status=(200,),
+                read=None, **kwargs):
+        """Send a request, retrying retryable failures. Returns the response
+        once its status is in ok_status, or read(response) if read is given:
+        read gets the body unread (pass stream=True) and a connection error
+        while it reads is retried like any other.
+
+        Raises GeminiError with the last status (None if no response) once
+        retries run out or the error is not retryable.
+        """
+        retries = self.max_retries if max_retries is None else max_retries
+        start = None  # latency counts from the first send, not time spent in the limiter
+        for attempt in range(retries + 1):
+            if self.limiter is not None:
+                self.limiter.wait()
+            start = start or time.perf_counter()
+            self.metrics.counts["requests"] += 1
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+                status, headers, body = response.status_code, response.headers, None
+                if status in ok_status and read is not None:
+                    with response:
+                        response = read(response)
+            except requests.RequestException as e:
+                response, status, headers, body = None, None, {}, str(e)
+
+            if status in ok_status:
+                self.metrics.counts["ok"] += 1
+                self.metrics.record(label, time.perf_counter() - start, attempt)
+                return response
+
+            if response is not None:
+                body = response.text
+                response.close()  # hand the connection back to the pool before retrying
+            error = GeminiError(f"HTTP {status}: {body[:300]}", status)
+            if not is_retryable(status) or attempt == retries:
+                break
+
+            self.metrics.counts["retries"] += 1
+            delay = retry_after_seconds(headers, body)
+            if delay is None:
+                delay = backoff_delay(attempt, self.backoff_base)
+            if status == 429:
+                self.metrics.counts["rate_limited"] += 1
+            if self.log_retries:
+                print(f"  {label}: HTTP {status or 'error'}, retrying in {delay:.0f}s "
+                      f"({attempt + 1}/{retries})...", flush=True)
+            if status == 429 and self.limiter is not None:
+                self.limiter.pause(delay)  # every caller sharing the limiter backs off
+            else:
+                time.sleep(delay)
+
+        self.metrics.counts["errors"] += 1
+        self.metrics.record(label, time.perf_counter() - start, attempt)
+        raise error
+
+    def post_json(self, url, payload, label, timeout=180, **kwargs):
+        """POST a JSON payload and return the parsed JSON response."""
+        return self.request("POST", url, label, timeout=timeout, json=payload, **kwargs).json()
+
+    def get_json(self, url, label, timeout=30, **kwargs):
+        return self.request("GET", url, label, timeout=timeout, **kwargs).json()
+
+    def download(self, url, path, label, timeout=120, max_retries=None, chunk_size=DOWNLOAD_CHUNK):
+        """Stream url to path. Returns the file size.
+
+        Bytes go to .<name>.part next to path, the server's ETag to .<name>.etag;
+        after a dropped connection the part is resumed with a Range request and
+        If-Range on that ETag (also by a later run, from a part left behind), so
+        a changed file is sent whole instead of appended. A part without an
+        ETag cannot be validated and is started over. The finished part must
+        match the server's total size and x-goog-hash MD5, when sent, before it
+        is renamed over path; a mismatch deletes it. Raises GeminiError once
+        retries run out.
+        """
+        path = Path(path)
+        part = path.with_name(f".{path.name}.part")
+        etag_file = path.with_name(f".{path.name}.etag")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        retries = self.max_retries if max_retries is None else max_retries
+        etag = etag_file.read_text(encoding="utf-8").strip() if etag_file.exists() else None
+        md5 = total = None
+
+        for attempt in range(retries + 1):
+            have = part.stat().st_size if part.exists() else 0
+            if have and not etag:
+                part.unlink()  # nothing to check the part against; start over
+                have = 0
+            headers = {}
+            if have:
+                headers["Range"] = f"bytes={have}-"
+                headers["If-Range"] = etag
+            try:
+                response = self.request("GET", url, label, timeout=timeout, stream=True,
+                                        headers=headers, ok_status=(200, 206))
+            except GeminiError as e:
+                if e.status != 416 or not have:
+                    raise
+                part.unlink()  # part is not a prefix of this file; start over
+                continue
+
+            with response:
+                if response.status_code == 206:
+                    total = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+                else:
+                    have = 0  # server ignored the range (or the file changed): full body
+                    length = response.headers.get("Content-Length")
+                    total = int(length) if length else None
+                etag = response.headers.get("ETag")
+                if etag:
+                    etag_file.write_text(etag, encoding="utf-8")
+                else:
+                    etag_file.unlink(missing_ok=True)
+                md5 = _goog_md5(response.headers) or md5
+                try:
+                    with open(part, "ab" if have else "wb") as f:
+                        for chunk in response.iter_content(chunk_size):
+                            f.write(chunk)
+                except requests.RequestException as e:
+                    dropped = e
+                else:
+                    dropped = None
+
+            size = part.stat().st_size
+            if dropped is None and (total is None or size >= total):
+                break
+            if attempt == retries:
+                raise GeminiError(f"Download incomplete after {retries} retries "
+                                  f"({size} of {total or '?'} bytes kept in {part.name})")
+            self.metrics.counts["retries"] += 1
+            delay = backoff_delay(attempt, self.backoff_base)
+            print(f"  {label}: connection dropped at {size / 1024 / 1024:.1f} MB, "
+                  f"resuming in {delay:.0f}s ({attempt + 1}/{retries})...", flush=True)
+            time.sleep(delay)
+        else:
+            raise GeminiError("Download failed: server rejected every range request")
+
+        etag_file.unlink(missing_ok=True)
+        if total is not None and size != total:
+            part.unlink()
+            raise GeminiError(f"Download size mismatch: {size} bytes, expected {total}")
+        if md5 is not None and _file_md5(part) != md5:
+            part.unlink()
+            raise GeminiError("Download checksum mismatch (x-goog-hash md5)")
+        os.replace(part, path)
+        return size
+
+
+def _goog_md5(headers):
+    """base64 MD5 from an x-goog-hash header ("crc32c=...,md5=..."), or None."""
+    for item in headers.get("x-goog-hash", "").split(","):
+        key, _, value = item.strip().partition("=")
+        if key == "md5":
+            return value
+    return None
+
+
+def _file_md5(path):
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return base64.b64encode(h.digest()).decode()
+
+
+_clients = {}
+
+
+def shared_client(api_key, **options):
+    """One client (and connection pool) per API key for the whole process."""
+    if api_key not in _clients:
+        _clients[api_key] = GeminiClient(api_key, **options)
+    return _clients[api_key]
+
+
+def shared_report():
+    """Metrics report lines for every shared client that made calls this run."""
+    return [line for client in _clients.values() if client.metrics.latencies
+            for line in client.metrics.report()]
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def benchmark(count, latency, stub_rpm):
+    from gemini_stub import start_stub_server
+
+    server, base_url = start_stub_server(rpm=stub_rpm, latency=latency)
+    endpoint = f"{base_url}/v1beta/models/stub:generateContent"
+    payload = {"contents": [{"parts": [{"text": "bench"}]}]}
+    try:
+        start = time.perf_counter()
+        for _ in range(count):
+            requests.post(endpoint, headers={"x-goog-api-key": "stub", "Connection": "close"},
+                          json=payload, timeout=30)
+        per_call = time.perf_counter() - start
+        connections_before = server.state.stats.get("connections", 0)
+
+        client = GeminiClient("stub", backoff_base=0.2)
+        start = time.perf_counter()
+        for _ in range(count):
+            client.post_json(endpoint, payload, "bench")
+        pooled = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    print(f"  Stub: {latency}s latency, {stub_rpm or 'unlimited'} RPM")
+    print(f"  New connection per call: {count} calls in {per_call:.2f}s")
+    print(f"  Pooled session:          {count} calls in {pooled:.2f}s "
+          f"({server.state.stats.get('connections', 0) - connections_before} connections)")
+    for line in client.metrics.report():
+        print(f"  {line}")
+
+
+def download_demo(size_mb, drop_kb):
+    """Download from the stub while it drops every connection after drop_kb,
+    starting from a part an interrupted earlier run left behind."""
+    from gemini_stub import start_stub_server, stub_file
+
+    size = int(size_mb * 1024 * 1024)
+    server, base_url = start_stub_server(rpm=0, latency=0, drop=drop_kb * 1024)
+    url = f"{base_url}/v1beta/files/demo:download?size={size}"
+    expected, md5 = stub_file("demo", size)
+    client = GeminiClient("stub", max_retries=size // (drop_kb * 1024) + 2, backoff_base=0.05)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "demo.mp4"
+            path.with_name(f".{path.name}.part").write_bytes(expected[:size // 10])
+            path.with_name(f".{path.name}.etag").write_text(f'"{md5}"', encoding="utf-8")
+            start = time.perf_counter()
+            written = client.download(url, path, "download")
+            elapsed = time.perf_counter() - start
+            matches = path.read_bytes() == expected
+    finally:
+        server.shutdown()
+
+    stats = server.state.stats
+    print(f"  {written / 1024 / 1024:.1f} MB in {elapsed:.2f}s, starting from a 10% part file")
+    print(f"  {stats['downloads']} requests ({stats['ranged']} ranged), "
+          f"{stats['dropped']} dropped connections resumed")
+    print(f"  Content {'matches' if matches else 'DOES NOT match'} the served file")
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Gemini HTTP Client Benchmark")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    options = {"--requests": 20, "--latency": 0.2, "--stub-rpm": 0, "--download-mb": 0.0, "--drop-kb": 1500}
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = type(options[args[i]])(args[i + 1])
+            i += 2
+        else:
+            i += 1
+
+    if options["--download-mb"]:
+        download_demo(options["--download-mb"], options["--drop-kb"])
+    else:
+        benchmark(options["--requests"], options["--latency"], options["--stub-rpm"])
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
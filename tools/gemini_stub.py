@@ -0,0 +1,412 @@
+"""
+Stellar Gunners - Gemini Stub Server
+Local stand-in for the Gemini generateContent and VEO predictLongRunning
+endpoints, for exercising the API tools offline (throughput, rate limiting,
+retries, bad replies) without a key or quota. load_test.py runs the
+generation tools against it.
+
+  POST /v1beta/models/<model>:generateContent
+    -> a text part holding {"grid": [[0/1 x GRID_COLS] x GRID_ROWS]}, seeded
+       from the request body so the same request gets the same grid
+    -> for batched requests (each image preceded by a "<key>:" text part),
+       {"grids": {key: grid, ...}} with each grid seeded from its image
+    -> for image requests (responseModalities includes "IMAGE"), a text part
+       plus an inlineData PNG of about --image-kb KB (noise seeded from the
+       request body)
+    -> 429 with Retry-After once more than --rpm requests arrived in the
+       last 60s (the same shape Gemini returns, including RetryInfo)
+
+  POST /v1beta/models/<model>:predictLongRunning
+    -> {"name": "models/<model>/operations/<id>"}; the operation finishes
+       about --op-delay seconds later (+-30%)
+  GET /v1beta/models/<model>/operations/<id>
+    -> {"done": false} while rendering, then a generateVideoResponse whose
+       video uri is a download (below) of --clip-kb KB
+
+Injected faults, each a probability per request (seeded, so repeatable):
+  --error-rate P   429 regardless of quota (Retry-After 1)
+  --malformed P    reply whose JSON is cut off: the model text of a grid
+                   reply, or the whole body of an image reply
+  --partial P      grid reply with rows missing or short; a batched reply
+                   loses one image's grid
+
+  GET /v1beta/files/<name>:download?size=N[&drop=K]
+    -> N deterministic bytes (seeded from name), like a VEO video download:
+       Content-Length, ETag and x-goog-hash md5 of the whole file; honors
+       "Range: bytes=start-" with a 206 unless an If-Range names another
+       ETag (the whole file then comes back with a 200). With drop=K (or
+       --drop) each response closes the connection after K body bytes, for
+       exercising resumed downloads
+
+Usage:
+  python tools/gemini_stub.py [--port 8765] [--rpm 60] [--latency 0.5] [--drop KB] [--image-kb 1024]
+                              [--op-delay 20] [--clip-kb 2048] [--error-rate P] [--malformed P]
+                              [--partial P] [--seed N]
+"""
+
+import base64
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+GRID_COLS = 30
+GRID_ROWS = 22
+
+DEFAULT_PORT = 8765
+DEFAULT_FILE_SIZE = 4 * 1024 * 1024
+DEFAULT_IMAGE_KB = 1024
+DEFAULT_OP_DELAY = 20.0
+DEFAULT_CLIP_KB = 2048
+
+FAULTS = ("error_rate", "malformed", "partial")
+
+
+class StubState:
+    """Shared quota window, operations and counters for one stub server."""
+
+    def __init__(self, rpm, latency, drop=0, image_kb=DEFAULT_IMAGE_KB, faults=None,
+                 op_delay=DEFAULT_OP_DELAY, clip_kb=DEFAULT_CLIP_KB, seed=0):
+        self.rpm = rpm
+        self.latency = latency
+        self.drop = drop        # close file downloads after this many body bytes (0 = never)
+        self.image_kb = image_kb
+        self.faults = {name: 0.0 for name in FAULTS}
+        self.faults.update(faults or {})
+        self.op_delay = op_delay
+        self.clip_kb = clip_kb
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window = deque()   # arrival times of accepted requests in the last 60s
+        self.in_flight = 0
+        self.operations = {}    # id -> (ready time, model)
+        self.file_revision = 0  # bump to change every served file (new bytes and ETag)
+        self.download_log = []  # (Range, If-Range) request headers of each file download
+        self.stats = {"requests": 0, "ok": 0, "rate_limited": 0, "peak_in_flight": 0, "connections": 0,
+                      "downloads": 0, "ranged": 0, "dropped": 0, "injected_429": 0, "malformed": 0,
+                      "partial": 0, "operations": 0, "polls": 0}
+
+    def roll(self, fault):
+        """Whether to inject the fault into this request (counted if so)."""
+        with self.lock:
+            hit = self.rng.random() < self.faults[fault]
+            if hit:
+                self.stats["injected_429" if fault == "error_rate" else fault] += 1
+            return hit
+
+    def start_operation(self, model):
+        with self.lock:
+            self.stats["operations"] += 1
+            op_id = f"op{self.stats['operations']:04d}"
+            self.operations[op_id] = (time.monotonic() + self.op_delay * self.rng.uniform(0.7, 1.3), model)
+            return op_id
+
+    def admit(self):
+        """Record an arrival. Returns 0 if accepted, else seconds until a slot frees."""
+        now = time.monotonic()
+        with self.lock:
+            self.stats["requests"] += 1
+            while self.window and now - self.window[0] >= 60:
+                self.window.popleft()
+            if self.rpm and len(self.window) >= self.rpm:
+                self.stats["rate_limited"] += 1
+                return 60 - (now - self.window[0])
+            self.window.append(now)
+            self.in_flight += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+            return 0
+
+    def done(self, ok=True):
+        with self.lock:
+            self.in_flight -= 1
+            self.stats["ok"] += ok
+
+
+def stub_grid(body):
+    """Deterministic plausible grid (border walls plus random blocks) for a request body."""
+    rng = random.Random(hashlib.sha256(body).digest())
+    grid = [[0] * GRID_COLS for _ in range(GRID_ROWS)]
+    for r in range(GRID_ROWS):
+        for c in range(GRID_COLS):
+            if r in (0, GRID_ROWS - 1) or c in (0, GRID_COLS - 1):
+                grid[r][c] = int(rng.random() < 0.6)
+    for _ in range(rng.randint(6, 14)):
+        r, c = rng.randrange(1, GRID_ROWS - 3), rng.randrange(1, GRID_COLS - 3)
+        for dr in range(rng.randint(1, 3)):
+            for dc in range(rng.randint(1, 3)):
+                grid[r + dr][c + dc] = 1
+    return grid
+
+
+def damage_grid(grid, rng):
+    """A grid a careless model might return: rows missing, or one row short."""
+    if rng.random() < 0.5:
+        return grid[:rng.randrange(1, len(grid))]
+    row = rng.randrange(len(grid))
+    return grid[:row] + [grid[row][:rng.randrange(len(grid[row]))]] + grid[row + 1:]
+
+
+def stub_reply(body, partial=False, rng=None):
+    """Reply text for a generateContent body: one grid, or keyed grids for a batch.
+
+    partial damages the grid (or drops one grid of a batch)."""
+    rng = rng or random.Random()
+    try:
+        parts = json.loads(body)["contents"][0]["parts"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        parts = []
+    grids = {}
+    for prev, part in zip(parts, parts[1:]):
+        label = prev.get("text", "")
+        if "inlineData" in part and label.endswith(":") and len(label) < 64:
+            grids[label[:-1]] = stub_grid(part["inlineData"].get("data", "").encode())
+    if grids:
+        if partial:
+            del grids[rng.choice(sorted(grids))]
+        return json.dumps({"grids": grids})
+    grid = stub_grid(body)
+    return json.dumps({"grid": damage_grid(grid, rng) if partial else grid})
+
+
+@lru_cache(maxsize=8)
+def stub_file(name, size, revision=0):
+    """Deterministic file contents for a download name. Returns (bytes, md5 base64)."""
+    data = random.Random(f"{name}#{revision}" if revision else name).randbytes(size)
+    return data, base64.b64encode(hashlib.md5(data).digest()).decode()
+
+
+@lru_cache(maxsize=4)
+def stub_png(seed, image_kb):
+    """PNG of random noise, about image_kb KB (noise does not compress)."""
+    import io
+
+    from PIL import Image
+
+    side = max(1, int((image_kb * 1024 / 3) ** 0.5))
+    img = Image.frombytes("RGB", (side, side), random.Random(seed).randbytes(side * side * 3))
+    out = io.BytesIO()
+    img.save(out, "PNG", compress_level=1)
+    return out.getvalue()
+
+
+def wants_image(body):
+    try:
+        modalities = json.loads(body).get("generationConfig", {}).get("responseModalities", [])
+    except (ValueError, AttributeError):
+        return False
+    return "IMAGE" in modalities
+
+
+def image_response(body, image_kb):
+    # One image per distinct prompt; seeding from the whole body would make
+    # every large request body its own cache entry
+    seed = hashlib.sha256(body[:4096]).hexdigest()
+    data = base64.b64encode(stub_png(seed, image_kb)).decode()
+    return {"candidates": [{"content": {"parts": [
+        {"text": "Stub image."},
+        {"inlineData": {"mimeType": "image/png", "data": data}},
+    ], "role": "model"}}]}
+
+
+def text_response(text):
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+
+def operation_response(name, done, video_uri=None):
+    if not done:
+        return {"name": name, "done": False}
+    return {"name": name, "done": True, "response": {
+        "@type": "type.googleapis.com/google.ai.generativelanguage.v1beta.PredictLongRunningResponse",
+        "generateVideoResponse": {"generatedSamples": [{"video": {"uri": video_uri}}]},
+    }}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, keep-alive
+    # clients wait out a delayed ACK on every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.stats["connections"] += 1
+
+    def _send_json(self, status, obj, headers=None, truncate=False):
+        data = json.dumps(obj).encode()
+        if truncate:
+            data = data[:len(data) // 2]
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_429(self, retry_after):
+        self._send_json(429, {"error": {
+                "code": 429, "status": "RESOURCE_EXHAUSTED",
+                "message": "Stub quota exceeded",
+                "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo",
+                             "retryDelay": f"{retry_after}s"}],
+        }}, headers={"Retry-After": str(retry_after)})
+
+    def do_POST(self):
+        state = self.server.state
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        match = re.fullmatch(r"/v1beta/models/([\w.-]+):(generateContent|predictLongRunning)", urlsplit(self.path).path)
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}"}})
+            return
+
+        wait = state.admit()
+        if wait:
+            self._send_429(max(1, int(wait + 0.999)))
+            return
+
+        if state.roll("error_rate"):
+            state.done(ok=False)
+            self._send_429(1)
+            return
+        try:
+            time.sleep(state.latency)
+            if match.group(2) == "predictLongRunning":
+                op_id = state.start_operation(match.group(1))
+                self._send_json(200, {"name": f"models/{match.group(1)}/operations/{op_id}"})
+            elif wants_image(body):
+                self._send_json(200, image_response(body, state.image_kb), truncate=state.roll("malformed"))
+            else:
+                reply = stub_reply(body, state.roll("partial"), state.rng)
+                if state.roll("malformed"):
+                    reply = reply[:len(reply) // 2]
+                self._send_json(200, text_response(reply))
+        finally:
+            state.done()
+
+    def _poll_operation(self, model, op_id):
+        state = self.server.state
+        with state.lock:
+            state.stats["polls"] += 1
+            operation = state.operations.get(op_id)
+        name = f"models/{model}/operations/{op_id}"
+        if operation is None:
+            self._send_json(404, {"error": {"code": 404, "message": f"Operation {name} not found",
+                                            "status": "NOT_FOUND"}})
+            return
+        done = time.monotonic() >= operation[0]
+        uri = f"http://{self.headers['Host']}/v1beta/files/{op_id}:download?alt=media&size={state.clip_kb * 1024}"
+        self._send_json(200, operation_response(name, done, uri if done else None))
+
+    def do_GET(self):
+        state = self.server.state
+        url = urlsplit(self.path)
+        operation = re.fullmatch(r"/v1beta/models/([\w.-]+)/operations/(\w+)", url.path)
+        if operation:
+            self._poll_operation(*operation.groups())
+            return
+        match = re.fullmatch(r"/v1beta/files/([\w-]+):download", url.path)
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}"}})
+            return
+        query = parse_qs(url.query)
+        size = int(query.get("size", [DEFAULT_FILE_SIZE])[0])
+        drop = int(query.get("drop", [state.drop])[0])
+        data, md5 = stub_file(match.group(1), size, state.file_revision)
+
+        start = 0
+        range_match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if if_range is not None and if_range != f'"{md5}"':
+            range_match = None  # the file changed since the client's copy: send all of it
+        if range_match:
+            start = int(range_match.group(1))
+            if start >= size:
+                self._send_json(416, {"error": {"code": 416, "message": "Range not satisfiable"}},
+                                headers={"Content-Range": f"bytes */{size}"})
+                return
+        with state.lock:
+            state.stats["downloads"] += 1
+            state.stats["ranged"] += bool(range_match)
+            state.download_log.append((self.headers.get("Range"), if_range))
+
+        self.send_response(206 if range_match else 200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(size - start))
+        if range_match:
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{md5}"')
+        self.send_header("x-goog-hash", f"md5={md5}")
+        self.end_headers()
+        body = data[start:]
+        if drop and len(body) > drop:
+            # Simulated network drop: part of the body, then the connection closes
+            self.wfile.write(body[:drop])
+            self.close_connection = True
+            with state.lock:
+                state.stats["dropped"] += 1
+            return
+        self.wfile.write(body)
+
+
+def start_stub_server(port=0, rpm=60, latency=0.5, drop=0, image_kb=DEFAULT_IMAGE_KB, faults=None,
+                      op_delay=DEFAULT_OP_DELAY, clip_kb=DEFAULT_CLIP_KB, seed=0):
+    """Start a stub server on a background thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(rpm, latency, drop, image_kb, faults, op_delay, clip_kb, seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    args = sys.argv[1:]
+    options = {"--port": DEFAULT_PORT, "--rpm": 60, "--latency": 0.5, "--drop": 0,
+               "--image-kb": DEFAULT_IMAGE_KB, "--op-delay": DEFAULT_OP_DELAY, "--clip-kb": DEFAULT_CLIP_KB,
+               "--error-rate": 0.0, "--malformed": 0.0, "--partial": 0.0, "--seed": 0}
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = type(options[args[i]])(args[i + 1])
+            i += 2
+        else:
+            i += 1
+    port, rpm, latency = options["--port"], options["--rpm"], options["--latency"]
+    drop = options["--drop"] * 1024
+    faults = {name: options["--" + name.replace("_", "-")] for name in FAULTS}
+
+    print("=" * 60)
+    print("Stellar Gunners - Gemini Stub Server")
+    print("=" * 60)
+    server, base_url = start_stub_server(port, rpm, latency, drop, options["--image-kb"], faults,
+                                         options["--op-delay"], options["--clip-kb"], options["--seed"])
+    print(f"  Listening on {base_url} (quota {rpm} RPM, latency {latency}s)")
+    print(f"  Endpoint: {base_url}/v1beta/models/<model>:generateContent")
+    print(f"  VEO: {base_url}/v1beta/models/<model>:predictLongRunning "
+          f"(operations take ~{options['--op-delay']:g}s)")
+    if any(faults.values()):
+        print("  Faults: " + ", ".join(f"{name} {p:g}" for name, p in faults.items() if p))
+    print(f"  Downloads: {base_url}/v1beta/files/<name>:download?size=N"
+          + (f" (dropping after {drop // 1024} KB)" if drop else ""))
+    try:
+        while True:
+            time.sleep(10)
+            print(f"  {server.state.stats}", flush=True)
+    except KeyboardInterrupt:
+        server.shutdown()
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
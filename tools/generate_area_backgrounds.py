@@ -2,6 +2,15 @@
 Stellar Gunners - Area Background Image Generator
 Generates a unique top-down background image for each stage area.
 Uses Gemini API (gemini-3-pro-image-preview).
+Each area's state is kept in the job journal (job_journal.py); a rerun skips
+finished areas and retries failed or interrupted ones.
+
+Usage:
+  python tools/generate_area_backgrounds.py [stage_id ...]
+  python tools/generate_area_backgrounds.py [stage_id ...] --emit-batch FILE.jsonl
+      Write the missing areas as a Batch API request file (batch_jobs.py)
+  python tools/generate_area_backgrounds.py --ingest-batch FILE.jsonl RESULTS.jsonl
+      Save the images of a batch results file to the area backgrounds
 """
 
 import json
@@ -14,7 +23,9 @@ from pathlib import Path
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 sys.path.insert(0, str(SCRIPT_DIR))
-from generate_images import generate_image, API_KEY, DELAY_BETWEEN_REQUESTS
+from generate_images import (generate_image, batch_entry, emit_image_batch, ingest_image_batch,
+                             API_KEY, DELAY_BETWEEN_REQUESTS)
+from job_journal import JobJournal
 
 STAGES_PATH = PROJECT_ROOT / "assets" / "data" / "stages.json"
 OUTPUT_DIR = PROJECT_ROOT / "assets" / "images" / "area_backgrounds"
@@ -66,59 +77,72 @@ def build_area_prompt(stage_name, area_name, bg_theme, layout):
     return prompt
 
 
-def generate_all_area_backgrounds(target_stages=None):
-    """Generate background images for all areas in all stages."""
+def iter_areas(target_stages=None):
+    """(output_path, stage_name, area_name, bg_theme, layout) for every area."""
     with open(STAGES_PATH, 'r', encoding='utf-8') as f:
         stages = json.load(f)
 
+    for stage in stages:
+        stage_id = stage['id']
+        if target_stages and stage_id not in target_stages:
+            continue
+        for area_idx, area in enumerate(stage.get('areas', [])):
+            yield (OUTPUT_DIR / f"area_{stage_id}_{area_idx}.png", stage.get('name', stage_id),
+                   area.get('areaName', f'Area {area_idx + 1}'),
+                   area.get('bgTheme', 'city'), area.get('layout', 'moderate'))
+
+
+def emit_area_batch(requests_path, target_stages=None):
+    """Batch request file for every area background not generated yet."""
+    entries = [batch_entry(output_path.stem, output_path,
+                           build_area_prompt(stage_name, area_name, bg_theme, layout))
+               for output_path, stage_name, area_name, bg_theme, layout in iter_areas(target_stages)]
+    return emit_image_batch(requests_path, entries)
+
+
+def generate_all_area_backgrounds(target_stages=None):
+    """Generate background images for all areas in all stages."""
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    journal = JobJournal("generate_area_backgrounds")
 
     total_areas = 0
     generated = 0
     skipped = 0
     errors = 0
 
-    for stage in stages:
-        stage_id = stage['id']
-        stage_name = stage.get('name', stage_id)
-
-        # Filter by target stages if specified
-        if target_stages and stage_id not in target_stages:
-            continue
+    for output_path, stage_name, area_name, bg_theme, layout in iter_areas(target_stages):
+        total_areas += 1
+        filename = output_path.name
 
-        areas = stage.get('areas', [])
-        if not areas:
+        if output_path.exists():
+            print(f"  SKIP (exists): {filename}")
+            if journal.state(output_path.stem) != "done":
+                journal.finish(output_path.stem)
+            skipped += 1
             continue
 
-        for area_idx, area in enumerate(areas):
-            total_areas += 1
-            filename = f"area_{stage_id}_{area_idx}.png"
-            output_path = OUTPUT_DIR / filename
-
-            if output_path.exists():
-                print(f"  SKIP (exists): {filename}")
-                skipped += 1
-                continue
-
-            bg_theme = area.get('bgTheme', 'city')
-            layout = area.get('layout', 'moderate')
-            area_name = area.get('areaName', f'Area {area_idx + 1}')
+        print(f"\n{'='*60}")
+        print(f"Stage: {stage_name} | {area_name}")
+        print(f"Theme: {bg_theme} | Layout: {layout}")
+        print(f"{'='*60}")
 
-            print(f"\n{'='*60}")
-            print(f"Stage: {stage_name} | Area {area_idx}: {area_name}")
-            print(f"Theme: {bg_theme} | Layout: {layout}")
-            print(f"{'='*60}")
+        previous = journal.get(output_path.stem)
+        if previous and previous["state"] in ("failed", "in_flight"):
+            print(f"  Retrying ({previous['state']} in an earlier run: {previous['reason'] or 'interrupted'})")
 
-            prompt = build_area_prompt(stage_name, area_name, bg_theme, layout)
-            result = generate_image(prompt, str(output_path), aspect_ratio="4:3", image_size="1K")
+        prompt = build_area_prompt(stage_name, area_name, bg_theme, layout)
+        journal.start(output_path.stem)
+        result = generate_image(prompt, str(output_path), aspect_ratio="4:3", image_size="1K")
 
-            if result:
-                generated += 1
-            else:
-                errors += 1
-                print(f"  FAILED: {filename}")
+        if result:
+            journal.finish(output_path.stem)
+            generated += 1
+        else:
+            journal.fail(output_path.stem, "no image generated")
+            errors += 1
+            print(f"  FAILED: {filename}")
 
-            time.sleep(DELAY_BETWEEN_REQUESTS)
+        time.sleep(DELAY_BETWEEN_REQUESTS)
 
     print(f"\n{'='*60}")
     print(f"Summary: {generated} generated, {skipped} skipped, {errors} errors (total {total_areas} areas)")
@@ -128,17 +152,32 @@ def generate_all_area_backgrounds(target_stages=None):
 def main():
     print("=" * 60)
     print("Stellar Gunners - Area Background Generator")
-    print(f"API Key: {API_KEY[:10]}...")
+    print(f"API Key: {API_KEY[:10]}..." if API_KEY else "API Key: (none, cached images only)")
     print(f"Output: {OUTPUT_DIR}")
     print("=" * 60)
 
+    args = sys.argv[1:]
+    if args[:1] == ["--ingest-batch"] and len(args) >= 3:
+        ingest_image_batch(args[1], args[2], "generate_area_backgrounds")
+        print("\nDone!")
+        return
+
+    emit_batch = None
+    if "--emit-batch" in args:
+        i = args.index("--emit-batch")
+        emit_batch = args[i + 1]
+        del args[i:i + 2]
+
     target_stages = None
-    if len(sys.argv) > 1:
+    if args:
         # Allow specifying specific stages: python generate_area_backgrounds.py stage_1_1 stage_1_2
-        target_stages = sys.argv[1:]
+        target_stages = args
         print(f"Target stages: {target_stages}")
 
-    generate_all_area_backgrounds(target_stages)
+    if emit_batch:
+        emit_area_batch(emit_batch, target_stages)
+    else:
+        generate_all_area_backgrounds(target_stages)
     print("\nDone!")
 
 
@@ -1,40 +1,91 @@
 """
 Stellar Gunners - Collision Map Generator
-Analyzes area background images using Gemini Vision to extract
-walkable/non-walkable grid data for game physics.
+Extracts walkable/non-walkable grid data for game physics from area
+background images.
+
+Grids come from Gemini Vision, one call per area. collision_extractor.py's
+offline pixel classifier is not a source: it does not yet beat an all-floor
+grid on the existing maps.
+
+Vision calls for all target stages run concurrently through gemini_async's
+rate-limited client (--rpm, --in-flight); --endpoint points them at another
+server, e.g. gemini_stub.py for offline runs. Raw Vision grids are cached
+under tools/.cache/vision by image, upload encoding, prompt, model and
+temperature, so
+re-running with --force after changing repair or post-processing makes no
+API calls (--no-cache bypasses it).
+
+Regeneration is incremental per area: each area records the sha256 of its
+source image ("sourceHash") and the source used ("source": "vision"), and
+areas whose image and source are unchanged are kept as-is. The stage file is
+atomically rewritten after every area, so an interrupted run resumes where it
+stopped. --force rebuilds every area. An area whose Vision call fails keeps its previous
+grid, or gets an open placeholder without a hash that the next run rebuilds.
+
+--batch N packs up to N area images into one Vision request (keyed JSON
+reply, VISION_BATCH_PROMPT), cutting requests per run by about N. Grids
+are validated one by one; only images whose grid is missing or malformed
+are re-sent on their own.
+
+Usage:
+  python generate_collision_maps.py [stage_id ...] [--rpm 8] [--in-flight 4] [--endpoint URL]
+                                    [--batch N] [--force] [--no-cache]
 """
 
-import base64
+import asyncio
+import hashlib
 import json
 import os
 import re
 import sys
 import time
-from collections import deque
+import zlib
 from pathlib import Path
 
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 sys.path.insert(0, str(SCRIPT_DIR))
-from generate_images import API_KEY, DELAY_BETWEEN_REQUESTS
+from collision_extractor import find_area_image
+from collision_format import load_collision_file, save_collision_file
+from collision_nav import add_nav_to_area
+from collision_nexthop import nexthop_path, save_nexthop_file
+from collision_visibility import save_visibility_file, visibility_path
+from collision_rects import add_rects_to_area
+from collision_repair import repair_grid
+from gemini_async import AsyncGeminiClient, GeminiError, response_text
+from response_cache import ResponseCache, cache_key
+from upload_images import UPLOAD_PRESETS, inline_part, upload_report, upload_spec, upload_stats
 
 MODEL = "gemini-2.5-flash"
 ENDPOINT = f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL}:generateContent"
 
 STAGES_PATH = PROJECT_ROOT / "assets" / "data" / "stages.json"
-AREA_BG_DIR = PROJECT_ROOT / "assets" / "images" / "area_backgrounds"
 OUTPUT_DIR = PROJECT_ROOT / "assets" / "data" / "collision_maps"
 
 GRID_COLS = 30
 GRID_ROWS = 22
 
+# Vision request budget shared by all stages (gemini-2.5-flash free tier is 10 RPM)
+VISION_RPM = 8
+VISION_MAX_IN_FLIGHT = 4
+VISION_TEMPERATURE = 0.1
+VISION_BATCH_SIZE = 1   # Images per request; --batch N sends up to N areas in one call
+GRID_SOURCE = "vision"  # Stamped per area as "source"; areas built from anything else are rebuilt
+
+# Raw Vision grids by sha256(image + upload encoding + prompt + model + temperature);
+# see response_cache.py
+vision_cache = ResponseCache("vision")
+
 CELL_W = 1200 // GRID_COLS  # 40px
 CELL_H = 900 // GRID_ROWS   # ~41px
 
-VISION_PROMPT = f"""Analyze this top-down game background image to create a detailed collision map.
+# Images are sent downscaled (upload_images.py "vision" preset: 600x450 JPEG)
+VISION_UPLOAD = "vision"
+VISION_IMAGE_W, VISION_IMAGE_H = UPLOAD_PRESETS[VISION_UPLOAD]["size"]
 
-The image is 1200x900px, divided into a {GRID_COLS}-column x {GRID_ROWS}-row grid.
-Each cell is approximately {CELL_W}x{CELL_H} pixels.
+# Shared by the single-image and batched prompts
+_VISION_GRID_RULES = f"""The image is {VISION_IMAGE_W}x{VISION_IMAGE_H}px, divided into a {GRID_COLS}-column x {GRID_ROWS}-row grid.
+Each cell is approximately {VISION_IMAGE_W // GRID_COLS}x{VISION_IMAGE_H // GRID_ROWS} pixels.
 
 For each cell:
 - 0 = WALKABLE: flat ground, roads, paved areas, open floor, corridors, clearings, paths, grass, dirt
@@ -53,286 +104,481 @@ Connectivity rules (CRITICAL):
 - Every edge must have at least 4 walkable cells connected to center
 - Wall density: 15-35% of total cells ({int(GRID_ROWS*GRID_COLS*0.15)}-{int(GRID_ROWS*GRID_COLS*0.35)} wall cells out of {GRID_ROWS*GRID_COLS})
 
-Output ONLY valid JSON, no markdown, no explanation:
-{{"grid": [[0,0,0,...], [0,0,0,...], ...]}}
+"""
 
-Exactly {GRID_ROWS} rows, each with exactly {GRID_COLS} values (0 or 1).
+_VISION_GRID_SHAPE = f"""Exactly {GRID_ROWS} rows, each with exactly {GRID_COLS} values (0 or 1).
 Row 0 = top, row {GRID_ROWS-1} = bottom. Column 0 = left, column {GRID_COLS-1} = right."""
 
+VISION_PROMPT = ("Analyze this top-down game background image to create a detailed collision map.\n\n"
+                 + _VISION_GRID_RULES
+                 + 'Output ONLY valid JSON, no markdown, no explanation:\n'
+                 + '{"grid": [[0,0,0,...], [0,0,0,...], ...]}\n\n'
+                 + _VISION_GRID_SHAPE)
+
+# Several images per request: each image part follows a text part "<key>:"
+VISION_BATCH_PROMPT = ("Analyze each of the following top-down game background images to create a "
+                       "detailed collision map for each one. Every image is preceded by its key.\n\n"
+                       + _VISION_GRID_RULES.replace("The image is", "Each image is")
+                       + "Output ONLY valid JSON, no markdown, no explanation, with one grid per image "
+                         "under its key:\n"
+                       + '{"grids": {"image_1": [[0,0,0,...], ...], "image_2": [[0,0,0,...], ...]}}\n\n'
+                       + "For every grid, " + _VISION_GRID_SHAPE.replace("Exactly", "exactly", 1))
+
+
+def _strip_fences(text):
+    """Remove markdown code fences if present."""
+    json_str = text.strip()
+    json_str = re.sub(r'^```json\s*', '', json_str)
+    json_str = re.sub(r'^```\s*', '', json_str)
+    return re.sub(r'\s*```$', '', json_str)
+
+
+def validate_grid(grid, label="grid"):
+    """Check a parsed grid is GRID_ROWS x GRID_COLS of 0/1, padding or truncating ragged rows.
+
+    Returns the grid. Raises ValueError.
+    """
+    if not isinstance(grid, list) or len(grid) != GRID_ROWS:
+        raise ValueError(f"Expected {GRID_ROWS} rows, got {len(grid) if isinstance(grid, list) else type(grid).__name__}")
+
+    for i, row in enumerate(grid):
+        if not isinstance(row, list) or any(cell not in (0, 1) for cell in row):
+            raise ValueError(f"Row {i} is not a list of 0/1")
+        if len(row) != GRID_COLS:
+            print(f"  WARNING: {label} row {i} has {len(row)} cols, expected {GRID_COLS}")
+            # Pad or truncate
+            if len(row) < GRID_COLS:
+                row.extend([0] * (GRID_COLS - len(row)))
+            else:
+                grid[i] = row[:GRID_COLS]
+    return grid
+
 
-def analyze_image(image_path, retry=3):
-    """Send image to Gemini Vision and get collision grid as JSON."""
-    import requests
+def parse_grid_text(text):
+    """Parse a Vision text response into a GRID_ROWS x GRID_COLS grid. Raises ValueError."""
+    return validate_grid(json.loads(_strip_fences(text)).get("grid", []))
 
-    with open(image_path, 'rb') as f:
-        img_b64 = base64.b64encode(f.read()).decode()
 
-    headers = {
-        "x-goog-api-key": API_KEY,
-        "Content-Type": "application/json",
-    }
+def parse_grid_batch(text, keys):
+    """Parse a batched Vision response into {key: grid or None}.
 
-    payload = {
-        "contents": [{
-            "parts": [
-                {"text": VISION_PROMPT},
-                {"inlineData": {"mimeType": "image/png", "data": img_b64}}
-            ]
-        }],
+    Every grid is validated on its own, so one bad grid does not discard the
+    rest. Raises ValueError only if the response is not a keyed JSON object.
+    """
+    grids = json.loads(_strip_fences(text)).get("grids")
+    if not isinstance(grids, dict):
+        raise ValueError("No \"grids\" object in response")
+    results = {}
+    for key in keys:
+        try:
+            results[key] = validate_grid(grids.get(key), key)
+        except ValueError as e:
+            print(f"  {key}: unusable grid in batch: {e}", flush=True)
+            results[key] = None
+    return results
+
+
+def vision_payload(parts):
+    return {
+        "contents": [{"parts": parts}],
         "generationConfig": {
             "responseModalities": ["TEXT"],
-            "temperature": 0.1
+            "temperature": VISION_TEMPERATURE
         }
     }
 
+
+async def analyze_image(client, image_path, retry=2):
+    """Send image to Gemini Vision and get collision grid as JSON.
+
+    HTTP retries and rate limiting live in the client; retry here covers
+    responses that arrive but do not hold a usable grid.
+    """
+    with open(image_path, 'rb') as f:
+        image_bytes = f.read()
+
+    name = Path(image_path).name
+    # Raw (pre-repair) grid cached by everything that determines the response;
+    # the endpoint stands in for the model so stub runs never mix with real ones
+    key = cache_key(image_bytes, upload_spec(VISION_UPLOAD), VISION_PROMPT, client.endpoint, VISION_TEMPERATURE)
+    cached = vision_cache.get(key)
+    if cached is not None:
+        print(f"  CACHED: {name}", flush=True)
+        return cached["grid"]
+
+    payload = vision_payload([
+        {"text": VISION_PROMPT},
+        inline_part(image_path, VISION_UPLOAD)
+    ])
+
     for attempt in range(retry + 1):
+        print(f"  Analyzing: {name} (attempt {attempt + 1})...", flush=True)
         try:
-            print(f"  Analyzing: {Path(image_path).name} (attempt {attempt + 1})...", flush=True)
-            response = requests.post(ENDPOINT, headers=headers, json=payload, timeout=180)
+            text_response = response_text(await client.generate(payload, "vision"))
+        except GeminiError as e:
+            print(f"  {name}: {e}", flush=True)
+            return None
 
-            if response.status_code == 429:
-                wait_time = 90 * (attempt + 1)  # 90s, 180s, 270s, 360s
-                print(f"  Rate limited. Waiting {wait_time}s...", flush=True)
-                time.sleep(wait_time)
-                continue
-
-            response.raise_for_status()
-            result = response.json()
-
-            candidates = result.get("candidates", [])
-            if not candidates:
-                print(f"  WARNING: No candidates in response")
-                if attempt < retry:
-                    time.sleep(10)
-                    continue
-                return None
-
-            parts = candidates[0].get("content", {}).get("parts", [])
-            text_response = ""
-            for part in parts:
-                if "text" in part:
-                    text_response += part["text"]
-
-            if not text_response:
-                print(f"  WARNING: No text in response")
-                if attempt < retry:
-                    time.sleep(10)
-                    continue
-                return None
-
-            # Parse JSON from response (may contain markdown fences)
-            json_str = text_response.strip()
-            # Remove markdown code fences if present
-            json_str = re.sub(r'^```json\s*', '', json_str)
-            json_str = re.sub(r'^```\s*', '', json_str)
-            json_str = re.sub(r'\s*```$', '', json_str)
-
-            grid_data = json.loads(json_str)
-            grid = grid_data.get("grid", [])
-
-            if len(grid) != GRID_ROWS:
-                print(f"  WARNING: Expected {GRID_ROWS} rows, got {len(grid)}")
-                if attempt < retry:
-                    time.sleep(10)
-                    continue
-                return None
-
-            for i, row in enumerate(grid):
-                if len(row) != GRID_COLS:
-                    print(f"  WARNING: Row {i} has {len(row)} cols, expected {GRID_COLS}")
-                    # Pad or truncate
-                    if len(row) < GRID_COLS:
-                        row.extend([0] * (GRID_COLS - len(row)))
-                    else:
-                        grid[i] = row[:GRID_COLS]
-
-            print(f"  OK: Grid extracted ({GRID_ROWS}x{GRID_COLS})", flush=True)
-            return grid
-
-        except json.JSONDecodeError as e:
-            print(f"  JSON parse error: {e}", flush=True)
+        if not text_response:
+            print(f"  WARNING: {name}: no text in response")
+            continue
+        try:
+            grid = parse_grid_text(text_response)
+        except (ValueError, AttributeError) as e:
+            print(f"  {name}: unusable grid: {e}", flush=True)
             print(f"  Raw text: {text_response[:300]}", flush=True)
-            if attempt < retry:
-                time.sleep(15)
-        except Exception as e:
-            print(f"  Error: {e}", flush=True)
-            if attempt < retry:
-                time.sleep(15)
+            continue
+
+        print(f"  OK: {name}: grid extracted ({GRID_ROWS}x{GRID_COLS})", flush=True)
+        vision_cache.put(key, {"image": name, "grid": grid})
+        return grid
 
     return None
 
 
-def flood_fill(grid, start_row, start_col):
-    """BFS flood fill from start position, returns set of reachable (row, col)."""
-    visited = set()
-    queue = deque([(start_row, start_col)])
-    visited.add((start_row, start_col))
-
-    while queue:
-        r, c = queue.popleft()
-        for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr < GRID_ROWS and 0 <= nc < GRID_COLS and (nr, nc) not in visited:
-                if grid[nr][nc] == 0:
-                    visited.add((nr, nc))
-                    queue.append((nr, nc))
-
-    return visited
-
-
-def carve_path(grid, from_r, from_c, to_r, to_c):
-    """Carve a walkable path between two points using simple line."""
-    r, c = from_r, from_c
-    while r != to_r or c != to_c:
-        grid[r][c] = 0
-        if r < to_r:
-            r += 1
-        elif r > to_r:
-            r -= 1
-        if c < to_c:
-            c += 1
-        elif c > to_c:
-            c -= 1
-        grid[r][c] = 0
-
-
-def validate_and_fix_grid(grid):
-    """Ensure grid is playable: center walkable, edges reachable, density reasonable."""
-    # 1. Force center area to be walkable (player spawn)
-    center_r = GRID_ROWS // 2
-    center_c = GRID_COLS // 2
-    for r in range(center_r - 2, center_r + 2):
-        for c in range(center_c - 3, center_c + 3):
-            if 0 <= r < GRID_ROWS and 0 <= c < GRID_COLS:
-                grid[r][c] = 0
-
-    # 2. Flood fill from center
-    reachable = flood_fill(grid, center_r, center_c)
-
-    # 3. Ensure each edge has reachable walkable cells
-    edges = {
-        'top': [(0, c) for c in range(GRID_COLS)],
-        'bottom': [(GRID_ROWS - 1, c) for c in range(GRID_COLS)],
-        'left': [(r, 0) for r in range(GRID_ROWS)],
-        'right': [(r, GRID_COLS - 1) for r in range(GRID_ROWS)]
-    }
+class VisionBatcher:
+    """Sends Vision grid requests up to size images per call (VISION_BATCH_PROMPT).
+
+    Requests queued in the same event-loop turn are grouped; since everything
+    before the Vision call is synchronous, that is every target area at once.
+    Each grid in a batched reply is validated on its own and only the images
+    whose grid is missing or unusable are retried with analyze_image.
+    size <= 1 sends every image on its own.
+    """
+
+    def __init__(self, client, size=1):
+        self.client = client
+        self.size = size
+        self.queue = []      # (image_path, image_bytes, future)
+        self.tasks = set()
+        self.flush_pending = False
+        self.stats = {"batches": 0, "batched_images": 0, "fallbacks": 0}
+
+    def _key(self, image_bytes, prompt):
+        return cache_key(image_bytes, upload_spec(VISION_UPLOAD), prompt, self.client.endpoint, VISION_TEMPERATURE)
+
+    async def grid(self, image_path):
+        """Raw Vision grid for one image, or None."""
+        if self.size <= 1:
+            return await analyze_image(self.client, image_path)
+
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+        # A grid cached by either prompt answers the same question
+        for prompt in (VISION_BATCH_PROMPT, VISION_PROMPT):
+            cached = vision_cache.get(self._key(image_bytes, prompt))
+            if cached is not None:
+                print(f"  CACHED: {Path(image_path).name}", flush=True)
+                return cached["grid"]
+
+        future = asyncio.get_running_loop().create_future()
+        self.queue.append((image_path, image_bytes, future))
+        if len(self.queue) >= self.size:
+            self._start(self._send(self.queue[:self.size]))
+            self.queue = self.queue[self.size:]
+        elif not self.flush_pending:
+            self.flush_pending = True
+            self._start(self._flush_soon())
+        return await future
+
+    def _start(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _flush_soon(self):
+        # Let every area that is ready this turn queue its image first
+        await asyncio.sleep(0)
+        self.flush_pending = False
+        while self.queue:
+            self._start(self._send(self.queue[:self.size]))
+            self.queue = self.queue[self.size:]
+
+    async def _send(self, batch):
+        try:
+            grids = await self._request(batch)
+            fallbacks = [i for i, grid in enumerate(grids) if grid is False]
+            self.stats["fallbacks"] += len(fallbacks)
+            retried = await asyncio.gather(*(analyze_image(self.client, batch[i][0]) for i in fallbacks))
+            for i, grid in zip(fallbacks, retried):
+                grids[i] = grid
+            for (_, _, future), grid in zip(batch, grids):
+                future.set_result(grid)
+        except BaseException as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+
+    async def _request(self, batch):
+        """One batched call. Returns per image: grid, None (request failed) or False (retry alone)."""
+        keys = [f"image_{i + 1}" for i in range(len(batch))]
+        parts = [{"text": VISION_BATCH_PROMPT}]
+        for key, (image_path, _, _) in zip(keys, batch):
+            parts.append({"text": f"{key}:"})
+            parts.append(inline_part(image_path, VISION_UPLOAD))
+
+        names = ", ".join(Path(image_path).name for image_path, _, _ in batch)
+        print(f"  Analyzing batch of {len(batch)}: {names}...", flush=True)
+        self.stats["batches"] += 1
+        self.stats["batched_images"] += len(batch)
+        try:
+            text_response = response_text(await self.client.generate(vision_payload(parts), "vision batch"))
+        except GeminiError as e:
+            print(f"  Batch ({names}): {e}", flush=True)
+            return [None] * len(batch)
+        try:
+            results = parse_grid_batch(text_response, keys)
+        except (ValueError, AttributeError) as e:
+            print(f"  Batch ({names}): unusable response: {e}", flush=True)
+            print(f"  Raw text: {text_response[:300]}", flush=True)
+            return [False] * len(batch)
 
-    for edge_name, edge_cells in edges.items():
-        reachable_on_edge = [(r, c) for r, c in edge_cells if (r, c) in reachable]
-        if len(reachable_on_edge) < 2:
-            # Carve a path from center to middle of this edge
-            mid = edge_cells[len(edge_cells) // 2]
-            carve_path(grid, center_r, center_c, mid[0], mid[1])
-            # Also clear a few cells around the target
-            for r, c in edge_cells:
-                if abs(r - mid[0]) + abs(c - mid[1]) <= 2:
-                    grid[r][c] = 0
-
-    # 4. Cap wall density at 40%
-    total = GRID_ROWS * GRID_COLS
-    wall_count = sum(cell for row in grid for cell in row)
-    if wall_count > total * 0.4:
-        # Remove random walls until under 35%
-        target = int(total * 0.35)
-        wall_positions = [(r, c) for r in range(GRID_ROWS) for c in range(GRID_COLS) if grid[r][c] == 1]
-        import random
-        random.shuffle(wall_positions)
-        while wall_count > target and wall_positions:
-            r, c = wall_positions.pop()
-            # Don't remove edge walls (keep some structure)
-            if 1 <= r <= GRID_ROWS - 2 and 1 <= c <= GRID_COLS - 2:
-                grid[r][c] = 0
-                wall_count -= 1
+        grids = []
+        for key, (image_path, image_bytes, _) in zip(keys, batch):
+            grid = results[key]
+            if grid is None:
+                grids.append(False)
+                continue
+            vision_cache.put(self._key(image_bytes, VISION_BATCH_PROMPT),
+                             {"image": Path(image_path).name, "grid": grid})
+            grids.append(grid)
+        ok = sum(grid is not False for grid in grids)
+        print(f"  OK: batch ({names}): {ok}/{len(batch)} grids extracted", flush=True)
+        return grids
 
-    return grid
 
+def image_hash(image_path):
+    """sha256 of an area image's bytes, stored per area as "sourceHash"."""
+    with open(image_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
-def generate_collision_maps(target_stages=None):
-    """Generate collision maps for all stages."""
+
+async def build_area(stage_id, area_idx, area_name, image_path, vision):
+    """Extract and repair one area.
+
+    Returns the area entry, or None if Vision failed and there is no grid to save.
+    """
+    grid = await vision.grid(str(image_path))
+    if grid is None:
+        return None
+
+    # Post-process to ensure playability (seeded per area, so reruns match)
+    seed = zlib.crc32(f"{stage_id}:{area_idx}".encode())
+    grid = repair_grid(grid, seed=seed).tolist()
+    wall_count = sum(cell for row in grid for cell in row)
+    total = GRID_ROWS * GRID_COLS
+    print(f"  {stage_id} area {area_idx}: wall density {wall_count}/{total} "
+          f"({wall_count/total*100:.1f}%)", flush=True)
+    return {"areaIndex": area_idx, "areaName": area_name, "grid": grid}
+
+
+def finalize_area(entry):
+    """Nav and wall rects for one built area. Returns (isolated, bodies)."""
+    # Precompute connectivity / distance fields so area loads do no BFS
+    isolated = add_nav_to_area(entry)
+    # Merge walls into static-body rectangles (after nav, which may add walls)
+    bodies = add_rects_to_area(entry)[2]
+    return isolated, bodies
+
+
+async def build_stage(stage, vision, output_path, force=False):
+    """Build one stage area by area, rewriting the stage file after each.
+
+    Areas whose image hash and source match the existing file are reused;
+    the rest run concurrently. The file is atomically replaced as each area
+    finishes, so an interrupted run loses at most the areas still in flight.
+    """
+    stage_id = stage['id']
+    existing = {}
+    if output_path.exists():
+        existing = {a["areaIndex"]: a for a in load_collision_file(output_path).get("areas", [])}
+
+    areas_by_index = {}
+    pending = []
+    reused = adopted = 0
+    for area_idx, area in enumerate(stage['areas']):
+        area_name = area.get('areaName', f'Area {area_idx}')
+        image_path = find_area_image(stage_id, area_idx)
+        old = existing.get(area_idx)
+
+        if image_path is None:
+            if old is None:
+                print(f"  WARNING: No image for {stage_id} area {area_idx} ({area_name}), using open grid")
+                old = {"areaIndex": area_idx, "grid": [[0] * GRID_COLS for _ in range(GRID_ROWS)]}
+                finalize_area(old)
+            old["areaName"] = area_name
+            areas_by_index[area_idx] = old
+            continue
+
+        digest = image_hash(image_path)
+        if old is None or force:
+            pending.append((area_idx, area_name, image_path, digest))
+            if old is not None:
+                # Stays in the file until its rebuild lands
+                areas_by_index[area_idx] = old
+            continue
+        if "sourceHash" not in old:
+            # Written before hashes were recorded: trust it for the current image
+            old["sourceHash"] = digest
+            adopted += 1
+        elif old["sourceHash"] == digest and old.get("source", GRID_SOURCE) == GRID_SOURCE:
+            reused += 1
+        else:
+            pending.append((area_idx, area_name, image_path, digest))
+        old["areaName"] = area_name
+        areas_by_index[area_idx] = old
+
+    def save():
+        collision_data = {
+            "stageId": stage_id,
+            "areas": [areas_by_index[i] for i in sorted(areas_by_index)],
+        }
+        # Sidecars first: they stamp the nav keys the JSON must carry
+        save_nexthop_file(output_path.with_name(nexthop_path(stage_id).name), collision_data)
+        save_visibility_file(output_path.with_name(visibility_path(stage_id).name), collision_data)
+        save_collision_file(output_path, collision_data)
+
+    if not pending:
+        sidecars = (nexthop_path(stage_id), visibility_path(stage_id))
+        if adopted or not all(output_path.with_name(p.name).exists() for p in sidecars):
+            save()
+        print(f"  {output_path.name}: up to date ({reused} reused, {adopted} hashed)", flush=True)
+        return
+
+    async def run(area_idx, area_name, image_path, digest):
+        built = await build_area(stage_id, area_idx, area_name, image_path, vision)
+        return area_idx, area_name, built, digest
+
+    isolated = bodies = failed = 0
+    for job in asyncio.as_completed([run(*p) for p in pending]):
+        area_idx, area_name, built, digest = await job
+        if built is None:
+            failed += 1
+            if area_idx in areas_by_index:
+                print(f"  FAILED: keeping the previous grid for {stage_id} area {area_idx}", flush=True)
+                continue
+            # Open placeholder with no hash: the next run rebuilds it
+            print(f"  FAILED: using an open grid for {stage_id} area {area_idx} until it is rebuilt", flush=True)
+            entry = {"areaIndex": area_idx, "areaName": area_name,
+                     "grid": [[0] * GRID_COLS for _ in range(GRID_ROWS)]}
+            finalize_area(entry)
+            entry["sourceHash"] = None
+        else:
+            entry = built
+            counts = finalize_area(entry)
+            isolated, bodies = (a + b for a, b in zip((isolated, bodies), counts))
+            entry["sourceHash"] = digest
+            entry["source"] = GRID_SOURCE
+        areas_by_index[area_idx] = entry
+        # Checkpoint: everything finished so far survives a crash
+        save()
+
+    print(f"\n  Saved: {output_path.name} ({stage.get('name', '')}): "
+          f"{len(pending) - failed} rebuilt, {failed} failed, {reused} reused, {adopted} hashed; "
+          f"{isolated} isolated cells walled, {bodies} bodies in rebuilt areas", flush=True)
+
+
+async def generate_collision_maps_async(target_stages, vision, force=False):
     with open(STAGES_PATH, 'r', encoding='utf-8') as f:
         stages = json.load(f)
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+    jobs = []
     for stage in stages:
         stage_id = stage['id']
         if target_stages and stage_id not in target_stages:
             continue
-
-        areas = stage.get('areas', [])
-        if not areas:
+        if not stage.get('areas'):
             continue
 
         output_path = OUTPUT_DIR / f"collision_{stage_id}.json"
-        if output_path.exists():
-            print(f"\nSKIP (exists): collision_{stage_id}.json")
-            continue
-
-        print(f"\n{'='*60}")
-        print(f"Stage: {stage_id} ({stage.get('name', '')})")
-        print(f"{'='*60}")
-
-        collision_data = {
-            "stageId": stage_id,
-            "areas": []
-        }
+        jobs.append(build_stage(stage, vision, output_path, force))
 
-        for area_idx, area in enumerate(areas):
-            area_name = area.get('areaName', f'Area {area_idx}')
-            image_path = AREA_BG_DIR / f"area_{stage_id}_{area_idx}.png"
-
-            if not image_path.exists():
-                print(f"  WARNING: No image for area {area_idx} ({area_name}), skipping")
-                # Generate a default open grid
-                default_grid = [[0] * GRID_COLS for _ in range(GRID_ROWS)]
-                collision_data["areas"].append({
-                    "areaIndex": area_idx,
-                    "areaName": area_name,
-                    "grid": default_grid
-                })
-                continue
+    # All stages at once: the client's limiter, not the loop, paces API calls
+    await asyncio.gather(*jobs)
 
-            print(f"\n  Area {area_idx}: {area_name}", flush=True)
-            grid = analyze_image(str(image_path))
 
-            if grid is None:
-                print(f"  FAILED: Using default open grid for area {area_idx}", flush=True)
-                grid = [[0] * GRID_COLS for _ in range(GRID_ROWS)]
-            else:
-                # Post-process to ensure playability
-                grid = validate_and_fix_grid(grid)
-                wall_count = sum(cell for row in grid for cell in row)
-                total = GRID_ROWS * GRID_COLS
-                print(f"  Wall density: {wall_count}/{total} ({wall_count/total*100:.1f}%)", flush=True)
+def _load_api_key():
+    """API key from GEMINI_API_KEY or LOCAL_SECRETS.md, or None (runs can still be served from the cache)."""
+    from generate_images import API_KEY
+    return API_KEY
 
-            collision_data["areas"].append({
-                "areaIndex": area_idx,
-                "areaName": area_name,
-                "grid": grid
-            })
 
-            # Respect rate limit: 15s between calls
-            time.sleep(15)
-
-        # Save collision data for this stage
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(collision_data, f, ensure_ascii=False, indent=2)
-        print(f"\n  Saved: {output_path.name}")
+def generate_collision_maps(target_stages=None, endpoint=None,
+                            rpm=VISION_RPM, max_in_flight=VISION_MAX_IN_FLIGHT, force=False,
+                            batch_size=VISION_BATCH_SIZE):
+    """Generate collision maps for all stages."""
+    async def run():
+        api_key = os.environ.get("GEMINI_API_KEY", "stub") if endpoint else _load_api_key()
+        client = AsyncGeminiClient(endpoint or ENDPOINT, api_key, rpm=rpm, max_in_flight=max_in_flight)
+        vision = VisionBatcher(client, batch_size)
+        start = time.perf_counter()
+        await generate_collision_maps_async(target_stages, vision, force)
+        elapsed = time.perf_counter() - start
+        print(f"\n  Vision calls in {elapsed:.1f}s:", flush=True)
+        for line in vision.client.metrics.report():
+            print(f"    {line}", flush=True)
+        if batch_size > 1:
+            print(f"  Batches: {vision.stats}", flush=True)
+        if upload_stats["images"]:
+            print(f"  {upload_report()}", flush=True)
+        print(f"  Cache: {vision_cache.hits} hits, {vision_cache.misses} misses", flush=True)
+
+    asyncio.run(run())
 
 
 def main():
+    args = sys.argv[1:]
+    endpoint = None
+    rpm, max_in_flight = VISION_RPM, VISION_MAX_IN_FLIGHT
+    force = False
+    batch_size = VISION_BATCH_SIZE
+    target_stages = []
+    i = 0
+    while i < len(args):
+        if args[i] == "--endpoint" and i + 1 < len(args):
+            endpoint = args[i + 1]
+            if ":generateContent" not in endpoint:
+                endpoint = f"{endpoint.rstrip('/')}/v1beta/models/{MODEL}:generateContent"
+            i += 2
+        elif args[i] == "--rpm" and i + 1 < len(args):
+            rpm = float(args[i + 1])
+            i += 2
+        elif args[i] == "--in-flight" and i + 1 < len(args):
+            max_in_flight = int(args[i + 1])
+            i += 2
+        elif args[i] == "--batch" and i + 1 < len(args):
+            batch_size = int(args[i + 1])
+            i += 2
+        elif args[i] == "--force":
+            force = True
+            i += 1
+        elif args[i] == "--no-cache":
+            vision_cache.enabled = False
+            i += 1
+        else:
+            target_stages.append(args[i])
+            i += 1
+
     print("=" * 60)
     print("Stellar Gunners - Collision Map Generator")
-    print(f"API Key: {API_KEY[:10]}...")
+    if endpoint:
+        print(f"Endpoint: {endpoint}")
+    else:
+        api_key = _load_api_key()
+        print(f"API Key: {api_key[:10]}..." if api_key else "API Key: (none, cached responses only)")
+    print(f"Rate limit: {rpm:g} RPM, {max_in_flight} in flight")
+    if batch_size > 1:
+        print(f"Batching: up to {batch_size} images per request")
     print(f"Grid: {GRID_COLS}x{GRID_ROWS} ({CELL_W}x{CELL_H}px per cell)")
     print("=" * 60)
 
-    target_stages = None
-    if len(sys.argv) > 1:
-        target_stages = sys.argv[1:]
+    if target_stages:
         print(f"Target stages: {target_stages}")
 
-    generate_collision_maps(target_stages)
+    generate_collision_maps(target_stages or None, endpoint, rpm, max_in_flight, force, batch_size)
     print("\nDone!")
 
 
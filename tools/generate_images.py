@@ -1,22 +1,61 @@
 """
 Stellar Gunners - Gemini API Image Generator
 Uses NanobannaPro (gemini-3-pro-image-preview) for character art generation.
+
+Tasks are job lists run concurrently by job_scheduler.py on one rate-limited
+AsyncGeminiClient (--rpm, --in-flight), with live throughput and ETA. Job
+states go to the job journal (job_journal.py), so a rerun after an interrupt
+retries exactly the failed and unfinished images.
+
+Every returned image is kept in tools/.cache/images, keyed by model endpoint,
+prompt, reference image hashes and generation config. A request whose key is
+cached is served from disk, so deleting an output to try an edited prompt
+costs nothing when switching back. --refresh asks the API for a new sample
+even if cached; earlier samples stay in the cache.
+
+--sheets generates portraits (one sheet per character), face icons and skill
+icons as grid sheets sliced by grid_sheets.py: 30 calls become 8, plus one
+call per cell the slicer rejects. Outputs are the same per-file images.
+
+Usage:
+  python tools/generate_images.py [task ...] [--rpm 15] [--in-flight 8] [--endpoint URL] [--refresh] [--sheets]
+  python tools/generate_images.py [task ...] --emit-batch FILE.jsonl
+      Write the task's missing images as a Batch API request file (batch_jobs.py)
+  python tools/generate_images.py --ingest-batch FILE.jsonl RESULTS.jsonl
+      Save the images of a batch results file to the assets and image cache
 """
 
-import requests
-import base64
+import asyncio
 import json
 import os
+import shutil
 import sys
-import time
 from pathlib import Path
 
-# Load API key from LOCAL_SECRETS.md
+import requests
+
+from gemini_async import AsyncGeminiClient, response_text
+from gemini_client import GeminiError, shared_client, shared_report
+from grid_sheets import BLACK, MAGENTA, grid_shape, sheet_aspect, slice_sheet
+from batch_jobs import ingest_results, load_manifest, manifest_path, write_batch
+from inline_stream import STREAM_CHUNK, stream_inline_image
+from job_journal import JobJournal
+from job_scheduler import Job, JobFailed, run_jobs
+from response_cache import ResponseCache, cache_key
+from upload_images import inline_part, upload_report, upload_stats
+
+# API key: GEMINI_API_KEY, else LOCAL_SECRETS.md
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 SECRETS_PATH = PROJECT_ROOT / "LOCAL_SECRETS.md"
 
 def load_api_key():
+    """API key from the environment or LOCAL_SECRETS.md, or None if neither has
+    one (cached images and --endpoint runs against gemini_stub.py need none)."""
+    if os.environ.get("GEMINI_API_KEY"):
+        return os.environ["GEMINI_API_KEY"]
+    if not SECRETS_PATH.exists():
+        return None
     with open(SECRETS_PATH, "r", encoding="utf-8") as f:
         content = f.read()
     # Extract API key from markdown code block
@@ -24,185 +63,173 @@ def load_api_key():
         line = line.strip()
         if line.startswith("AIza"):
             return line
-    raise RuntimeError("API key not found in LOCAL_SECRETS.md")
+    return None
 
 API_KEY = load_api_key()
 MODEL = "gemini-3-pro-image-preview"
 ENDPOINT = f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL}:generateContent"
 
-# Rate limiting: free tier = 15 RPM
+# Rate limiting for callers of the blocking generate_image (free tier = 15 RPM)
 DELAY_BETWEEN_REQUESTS = 5  # seconds
 
+# Every generated image, by request key (image_cache_key)
+image_cache = ResponseCache("images")
 
-def generate_image_with_refs(prompt, ref_images, output_path, retry=2):
-    """Generate an image using Gemini API with reference images as multimodal input."""
-    headers = {
-        "x-goog-api-key": API_KEY,
-        "Content-Type": "application/json",
-    }
 
+def save_response_image(response, output_path):
+    """Stream a generateContent response, decoding its last non-thought inline image
+    straight into output_path (inline_stream.py; the base64 body is never held
+    in memory whole).
+
+    Returns (image size in bytes or None, model text)."""
+    try:
+        size, result = stream_inline_image(response.iter_content(STREAM_CHUNK), output_path)
+    except ValueError as e:
+        print(f"  WARNING: Unreadable response: {e}")
+        return None, ""
+    if not result.get("candidates"):
+        print(f"  WARNING: No candidates. Response: {json.dumps(result, indent=2)[:500]}")
+        return None, ""
+
+    text_response = response_text(result)
+    if size is None:
+        print(f"  WARNING: No image in response. Text: {text_response[:200]}")
+    return size, text_response
+
+
+def image_payload(prompt, ref_images=(), image_config=None):
+    """generateContent body for an image, with reference images as multimodal input."""
+    # References go up downscaled/re-encoded (upload_images.py "ref" preset)
     parts = [{"text": prompt}]
     for img_path in ref_images:
-        with open(img_path, "rb") as f:
-            img_b64 = base64.b64encode(f.read()).decode()
-        parts.append({
-            "inlineData": {
-                "mimeType": "image/png",
-                "data": img_b64
-            }
-        })
-
-    payload = {
+        parts.append(inline_part(img_path, "ref"))
+    config = {"responseModalities": ["TEXT", "IMAGE"]}
+    if image_config:
+        config["imageConfig"] = image_config
+    return {
         "contents": [{"parts": parts}],
-        "generationConfig": {
-            "responseModalities": ["TEXT", "IMAGE"],
-        },
+        "generationConfig": config,
     }
 
+
+def payload_prompt(payload):
+    return "\n".join(part["text"] for part in payload["contents"][0]["parts"] if "text" in part)
+
+
+def image_cache_key(endpoint, payload):
+    """Cache key for an image request: endpoint (stands in for the model), prompt
+    text, hashes of the uploaded reference images and generation config."""
+    parts = payload["contents"][0]["parts"]
+    prompt = payload_prompt(payload)
+    refs = [cache_key(part["inlineData"]["data"]) for part in parts if "inlineData" in part]
+    config = json.dumps(payload.get("generationConfig", {}), sort_keys=True)
+    return cache_key(endpoint, prompt, config, *refs)
+
+
+def cached_image(key, output_path):
+    """Copy the newest cached sample for key to output_path. Returns its size or None."""
+    entry = image_cache.get(key)
+    if entry is None:
+        return None
+    blob = image_cache.blob_path(entry["samples"][-1]["blob"], ".png")
+    if blob is None:
+        return None
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(blob, output_path)
+    return blob.stat().st_size
+
+
+def store_image(key, prompt, output_path, text_response):
+    """Add a generated image to the cache as the newest sample for key."""
+    # peek, not get: a --refresh run appends to the samples stored so far
+    entry = image_cache.peek(key)
+    if entry is None:
+        entry = {"prompt": prompt, "samples": []}
+    entry["samples"].append({"blob": image_cache.put_blob_file(output_path, ".png"),
+                             "output": Path(output_path).name, "bytes": Path(output_path).stat().st_size,
+                             "note": text_response[:200]})
+    image_cache.put(key, entry)
+
+
+def request_image(payload, output_path, label, timeout, retry):
+    """Send a generateContent payload and save the returned image.
+
+    HTTP retries and backoff live in the shared client (gemini_client.py);
+    retry here covers replies that arrive without an image.
+    """
+    key = image_cache_key(ENDPOINT, payload)
+    if cached_image(key, output_path) is not None:
+        print(f"  {label}: {Path(output_path).name} (cached)")
+        return output_path
+
+    if not API_KEY:
+        print(f"  Error: no API key (set GEMINI_API_KEY or add it to LOCAL_SECRETS.md)")
+        return None
+    client = shared_client(API_KEY)
     for attempt in range(retry + 1):
+        print(f"  {label}: {Path(output_path).name} (attempt {attempt+1})...")
         try:
-            print(f"  Generating with {len(ref_images)} refs: {Path(output_path).name} (attempt {attempt+1})...")
-            response = requests.post(ENDPOINT, headers=headers, json=payload, timeout=300)
-
-            if response.status_code == 429:
-                print(f"  Rate limited. Waiting 60s...")
-                time.sleep(60)
-                continue
-
-            response.raise_for_status()
-            result = response.json()
-
-            candidates = result.get("candidates", [])
-            if not candidates:
-                print(f"  WARNING: No candidates. Response: {json.dumps(result, indent=2)[:500]}")
-                if attempt < retry:
-                    time.sleep(10)
-                    continue
-                return None
-
-            parts_resp = candidates[0].get("content", {}).get("parts", [])
-            image_data = None
-            text_response = ""
-
-            for part in parts_resp:
-                if "inlineData" in part:
-                    image_data = part["inlineData"]["data"]
-                elif "inline_data" in part:
-                    image_data = part["inline_data"]["data"]
-                elif "text" in part:
-                    text_response = part["text"]
-
-            if image_data is None:
-                print(f"  WARNING: No image in response. Text: {text_response[:200]}")
-                if attempt < retry:
-                    time.sleep(10)
-                    continue
-                return None
-
-            image_bytes = base64.b64decode(image_data)
-            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, "wb") as f:
-                f.write(image_bytes)
-
-            size_kb = len(image_bytes) / 1024
-            print(f"  OK: {Path(output_path).name} ({size_kb:.0f} KB)")
-            if text_response:
-                print(f"  Model note: {text_response[:100]}")
-            return output_path
-
-        except requests.exceptions.Timeout:
-            print(f"  Timeout. Retrying...")
-            time.sleep(10)
-        except Exception as e:
+            response = client.request("POST", ENDPOINT, label, timeout=timeout, json=payload, stream=True)
+        except GeminiError as e:
             print(f"  Error: {e}")
-            if attempt < retry:
-                time.sleep(10)
+            return None
+
+        try:
+            with response:
+                size, text_response = save_response_image(response, output_path)
+        except requests.RequestException as e:
+            print(f"  Error reading response: {e}")
+            continue
+        if size is None:
+            continue
+        store_image(key, payload_prompt(payload), output_path, text_response)
+
+        size_kb = size / 1024
+        print(f"  OK: {Path(output_path).name} ({size_kb:.0f} KB)")
+        if text_response:
+            print(f"  Model note: {text_response[:100]}")
+        return output_path
 
     return None
 
 
-def generate_image(prompt, output_path, aspect_ratio="2:3", image_size="1K", retry=2):
-    """Generate an image using Gemini API and save to file."""
-    headers = {
-        "x-goog-api-key": API_KEY,
-        "Content-Type": "application/json",
-    }
+async def request_image_async(client, payload, output_path, label, retry=2):
+    """request_image for the job scheduler, on the shared AsyncGeminiClient.
 
-    payload = {
-        "contents": [
-            {
-                "parts": [
-                    {"text": prompt}
-                ]
-            }
-        ],
-        "generationConfig": {
-            "responseModalities": ["TEXT", "IMAGE"],
-        },
-    }
+    Returns True once saved; raises JobFailed with the reason otherwise.
+    """
+    key = image_cache_key(client.endpoint, payload)
+    size = cached_image(key, output_path)
+    if size is not None:
+        print(f"  {label}: {Path(output_path).name} from cache ({size / 1024:.0f} KB)", flush=True)
+        return True
 
     for attempt in range(retry + 1):
         try:
-            print(f"  Generating: {Path(output_path).name} (attempt {attempt+1})...")
-            response = requests.post(ENDPOINT, headers=headers, json=payload, timeout=180)
-
-            if response.status_code == 429:
-                print(f"  Rate limited. Waiting 60s...")
-                time.sleep(60)
-                continue
-
-            response.raise_for_status()
-            result = response.json()
-
-            # Extract image from response
-            candidates = result.get("candidates", [])
-            if not candidates:
-                print(f"  WARNING: No candidates. Response: {json.dumps(result, indent=2)[:500]}")
-                if attempt < retry:
-                    time.sleep(10)
-                    continue
-                return None
-
-            parts = candidates[0].get("content", {}).get("parts", [])
-            image_data = None
-            text_response = ""
-
-            for part in parts:
-                if "inlineData" in part:
-                    image_data = part["inlineData"]["data"]
-                elif "inline_data" in part:
-                    image_data = part["inline_data"]["data"]
-                elif "text" in part:
-                    text_response = part["text"]
-
-            if image_data is None:
-                print(f"  WARNING: No image in response. Text: {text_response[:200]}")
-                if attempt < retry:
-                    time.sleep(10)
-                    continue
-                return None
-
-            # Save image
-            image_bytes = base64.b64decode(image_data)
-            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, "wb") as f:
-                f.write(image_bytes)
-
-            size_kb = len(image_bytes) / 1024
-            print(f"  OK: {Path(output_path).name} ({size_kb:.0f} KB)")
-            if text_response:
-                print(f"  Model note: {text_response[:100]}")
-            return output_path
-
-        except requests.exceptions.Timeout:
-            print(f"  Timeout. Retrying...")
-            time.sleep(10)
-        except Exception as e:
-            print(f"  Error: {e}")
-            if attempt < retry:
-                time.sleep(10)
+            size, text_response = await client.generate_stream(
+                payload, lambda response: save_response_image(response, output_path), "image")
+        except GeminiError as e:
+            raise JobFailed(str(e)) from e
 
-    return None
+        if size is None:
+            print(f"  {label}: no image (attempt {attempt + 1})", flush=True)
+            continue
+        store_image(key, payload_prompt(payload), output_path, text_response)
+        note = f" | model note: {text_response[:80]}" if text_response else ""
+        print(f"  {label}: saved {Path(output_path).name} ({size / 1024:.0f} KB){note}", flush=True)
+        return True
+    raise JobFailed(f"no image in {retry + 1} replies")
+
+
+def generate_image_with_refs(prompt, ref_images, output_path, retry=2):
+    """Generate an image using Gemini API with reference images as multimodal input."""
+    return request_image(image_payload(prompt, ref_images), output_path,
+                         f"Generating with {len(ref_images)} refs", 300, retry)
+
+
+def generate_image(prompt, output_path, aspect_ratio="2:3", image_size="1K", retry=2):
+    """Generate an image using Gemini API and save to file."""
+    return request_image(image_payload(prompt), output_path, "Generating", 180, retry)
 
 
 # ============================================================
@@ -439,68 +466,127 @@ def build_face_icon_prompt(char_key):
     return prompt
 
 
+def build_sheet_prompt(cols, rows, subject, shared, cells, background):
+    """Build prompt for a grid sheet: one image per cell, each cell labeled by
+    its row and column (grid_sheets.py slices the result)."""
+    lines = []
+    for index, desc in enumerate(cells):
+        row, col = divmod(index, cols)
+        lines.append(f"Row {row + 1}, column {col + 1}: {desc}")
+    empty = cols * rows - len(cells)
+
+    prompt = (
+        f"Create a grid sheet of {len(cells)} separate images: {cols} columns x {rows} rows "
+        f"of equal-sized cells, read left to right, top to bottom. "
+        f"Each cell holds exactly one {subject}, centered in its cell with a wide empty margin; "
+        f"nothing touches, overlaps or crosses into a neighbouring cell. "
+        f"{shared} "
+        f"Background: {background}, one flat color across the whole sheet. "
+        f"No grid lines, borders, text, labels or numbers in the image."
+        f"\n\n" + "\n".join(lines)
+    )
+    if empty:
+        prompt += f"\n\nThe remaining {empty} cell{'s' if empty > 1 else ''} stay empty background."
+    return prompt
+
+
+def build_portrait_sheet_prompt(char_key, cols, rows):
+    """Build prompt for all of a character's portrait expressions on one sheet."""
+    char = CHARACTERS[char_key]
+    colors = char["colors"]
+    shared = (
+        f"Every cell shows the same character: {char['appearance']}. "
+        f"Style: {STYLE_BASE}. "
+        f"Hair color: {colors['hair']}, main outfit color: {colors['outfit']}, accent color: {colors['accent']}. "
+        f"Keep the exact same design, outfit and proportions in every cell. "
+        f"Full body visible from head to feet, standing upright, no shadow on ground. "
+        f"Clean anime linework, high detail face and outfit."
+    )
+    cells = [f"expression and pose: {desc}" for desc in char["expressions"].values()]
+    return build_sheet_prompt(cols, rows, "full-body standing portrait of one anime girl character",
+                              shared, cells, "solid bright magenta (#FF00FF)")
+
+
+def build_face_icon_sheet_prompt(cols, rows):
+    """Build prompt for every character's face icon on one sheet."""
+    shared = (
+        "Style: anime style character icons for a game UI, clean lines, vibrant colors, "
+        "consistent framing across the set. Expression: neutral friendly smile. "
+        "Sharp clean edges suitable for small icon display."
+    )
+    cells = [f"{char['tag']}, {char['appearance']}. Hair color: {char['colors']['hair']}, "
+             f"accent: {char['colors']['accent']}"
+             for char in CHARACTERS.values()]
+    return build_sheet_prompt(cols, rows, "close-up face portrait icon showing only the face and upper "
+                              "shoulders, square composition, face centered",
+                              shared, cells, "solid magenta (#FF00FF)")
+
+
+def build_skill_icon_sheet_prompt(cols, rows):
+    """Build prompt for every skill icon on one sheet."""
+    shared = (
+        "Game UI skill icons for a sci-fi anime game, consistent style across the set: "
+        "clean, sharp edges, suitable for small 40x40 pixel display, vibrant glowing colors."
+    )
+    cells = [desc for _, desc in SKILL_ICONS]
+    return build_sheet_prompt(cols, rows, "simple recognizable square skill icon symbol",
+                              shared, cells, "solid black (#000000)")
+
+
 # ============================================================
 # Generation Tasks
 # ============================================================
 
 ASSETS_DIR = PROJECT_ROOT / "assets" / "images"
 
-def gen_portraits():
-    """Generate all scenario standing portraits."""
-    print("\n=== Generating Scenario Portraits ===\n")
-    output_dir = ASSETS_DIR / "portraits"
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    for char_key, char in CHARACTERS.items():
-        for expr_key in char["expressions"]:
-            filename = f"{char_key}_{expr_key}.png"
-            output_path = output_dir / filename
-
-            if output_path.exists():
-                print(f"  SKIP (exists): {filename}")
-                continue
+# Every task is a list of jobs (job_scheduler.py) sharing one rate-limited
+# client; IMAGE_RPM / IMAGE_MAX_IN_FLIGHT pace the calls instead of a fixed
+# sleep between them
+IMAGE_RPM = 15           # free tier quota
+IMAGE_MAX_IN_FLIGHT = 8  # image calls take ~20-40s, so ~8 in flight keeps 15 RPM busy
 
-            prompt = build_portrait_prompt(char_key, expr_key)
-            generate_image(prompt, str(output_path), aspect_ratio="2:3", image_size="1K")
-            time.sleep(DELAY_BETWEEN_REQUESTS)
 
+def image_job(client, name, output_path, prompt, refs=(), min_refs=None, deps=(), after=()):
+    """Job generating one image.
 
-def gen_sprites():
-    """Generate game sprite sheets for all characters."""
-    print("\n=== Generating Game Sprites ===\n")
-    output_dir = ASSETS_DIR / "characters"
-    output_dir.mkdir(parents=True, exist_ok=True)
+    refs (paths) are read when the job runs, i.e. after deps; the job fails if
+    fewer than min_refs of them exist (default: all).
+    """
+    async def run():
+        ref_paths = [str(p) for p in refs if Path(p).exists()]
+        needed = len(refs) if min_refs is None else min_refs
+        if len(ref_paths) < needed:
+            missing = ", ".join(Path(p).name for p in refs if not Path(p).exists())
+            raise JobFailed(f"missing reference images ({missing})")
+        return await request_image_async(client, image_payload(prompt, ref_paths), output_path, name)
+    return Job(name, run, deps=deps, after=after, output=output_path,
+               spec={"prompt": prompt, "refs": refs, "min_refs": min_refs})
 
-    for char_key in CHARACTERS:
-        filename = f"{char_key}_sprites.png"
-        output_path = output_dir / filename
 
-        if output_path.exists():
-            print(f"  SKIP (exists): {filename}")
-            continue
+def portrait_job(client, char_key, expr_key):
+    return image_job(client, f"portrait {char_key}_{expr_key}",
+                     ASSETS_DIR / "portraits" / f"{char_key}_{expr_key}.png",
+                     build_portrait_prompt(char_key, expr_key))
 
-        prompt = build_sprite_prompt(char_key)
-        generate_image(prompt, str(output_path), aspect_ratio="1:1", image_size="1K")
-        time.sleep(DELAY_BETWEEN_REQUESTS)
 
+def portrait_jobs(client):
+    """Scenario standing portraits."""
+    return [portrait_job(client, char_key, expr_key)
+            for char_key, char in CHARACTERS.items() for expr_key in char["expressions"]]
 
-def gen_face_icons():
-    """Generate face icons for UI."""
-    print("\n=== Generating Face Icons ===\n")
-    output_dir = ASSETS_DIR / "ui"
-    output_dir.mkdir(parents=True, exist_ok=True)
 
-    for char_key in CHARACTERS:
-        filename = f"{char_key}_icon.png"
-        output_path = output_dir / filename
+def sprite_jobs(client):
+    """Game sprite sheets for all characters."""
+    return [image_job(client, f"sprites {char_key}", ASSETS_DIR / "characters" / f"{char_key}_sprites.png",
+                      build_sprite_prompt(char_key))
+            for char_key in CHARACTERS]
 
-        if output_path.exists():
-            print(f"  SKIP (exists): {filename}")
-            continue
 
-        prompt = build_face_icon_prompt(char_key)
-        generate_image(prompt, str(output_path), aspect_ratio="1:1", image_size="1K")
-        time.sleep(DELAY_BETWEEN_REQUESTS)
+def face_icon_jobs(client):
+    """Face icons for UI."""
+    return [image_job(client, f"icon {char_key}", ASSETS_DIR / "ui" / f"{char_key}_icon.png",
+                      build_face_icon_prompt(char_key))
+            for char_key in CHARACTERS]
 
 
 ENEMIES = [
@@ -513,23 +599,11 @@ ENEMIES = [
     ("boss_xr07", "XR-07", "massive humanoid war machine boss with multiple weapon arms, glowing red core, heavy armor plating", 128),
 ]
 
-def gen_enemies():
-    """Generate enemy sprites."""
-    print("\n=== Generating Enemy Sprites ===\n")
-    output_dir = ASSETS_DIR / "enemies"
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    for enemy_id, name_jp, desc, size in ENEMIES:
-        filename = f"{enemy_id}.png"
-        output_path = output_dir / filename
-
-        if output_path.exists():
-            print(f"  SKIP (exists): {filename}")
-            continue
-
-        prompt = build_enemy_sprite_prompt(enemy_id, name_jp, desc, size)
-        generate_image(prompt, str(output_path), aspect_ratio="1:1", image_size="1K")
-        time.sleep(DELAY_BETWEEN_REQUESTS)
+def enemy_jobs(client):
+    """Enemy sprites."""
+    return [image_job(client, f"enemy {enemy_id}", ASSETS_DIR / "enemies" / f"{enemy_id}.png",
+                      build_enemy_sprite_prompt(enemy_id, name_jp, desc, size))
+            for enemy_id, name_jp, desc, size in ENEMIES]
 
 
 BACKGROUNDS = [
@@ -556,39 +630,17 @@ SKILL_ICONS = [
     ("icon_skill_break", "A red lightning bolt icon striking downward, break/shatter effect, crackling red energy, armor-piercing symbol, sci-fi destructive force"),
 ]
 
-def gen_backgrounds():
-    """Generate background images."""
-    print("\n=== Generating Backgrounds ===\n")
-    output_dir = ASSETS_DIR / "backgrounds"
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    for bg_key, desc in BACKGROUNDS:
-        filename = f"{bg_key}.png"
-        output_path = output_dir / filename
-
-        if output_path.exists():
-            print(f"  SKIP (exists): {filename}")
-            continue
-
-        prompt = build_background_prompt(bg_key, desc)
-        generate_image(prompt, str(output_path), aspect_ratio="16:9", image_size="1K")
-        time.sleep(DELAY_BETWEEN_REQUESTS)
-
+def background_jobs(client):
+    """Background images."""
+    return [image_job(client, f"background {bg_key}", ASSETS_DIR / "backgrounds" / f"{bg_key}.png",
+                      build_background_prompt(bg_key, desc))
+            for bg_key, desc in BACKGROUNDS]
 
-def gen_skill_icons():
-    """Generate skill type icons for battle UI."""
-    print("\n=== Generating Skill Icons ===\n")
-    output_dir = ASSETS_DIR / "ui" / "skills"
-    output_dir.mkdir(parents=True, exist_ok=True)
 
+def skill_icon_jobs(client):
+    """Skill type icons for battle UI."""
+    jobs = []
     for icon_key, desc in SKILL_ICONS:
-        filename = f"{icon_key}.png"
-        output_path = output_dir / filename
-
-        if output_path.exists():
-            print(f"  SKIP (exists): {filename}")
-            continue
-
         prompt = (
             f"Create a game UI skill icon: {desc}. "
             f"Square icon on solid black background (#000000). "
@@ -596,24 +648,25 @@ def gen_skill_icons():
             f"Anime game style, vibrant glowing colors, no text. "
             f"Simple recognizable symbol centered in frame."
         )
-        generate_image(prompt, str(output_path), aspect_ratio="1:1", image_size="1K")
-        time.sleep(DELAY_BETWEEN_REQUESTS)
-
-
-def gen_pv_action_art():
-    """Generate action illustration for each character using portraits as reference.
-    These are used as VEO image-to-video reference frames for PV clips."""
-    print("\n=== Generating PV Action Art (for VEO reference) ===\n")
-
-    portrait_map = {
-        "chr_01": "confident",
-        "chr_02": "calm",
-        "chr_03": "confident",
-        "chr_04": "cool",
-        "chr_05": "cheerful",
-        "chr_06": "focused",
-    }
+        jobs.append(image_job(client, f"skill icon {icon_key}", ASSETS_DIR / "ui" / "skills" / f"{icon_key}.png", prompt))
+    return jobs
+
+
+# Portrait used as the reference for each character's PV art and the key visual
+REF_PORTRAITS = {
+    "chr_01": "confident",
+    "chr_02": "calm",
+    "chr_03": "confident",
+    "chr_04": "cool",
+    "chr_05": "cheerful",
+    "chr_06": "focused",
+}
 
+
+def pv_action_art_jobs(client):
+    """Action illustration for each character using portraits as reference.
+    These are used as VEO image-to-video reference frames for PV clips.
+    Each waits for its reference portrait if portraits are in the same run."""
     action_descriptions = {
         "chr_01": (
             "dynamic action pose, dashing forward while firing her assault rifle, "
@@ -648,26 +701,14 @@ def gen_pv_action_art():
     }
 
     output_dir = PROJECT_ROOT / "assets" / "video" / "pv_art"
-    output_dir.mkdir(parents=True, exist_ok=True)
     portrait_dir = ASSETS_DIR / "portraits"
 
+    jobs = []
     for char_key, char in CHARACTERS.items():
-        filename = f"{char_key}_action.png"
-        output_path = output_dir / filename
-
-        if output_path.exists():
-            print(f"  SKIP (exists): {filename}")
-            continue
-
-        expr = portrait_map.get(char_key)
+        expr = REF_PORTRAITS.get(char_key)
         if not expr:
             continue
 
-        ref_path = portrait_dir / f"{char_key}_{expr}.png"
-        if not ref_path.exists():
-            print(f"  WARNING: Missing portrait {ref_path.name}, skipping.")
-            continue
-
         action_desc = action_descriptions.get(char_key, "dynamic action battle pose")
         colors = char["colors"]
 
@@ -685,37 +726,16 @@ def gen_pv_action_art():
             f"High quality, no text or UI elements."
         )
 
-        print(f"\n  --- {char['name_jp']} ({char_key}) ---")
-        generate_image_with_refs(prompt, [str(ref_path)], str(output_path), retry=2)
-        time.sleep(DELAY_BETWEEN_REQUESTS)
-
+        jobs.append(image_job(client, f"pv art {char_key}", output_dir / f"{char_key}_action.png", prompt,
+                              refs=[portrait_dir / f"{char_key}_{expr}.png"],
+                              deps=[f"portrait {char_key}_{expr}"]))
+    return jobs
 
-def gen_key_visual():
-    """Generate key visual and title logo using character portraits as reference."""
-    print("\n=== Generating Key Visual & Title Logo ===\n")
 
-    # Collect reference portraits (one per character)
-    portrait_map = {
-        "chr_01": "confident",
-        "chr_02": "calm",
-        "chr_03": "confident",
-        "chr_04": "cool",
-        "chr_05": "cheerful",
-        "chr_06": "focused",
-    }
-    ref_images = []
+def key_visual_jobs(client):
+    """Key visual (character portraits as reference) and title logo."""
     portrait_dir = ASSETS_DIR / "portraits"
-    for char_key, expr in portrait_map.items():
-        path = portrait_dir / f"{char_key}_{expr}.png"
-        if path.exists():
-            ref_images.append(str(path))
-            print(f"  Ref: {path.name}")
-        else:
-            print(f"  WARNING: Missing ref {path.name}")
-
-    if len(ref_images) < 3:
-        print("  ERROR: Need at least 3 reference portraits. Aborting.")
-        return
+    refs = [portrait_dir / f"{char_key}_{expr}.png" for char_key, expr in REF_PORTRAITS.items()]
 
     # --- Key Visual ---
     kv_output = PROJECT_ROOT / "assets" / "images" / "key_visual.png"
@@ -736,9 +756,9 @@ def gen_key_visual():
         "DO NOT include any text, title, or logos in the image - characters and "
         "background only."
     )
-    print("\n  --- Key Visual ---")
-    generate_image_with_refs(kv_prompt, ref_images, str(kv_output), retry=2)
-    time.sleep(DELAY_BETWEEN_REQUESTS)
+    # Waits for the portraits in this run but goes ahead with any 3 of them
+    kv_job = image_job(client, "key visual", kv_output, kv_prompt, refs=refs, min_refs=3,
+                       after=[f"portrait {char_key}_{expr}" for char_key, expr in REF_PORTRAITS.items()])
 
     # --- Title Logo ---
     logo_output = PROJECT_ROOT / "assets" / "images" / "title_logo.png"
@@ -755,8 +775,179 @@ def gen_key_visual():
         "The logo should look like it belongs on a AAA anime game title screen. "
         "Landscape orientation. Text only, no characters or illustrations."
     )
-    print("\n  --- Title Logo ---")
-    generate_image(logo_prompt, str(logo_output))
+    return [kv_job, image_job(client, "title logo", logo_output, logo_prompt)]
+
+
+# ============================================================
+# Grid sheets (--sheets)
+# ============================================================
+
+# One call renders a whole sheet of images, which grid_sheets.py cuts into the
+# usual per-file outputs. The per-file jobs still run, after their sheet: a
+# cell that was saved is skipped, a rejected one is requested on its own.
+SHEET_DIR = SCRIPT_DIR / ".cache" / "sheets"
+SHEET_IMAGE_SIZE = "2K"  # cells of a 2K sheet come out near the size of a 1K single image
+
+
+def sheet_jobs(client, name, cell_jobs, build_prompt, background=MAGENTA, cell_aspect=1.0):
+    """A sheet job for cell_jobs (one image each) followed by the cell jobs themselves.
+
+    build_prompt(cols, rows) returns the sheet prompt for the chosen layout.
+    """
+    cols, rows = grid_shape(len(cell_jobs), cell_aspect)
+    prompt = build_prompt(cols, rows)
+    sheet_path = SHEET_DIR / f"{name.replace(' ', '_')}.png"
+
+    async def run():
+        payload = image_payload(prompt, image_config={"aspectRatio": sheet_aspect(cols, rows, cell_aspect),
+                                                      "imageSize": SHEET_IMAGE_SIZE})
+        await request_image_async(client, payload, sheet_path, name)
+        outputs = [None if job.output.exists() else job.output for job in cell_jobs]
+        rejected = await asyncio.to_thread(slice_sheet, sheet_path, cols, rows, outputs,
+                                           background, cell_aspect)
+        wanted = sum(1 for p in outputs if p)
+        note = ", ".join(f"{cell_jobs[i].output.name} {reason}" for i, reason in rejected.items())
+        print(f"  {name}: {wanted - len(rejected)}/{wanted} cells saved"
+              + (f" (requesting singly: {note})" if rejected else ""), flush=True)
+        return True
+
+    for job in cell_jobs:
+        job.after += (name,)
+    sheet = Job(name, run, output=[job.output for job in cell_jobs],
+                spec={"prompt": prompt, "layout": (cols, rows)})
+    return [sheet] + cell_jobs
+
+
+def portrait_sheet_jobs(client):
+    """Scenario standing portraits, one sheet per character."""
+    jobs = []
+    for char_key, char in CHARACTERS.items():
+        cells = [portrait_job(client, char_key, expr_key) for expr_key in char["expressions"]]
+        if len(cells) < 2:
+            jobs += cells
+            continue
+        jobs += sheet_jobs(client, f"portrait sheet {char_key}", cells,
+                           lambda cols, rows, char_key=char_key: build_portrait_sheet_prompt(char_key, cols, rows),
+                           MAGENTA, 2 / 3)
+    return jobs
+
+
+def face_icon_sheet_jobs(client):
+    """Face icons for UI, all on one sheet."""
+    return sheet_jobs(client, "icon sheet", face_icon_jobs(client), build_face_icon_sheet_prompt, MAGENTA)
+
+
+def skill_icon_sheet_jobs(client):
+    """Skill type icons, all on one sheet."""
+    return sheet_jobs(client, "skill icon sheet", skill_icon_jobs(client), build_skill_icon_sheet_prompt, BLACK)
+
+
+TASKS = {
+    "portraits": portrait_jobs,
+    "sprites": sprite_jobs,
+    "icons": face_icon_jobs,
+    "enemies": enemy_jobs,
+    "backgrounds": background_jobs,
+    "skillicons": skill_icon_jobs,
+    "pvart": pv_action_art_jobs,
+    "keyvisual": key_visual_jobs,
+}
+ALL_TASKS = ["portraits", "sprites", "icons", "enemies", "backgrounds", "skillicons", "keyvisual"]
+
+# Tasks that can be generated as grid sheets
+SHEET_TASKS = {
+    "portraits": portrait_sheet_jobs,
+    "icons": face_icon_sheet_jobs,
+    "skillicons": skill_icon_sheet_jobs,
+}
+
+
+def run_tasks(task_names, rpm=IMAGE_RPM, max_in_flight=IMAGE_MAX_IN_FLIGHT, endpoint=None, sheets=False):
+    """Run the jobs of the given tasks together on one scheduler. Returns {job: state}."""
+    async def run():
+        api_key = API_KEY or ("stub" if endpoint else None)
+        client = AsyncGeminiClient(endpoint or ENDPOINT, api_key, rpm=rpm, max_in_flight=max_in_flight)
+        builders = {**TASKS, **SHEET_TASKS} if sheets else TASKS
+        jobs = [job for name in task_names for job in builders[name](client)]
+        print(f"\n=== {', '.join(task_names)}: {rpm} RPM, up to {max_in_flight} in flight ===\n", flush=True)
+        results = await run_jobs(jobs, journal=JobJournal("generate_images"))
+        if client.metrics.latencies:
+            print()
+            for line in client.metrics.report():
+                print(f"  {line}")
+        return results
+
+    return asyncio.run(run())
+
+
+# ============================================================
+# Batch mode
+# ============================================================
+
+def batch_entry(key, output_path, prompt, refs=()):
+    """One request for a batch file (batch_jobs.py), keyed by job name."""
+    payload = image_payload(prompt, refs)
+    return {"key": key, "payload": payload, "output": output_path, "prompt": prompt,
+            "cacheKey": image_cache_key(ENDPOINT, payload)}
+
+
+def emit_image_batch(requests_path, entries):
+    """Write the entries whose output is missing to a batch request file;
+    anything already in the image cache is copied out instead of requested."""
+    pending, cached = [], 0
+    for entry in entries:
+        if Path(entry["output"]).exists():
+            continue
+        if cached_image(entry["cacheKey"], entry["output"]) is not None:
+            cached += 1
+            continue
+        pending.append(entry)
+    count = write_batch(requests_path, pending, ENDPOINT) if pending else 0
+    print(f"  {count} requests -> {requests_path}" + (f" ({cached} served from cache)" if cached else ""))
+    if count:
+        print(f"  Manifest: {manifest_path(requests_path)}")
+        print(f"  Submit it to {MODEL}:batchGenerateContent, then ingest the results with")
+        print(f"  --ingest-batch {requests_path} RESULTS.jsonl")
+    return count
+
+
+def ingest_image_batch(requests_path, results_path, tool):
+    """Save the images of a batch results file to the outputs listed in the
+    request file's manifest, adding them to the image cache and job journal."""
+    manifest = load_manifest(manifest_path(requests_path))
+    journal = JobJournal(tool)
+
+    def saved(key, job, output_path, text_response):
+        store_image(job["cacheKey"], job["prompt"], output_path, text_response)
+        journal.finish(key)
+        print(f"  OK: {key} -> {Path(output_path).name}")
+
+    report = ingest_results(results_path, manifest, on_image=saved)
+    for key, reason in report["failed"].items():
+        print(f"  FAILED: {key}: {reason}")
+        if key in manifest["jobs"]:
+            journal.fail(key, f"batch: {reason}")
+    if report["unknown"]:
+        print(f"  {len(report['unknown'])} results not in the manifest: {', '.join(map(str, report['unknown'][:5]))}")
+    print(f"  Ingested {report['saved']} of {len(manifest['jobs'])} requests, {len(report['failed'])} failed")
+    return report
+
+
+def emit_task_batch(task_names, requests_path):
+    """Batch file for the jobs of the given tasks. Jobs whose reference images
+    do not exist yet (pvart/keyvisual before portraits) are left out."""
+    entries, waiting = [], []
+    for job in (job for name in task_names for job in TASKS[name](None)):
+        refs = [str(p) for p in job.spec["refs"] if Path(p).exists()]
+        needed = len(job.spec["refs"]) if job.spec["min_refs"] is None else job.spec["min_refs"]
+        if len(refs) < needed:
+            if not job.output.exists():
+                waiting.append(job.name)
+            continue
+        entries.append(batch_entry(job.name, job.output, job.spec["prompt"], refs))
+    if waiting:
+        print(f"  Waiting for reference images (emit again after ingesting): {', '.join(waiting)}")
+    return emit_image_batch(requests_path, entries)
 
 
 # ============================================================
@@ -767,45 +958,55 @@ def main():
     print("=" * 60)
     print("Stellar Gunners - Image Asset Generator")
     print(f"Model: {MODEL}")
-    print(f"API Key: {API_KEY[:10]}...")
+    print(f"API Key: {API_KEY[:10]}..." if API_KEY else "API Key: (none, cached images only)")
     print("=" * 60)
 
-    if len(sys.argv) > 1:
-        task = sys.argv[1]
-        if task == "portraits":
-            gen_portraits()
-        elif task == "sprites":
-            gen_sprites()
-        elif task == "icons":
-            gen_face_icons()
-        elif task == "enemies":
-            gen_enemies()
-        elif task == "backgrounds":
-            gen_backgrounds()
-        elif task == "skillicons":
-            gen_skill_icons()
-        elif task == "pvart":
-            gen_pv_action_art()
-        elif task == "keyvisual":
-            gen_key_visual()
-        elif task == "all":
-            gen_portraits()
-            gen_sprites()
-            gen_face_icons()
-            gen_enemies()
-            gen_backgrounds()
-            gen_skill_icons()
-            gen_key_visual()
-        elif task == "test":
-            # Quick test: generate one portrait
-            prompt = build_portrait_prompt("chr_01", "confident")
-            output = ASSETS_DIR / "portraits" / "test_reina.png"
-            generate_image(prompt, str(output))
+    args = sys.argv[1:]
+    tasks = []
+    options = {"--rpm": IMAGE_RPM, "--in-flight": IMAGE_MAX_IN_FLIGHT, "--endpoint": None, "--emit-batch": None}
+    ingest = None
+    sheets = False
+    i = 0
+    while i < len(args):
+        if args[i] == "--refresh":
+            image_cache.refresh = True
+            i += 1
+        elif args[i] == "--sheets":
+            sheets = True
+            i += 1
+        elif args[i] == "--ingest-batch" and i + 2 < len(args):
+            ingest = (args[i + 1], args[i + 2])
+            i += 3
+        elif args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1] if args[i] in ("--endpoint", "--emit-batch") else int(args[i + 1])
+            i += 2
+        else:
+            tasks.append(args[i])
+            i += 1
+
+    if ingest:
+        ingest_image_batch(ingest[0], ingest[1], "generate_images")
+    elif tasks == ["test"]:
+        # Quick test: generate one portrait
+        prompt = build_portrait_prompt("chr_01", "confident")
+        output = ASSETS_DIR / "portraits" / "test_reina.png"
+        generate_image(prompt, str(output))
+    elif tasks:
+        names = []
+        for task in tasks:
+            for name in (ALL_TASKS if task == "all" else [task]):
+                if name not in names:
+                    names.append(name)
+        unknown = [name for name in names if name not in TASKS]
+        if unknown:
+            print(f"Unknown task: {', '.join(unknown)}")
+            print("Usage: python generate_images.py [portraits|sprites|icons|enemies|backgrounds|skillicons|pvart|keyvisual|all|test] ...")
+        elif options["--emit-batch"]:
+            emit_task_batch(names, options["--emit-batch"])
         else:
-            print(f"Unknown task: {task}")
-            print("Usage: python generate_images.py [portraits|sprites|icons|enemies|backgrounds|skillicons|pvart|keyvisual|all|test]")
+            run_tasks(names, options["--rpm"], options["--in-flight"], options["--endpoint"], sheets)
     else:
-        print("\nUsage: python generate_images.py [task]")
+        print("\nUsage: python generate_images.py [task ...] [--rpm N] [--in-flight N] [--endpoint URL] [--refresh] [--sheets]")
         print("Tasks:")
         print("  test        - Generate one test image (Reina portrait)")
         print("  portraits   - Generate all scenario standing portraits (16 images)")
@@ -816,7 +1017,18 @@ def main():
         print("  pvart       - Generate PV action illustrations (6 images, for VEO ref)")
         print("  keyvisual   - Generate key visual + title logo")
         print("  all         - Generate everything (40+ images)")
-
+        print("Several tasks run together; pvart/keyvisual wait for the portraits they use.")
+        print("Cached results are reused; --refresh requests new samples (old ones stay cached).")
+        print("--sheets: portraits, icons and skillicons as grid sheets (one call per sheet).")
+        print("Offline: [task ...] --emit-batch FILE.jsonl, later --ingest-batch FILE.jsonl RESULTS.jsonl")
+
+    if upload_stats["images"]:
+        print(f"\n{upload_report()}")
+    if image_cache.hits:
+        print(f"\nImage cache: {image_cache.hits} served from cache, {image_cache.misses} requested")
+    report = shared_report()
+    if report:
+        print("\n" + "\n".join(report))
     print("\nDone!")
 
 
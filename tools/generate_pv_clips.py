@@ -2,17 +2,24 @@
 Stellar Gunners - VEO 3.1 PV Clip Generator
 Generates short anime-style video clips for each character using Google VEO 3.1 API.
 Output: assets/video/clips/chr_0X_clip.mp4
+Clip states and VEO operation names are kept in the job journal
+(job_journal.py), so an interrupted run resumes renders already paid for.
+--endpoint URL sends the VEO calls to another server, e.g. gemini_stub.py.
 """
 
-import requests
 import json
-import base64
 import os
 import sys
 import time
+from collections import deque
 from pathlib import Path
 
-# Load API key from LOCAL_SECRETS.md
+from gemini_client import GeminiError, is_retryable, shared_client, shared_report
+from job_journal import JobJournal
+from job_scheduler import JobFailed
+from upload_images import prepare_image, upload_report, upload_stats
+
+# API key: GEMINI_API_KEY, else LOCAL_SECRETS.md
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 SECRETS_PATH = PROJECT_ROOT / "LOCAL_SECRETS.md"
@@ -27,16 +34,28 @@ VEO_MODELS = {
 }
 VEO_MODEL = VEO_MODELS["3.1"]  # Default; override with --model flag
 API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+VEO_BACKOFF_BASE = 30  # seconds; VEO quota is per minute, so back off in larger steps
+JOURNAL_TOOL = "generate_pv_clips"
+
+# generate_all_clips keeps several operations rendering server-side at once
+VEO_MAX_ACTIVE = 3        # operations in flight (--parallel)
+VEO_SUBMIT_INTERVAL = 10  # seconds between submissions
+VEO_MAX_WAIT = 600        # seconds before a clip is left rendering for the next run
+POLL_MIN = 10             # adaptive poll interval bounds, seconds
+POLL_MAX = 60
 
 
 def load_api_key():
-    with open(SECRETS_PATH, "r", encoding="utf-8") as f:
-        content = f.read()
-    for line in content.splitlines():
-        line = line.strip()
-        if line.startswith("AIza"):
-            return line
-    raise RuntimeError("API key not found in LOCAL_SECRETS.md")
+    if os.environ.get("GEMINI_API_KEY"):
+        return os.environ["GEMINI_API_KEY"]
+    if SECRETS_PATH.exists():
+        with open(SECRETS_PATH, "r", encoding="utf-8") as f:
+            content = f.read()
+        for line in content.splitlines():
+            line = line.strip()
+            if line.startswith("AIza"):
+                return line
+    raise RuntimeError("No API key: set GEMINI_API_KEY or add it to LOCAL_SECRETS.md")
 
 
 def load_characters():
@@ -132,30 +151,21 @@ def build_prompt(char_data, visual_info, clip_type="action"):
     return prompt
 
 
-def generate_video_clip(prompt, output_path, duration_seconds=8, ref_image_path=None, model=None):
-    """Generate a video clip using VEO API.
-    Note: VEO accepts even durations: 4, 6, or 8 seconds.
-    If ref_image_path is provided, uses image-to-video mode for visual consistency.
-    """
-    api_key = load_api_key()
+def submit_clip(client, prompt, duration_seconds, ref_image_path, model):
+    """Start a VEO render. Returns the operation name; raises JobFailed."""
     use_model = model or VEO_MODEL
     endpoint = f"{API_BASE}/models/{use_model}:predictLongRunning"
     print(f"  Model: {use_model}")
 
-    headers = {
-        "x-goog-api-key": api_key,
-        "Content-Type": "application/json",
-    }
-
     instance = {"prompt": prompt}
 
     # Image-to-video: use portrait as reference/starting frame
+    # (downscaled JPEG, upload_images.py "veo" preset)
     if ref_image_path and os.path.exists(ref_image_path):
-        with open(ref_image_path, "rb") as f:
-            img_b64 = base64.b64encode(f.read()).decode()
+        mime_type, img_b64 = prepare_image(ref_image_path, "veo")
         instance["image"] = {
             "bytesBase64Encoded": img_b64,
-            "mimeType": "image/png",
+            "mimeType": mime_type,
         }
         print(f"  Using reference image: {Path(ref_image_path).name}")
 
@@ -167,99 +177,232 @@ def generate_video_clip(prompt, output_path, duration_seconds=8, ref_image_path=
         },
     }
 
-    # Retry loop with rate limit handling
-    max_retries = 5
-    for attempt in range(max_retries):
-        print(f"  Sending VEO 3.1 request (attempt {attempt + 1}/{max_retries})...")
-        response = requests.post(endpoint, headers=headers, json=payload, timeout=60)
-
-        if response.status_code == 429:
-            wait_time = 120 * (attempt + 1)  # 120s, 240s, 360s, ...
-            print(f"  Rate limited (429). Waiting {wait_time}s...")
-            time.sleep(wait_time)
-            continue
-
-        if response.status_code != 200:
-            print(f"  ERROR: HTTP {response.status_code}")
-            print(f"  Response: {response.text[:500]}")
-            return False
-
-        break  # Success, exit retry loop
-    else:
-        print(f"  ERROR: Max retries ({max_retries}) exhausted due to rate limiting")
-        return False
+    # Rate limits and transient errors are retried by the shared client
+    print(f"  Sending VEO request...")
+    try:
+        result = client.post_json(endpoint, payload, "veo submit", timeout=60, max_retries=5)
+    except GeminiError as e:
+        raise JobFailed(e) from e
 
-    result = response.json()
     operation_name = result.get("name")
     if not operation_name:
-        print(f"  ERROR: No operation name in response")
         print(f"  Response: {json.dumps(result, indent=2)[:500]}")
-        return False
+        raise JobFailed("No operation name in response")
+    return operation_name
 
-    print(f"  Operation: {operation_name}")
-    print(f"  Polling for completion...")
 
-    # Poll for completion
-    poll_url = f"{API_BASE}/{operation_name}"
-    max_wait = 600  # 10 minutes max
-    poll_interval = 15  # seconds
-    elapsed = 0
+def check_operation(client, operation_name):
+    """Poll an operation once. Returns its video URI when done, else None.
 
+    Raises JobFailed if the operation failed or is gone.
+    """
+    try:
+        poll_data = client.get_json(f"{API_BASE}/{operation_name}", "veo poll", timeout=30)
+    except GeminiError as e:
+        if not is_retryable(e.status):
+            raise JobFailed(f"Operation unavailable: {e}") from e
+        print(f"  Poll error: {e}")
+        return None
+
+    if not poll_data.get("done", False):
+        return None
+
+    if "error" in poll_data:
+        raise JobFailed(f"Render failed: {json.dumps(poll_data['error'])[:300]}")
+
+    # Extract video URI
+    resp_obj = poll_data.get("response", {})
+    videos = resp_obj.get("generateVideoResponse", {}).get("generatedSamples", [])
+    if not videos:
+        # Try alternative response structure
+        videos = resp_obj.get("generatedSamples", [])
+
+    if not videos:
+        print(f"  Response: {json.dumps(poll_data, indent=2)[:1000]}")
+        raise JobFailed("No video in response")
+
+    video_uri = videos[0].get("video", {}).get("uri")
+    if not video_uri:
+        print(f"  Video data: {json.dumps(videos[0], indent=2)[:500]}")
+        raise JobFailed("No video URI")
+    return video_uri
+
+
+def poll_clip(client, operation_name, max_wait=VEO_MAX_WAIT, poll_interval=15):
+    """Poll an operation until done. Returns the video URI, or None on timeout
+    (the render may still finish; the operation stays resumable).
+
+    Raises JobFailed if the operation failed or is gone.
+    """
+    elapsed = 0
     while elapsed < max_wait:
         time.sleep(poll_interval)
         elapsed += poll_interval
+        video_uri = check_operation(client, operation_name)
+        print(f"  [{elapsed}s] done={video_uri is not None}")
+        if video_uri:
+            return video_uri
+    return None
+
+
+def start_clip(client, journal, name, prompt, duration_seconds=8, ref_image_path=None, model=None):
+    """Operation for a clip: the one an earlier run left rendering, else a new
+    submission. Returns (operation name, resumed); raises JobFailed."""
+    operation_name = journal.resume_operation(name)
+    if operation_name:
+        print(f"  Resuming operation from an earlier run: {operation_name}")
+        return operation_name, True
+    journal.start(name)
+    operation_name = submit_clip(client, prompt, duration_seconds, ref_image_path, model)
+    journal.set_operation(name, operation_name)
+    print(f"  Operation: {operation_name}")
+    return operation_name, False
+
+
+def save_clip(client, journal, name, operation_name, video_uri, output_path):
+    """Download a finished clip. Returns True if saved."""
+    # Download the video (requires API key), streamed to disk and resumable
+    print(f"  Downloading video...")
+    try:
+        size = client.download(video_uri, output_path, "veo download")
+    except GeminiError as e:
+        print(f"  ERROR: Download failed: {e}")
+        # After a dropped connection or server error the finished operation
+        # keeps its URI and the partial file stays on disk; the next run polls
+        # again and resumes the download. A 4xx (expired URI, 404) will not
+        # get better, so the operation is dropped and the clip resubmitted
+        retry = operation_name if is_retryable(e.status) else None
+        journal.fail(name, f"Download failed: {e}", operation=retry)
+        return False
+    journal.finish(name)
+
+    print(f"  Saved: {output_path} ({size / (1024 * 1024):.1f} MB)")
+    return True
+
+
+def generate_video_clip(prompt, output_path, duration_seconds=8, ref_image_path=None, model=None):
+    """Generate a video clip using VEO API.
+    Note: VEO accepts even durations: 4, 6, or 8 seconds.
+    If ref_image_path is provided, uses image-to-video mode for visual consistency.
+    The clip's state and operation name go to the job journal (named after the
+    output file), so an operation still rendering when a run stopped is polled
+    again instead of submitted again.
+    """
+    client = shared_client(load_api_key(), backoff_base=VEO_BACKOFF_BASE)
+    journal = JobJournal(JOURNAL_TOOL)
+    name = Path(output_path).stem
+
+    try:
+        operation_name, _ = start_clip(client, journal, name, prompt, duration_seconds, ref_image_path, model)
+        print(f"  Polling for completion...")
+        video_uri = poll_clip(client, operation_name)
+    except JobFailed as e:
+        print(f"  ERROR: {e}")
+        journal.fail(name, e)
+        return False
+
+    if video_uri is None:
+        print(f"  ERROR: Still rendering after {VEO_MAX_WAIT}s; rerun to keep polling {operation_name}")
+        return False
+    return save_clip(client, journal, name, operation_name, video_uri, output_path)
+
+
+def next_poll_delay(elapsed, render_times):
+    """Seconds until the next poll of an operation that has rendered for elapsed seconds.
+
+    Before any clip of this run finished, the interval grows with elapsed time
+    (POLL_MIN..POLL_MAX); after that, polling skips ahead to near the median
+    render time seen so far and then checks every POLL_MIN.
+    """
+    if render_times:
+        expected = sorted(render_times)[len(render_times) // 2] * 0.8
+        if elapsed < expected:
+            return max(POLL_MIN, expected - elapsed)
+        return POLL_MIN
+    return min(POLL_MAX, max(POLL_MIN, elapsed / 4))
+
+
+def run_clips(specs, max_active=VEO_MAX_ACTIVE, model=None):
+    """Render clips with up to max_active VEO operations at once.
+
+    specs: dicts with name, prompt, output and ref (reference image path or
+    None). Submissions are spaced VEO_SUBMIT_INTERVAL apart; every active
+    operation is polled from this one loop on its own adaptive schedule and
+    downloaded as soon as it completes, which frees its slot for the next
+    submission. Returns {name: "success" | "failed" | "rendering"}.
+    """
+    client = shared_client(load_api_key(), backoff_base=VEO_BACKOFF_BASE)
+    journal = JobJournal(JOURNAL_TOOL)
+    queue = deque(specs)
+    active = []
+    results = {}
+    render_times = []
+    next_submit = 0.0
+    start = time.monotonic()
+
+    while queue or active:
+        now = time.monotonic()
+        if queue and len(active) < max_active and now >= next_submit:
+            spec = queue.popleft()
+            print(f"\n[{now - start:5.0f}s] Starting {spec['name']} ({len(active) + 1}/{max_active} active, "
+                  f"{len(queue)} queued)")
+            try:
+                operation_name, resumed = start_clip(client, journal, spec["name"], spec["prompt"],
+                                                     ref_image_path=spec["ref"], model=model)
+            except JobFailed as e:
+                print(f"  ERROR: {e}")
+                journal.fail(spec["name"], e)
+                results[spec["name"]] = "failed"
+                continue
+            if not resumed:
+                next_submit = now + VEO_SUBMIT_INTERVAL
+            active.append({"spec": spec, "operation": operation_name, "resumed": resumed,
+                           "started": now, "next_poll": now + next_poll_delay(0, render_times)})
+            continue
+
+        # Sleep until the next poll is due (or a submission slot opens)
+        wake = min(clip["next_poll"] for clip in active) if active else next_submit
+        if queue and len(active) < max_active:
+            wake = min(wake, next_submit)
+        if wake > now:
+            time.sleep(wake - now)
+            continue
 
-        poll_resp = requests.get(poll_url, headers={"x-goog-api-key": api_key}, timeout=30)
-        if poll_resp.status_code != 200:
-            print(f"  Poll error: HTTP {poll_resp.status_code}")
+        clip = min(active, key=lambda c: c["next_poll"])
+        name = clip["spec"]["name"]
+        elapsed = now - clip["started"]
+        try:
+            video_uri = check_operation(client, clip["operation"])
+        except JobFailed as e:
+            print(f"\n[{now - start:5.0f}s] {name}: ERROR: {e}")
+            journal.fail(name, e)
+            active.remove(clip)
+            results[name] = "failed"
             continue
 
-        poll_data = poll_resp.json()
-        done = poll_data.get("done", False)
-        print(f"  [{elapsed}s] done={done}")
-
-        if done:
-            # Extract video URI
-            resp_obj = poll_data.get("response", {})
-            videos = resp_obj.get("generateVideoResponse", {}).get("generatedSamples", [])
-            if not videos:
-                # Try alternative response structure
-                videos = resp_obj.get("generatedSamples", [])
-
-            if not videos:
-                print(f"  ERROR: No video in response")
-                print(f"  Response: {json.dumps(poll_data, indent=2)[:1000]}")
-                return False
-
-            video_uri = videos[0].get("video", {}).get("uri")
-            if not video_uri:
-                print(f"  ERROR: No video URI")
-                print(f"  Video data: {json.dumps(videos[0], indent=2)[:500]}")
-                return False
-
-            # Download the video (requires API key)
-            print(f"  Downloading video...")
-            video_resp = requests.get(
-                video_uri, headers={"x-goog-api-key": api_key}, timeout=120
-            )
-            if video_resp.status_code != 200:
-                print(f"  ERROR: Download failed: HTTP {video_resp.status_code}")
-                return False
-
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, "wb") as f:
-                f.write(video_resp.content)
-
-            size_mb = len(video_resp.content) / (1024 * 1024)
-            print(f"  Saved: {output_path} ({size_mb:.1f} MB)")
-            return True
-
-    print(f"  ERROR: Timed out after {max_wait}s")
-    return False
-
-
-def generate_all_clips(clip_types=None, characters=None, model=None, output_dir=None):
-    """Generate clips for all characters."""
+        if video_uri:
+            active.remove(clip)
+            if not clip["resumed"]:
+                render_times.append(elapsed)
+            print(f"\n[{now - start:5.0f}s] {name}: rendered in {elapsed:.0f}s")
+            ok = save_clip(client, journal, name, clip["operation"], video_uri, clip["spec"]["output"])
+            results[name] = "success" if ok else "failed"
+        elif elapsed >= VEO_MAX_WAIT:
+            active.remove(clip)
+            print(f"\n[{now - start:5.0f}s] {name}: still rendering after {VEO_MAX_WAIT}s; "
+                  f"rerun to keep polling {clip['operation']}")
+            results[name] = "rendering"
+        else:
+            clip["next_poll"] = now + next_poll_delay(elapsed, render_times)
+            print(f"  [{now - start:5.0f}s] {name}: rendering ({elapsed:.0f}s), "
+                  f"next poll in {clip['next_poll'] - now:.0f}s")
+
+    return results
+
+
+def generate_all_clips(clip_types=None, characters=None, model=None, output_dir=None,
+                       max_active=VEO_MAX_ACTIVE):
+    """Generate clips for all characters, max_active VEO operations at a time."""
     if clip_types is None:
         clip_types = ["action"]
 
@@ -268,6 +411,7 @@ def generate_all_clips(clip_types=None, characters=None, model=None, output_dir=
     out_dir.mkdir(parents=True, exist_ok=True)
 
     results = {}
+    specs = []
 
     for char in char_data:
         char_id = char["charId"]
@@ -290,10 +434,7 @@ def generate_all_clips(clip_types=None, characters=None, model=None, output_dir=
                 results[clip_name] = "skipped"
                 continue
 
-            print(f"\n{'='*60}")
-            print(f"Generating: {clip_name} ({char['name']})")
-            print(f"{'='*60}")
-
+            print(f"\n{clip_name} ({char['name']})")
             prompt = build_prompt(char, visual, clip_type)
             print(f"  Prompt: {prompt[:200]}...")
 
@@ -312,23 +453,24 @@ def generate_all_clips(clip_types=None, characters=None, model=None, output_dir=
                         ref_image = str(ref_path)
                         print(f"  Fallback to portrait: {ref_path.name}")
 
-            success = generate_video_clip(
-                prompt, str(output_path), duration_seconds=8,
-                ref_image_path=ref_image, model=model,
-            )
-            results[clip_name] = "success" if success else "failed"
+            specs.append({"name": clip_name, "prompt": prompt, "output": str(output_path), "ref": ref_image})
 
-            if success:
-                # Rate limiting: wait between requests (VEO has strict RPM limits)
-                print(f"  Waiting 60s before next request...")
-                time.sleep(60)
+    if specs:
+        print(f"\n{'='*60}")
+        print(f"Rendering {len(specs)} clips, up to {max_active} at a time")
+        print(f"{'='*60}")
+        results.update(run_clips(specs, max_active, model))
 
     print(f"\n{'='*60}")
     print("Results Summary:")
     print(f"{'='*60}")
+    icons = {"success": "OK", "skipped": "--", "rendering": ".."}
     for name, status in results.items():
-        icon = "OK" if status == "success" else ("--" if status == "skipped" else "NG")
-        print(f"  [{icon}] {name}")
+        print(f"  [{icons.get(status, 'NG')}] {name}")
+    if upload_stats["images"]:
+        print(f"  {upload_report()}")
+    for line in shared_report():
+        print(f"  {line}")
 
     return results
 
@@ -389,7 +531,10 @@ def main():
         python generate_pv_clips.py title              # Generate title clip only
         python generate_pv_clips.py ending             # Generate ending clip only
         python generate_pv_clips.py full               # Generate everything (title + all chars + ending)
+        python generate_pv_clips.py --parallel 4       # Up to 4 VEO operations rendering at once (default 3)
+        python generate_pv_clips.py --endpoint http://127.0.0.1:8765  # VEO calls to gemini_stub.py
     """
+    global API_BASE
     args = sys.argv[1:]
 
     if not args or args == ["all"]:
@@ -413,11 +558,12 @@ def main():
         generate_ending_clip()
         return
 
-    # Parse --type, --model, --output-dir flags
+    # Parse --type, --model, --parallel, --output-dir flags
     clip_types = ["action"]
     characters = []
     model = None
     output_dir = None
+    max_active = VEO_MAX_ACTIVE
 
     i = 0
     while i < len(args):
@@ -433,10 +579,24 @@ def main():
                 print(f"Unknown model: {model_key}. Available: {list(VEO_MODELS.keys())}")
                 return
             i += 2
+        elif args[i] == "--parallel" and i + 1 < len(args):
+            max_active = max(1, int(args[i + 1]))
+            i += 2
+        elif args[i] == "--endpoint" and i + 1 < len(args):
+            API_BASE = args[i + 1].rstrip("/")
+            if not API_BASE.endswith("/v1beta"):
+                API_BASE += "/v1beta"
+            # The stub accepts any key
+            os.environ.setdefault("GEMINI_API_KEY", "stub")
+            print(f"Endpoint: {API_BASE}")
+            i += 2
         elif args[i] == "--output-dir" and i + 1 < len(args):
             output_dir = args[i + 1]
             print(f"Output dir: {output_dir}")
             i += 2
+        elif args[i] == "all":
+            clip_types = ["action", "intro", "ultimate"]
+            i += 1
         elif args[i].startswith("chr_"):
             characters.append(args[i])
             i += 1
@@ -450,6 +610,7 @@ def main():
         characters=characters if characters else None,
         model=model,
         output_dir=output_dir,
+        max_active=max_active,
     )
 
 
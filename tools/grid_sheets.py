@@ -0,0 +1,221 @@
+"""
+Stellar Gunners - Grid Sheet Slicer
+Several images of one kind (a character's portrait expressions, all face
+icons, all skill icons) can be generated as one NxM sheet in a single call and
+cut apart locally, instead of one call per image.
+
+The model never draws an exact grid, so the cuts are not the nominal cell
+lines: near each nominal line the slicer picks the row/column crossing the
+least content (the background gutter). Each cell then goes through the same
+background keying and bbox as process_spritesheets.py and is checked before
+it is saved:
+  empty       - almost no content in the cell
+  too small   - content spans little of the cell (merged or misplaced figure)
+  crosses cut - content runs over a cut into the next cell
+A rejected cell is not written; generate_images.py then requests that image
+on its own. Saved cells are the content bbox plus padding on the sheet's
+background, padded out to the output aspect ratio, like a single generation.
+
+Usage:
+  python tools/grid_sheets.py SHEET.png COLS ROWS OUT_DIR [--background black] [--aspect 2:3]
+      Slice a sheet into OUT_DIR/cell_<n>.png and report rejected cells
+  python tools/grid_sheets.py demo
+      Slice a synthetic sheet with an empty and an overlapping cell
+"""
+
+import math
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from process_spritesheets import find_content_bbox, remove_color_bg
+
+MAGENTA = (255, 0, 255)
+BLACK = (0, 0, 0)
+
+# Aspect ratios the image model accepts for imageConfig.aspectRatio
+SHEET_ASPECTS = ("1:1", "3:2", "2:3", "4:3", "3:4", "16:9", "9:16")
+
+CUT_WINDOW = 0.2   # search for the gutter within +-20% of a cell around the nominal line
+MIN_FILL = 0.02    # content share of the cell below which it counts as empty
+MIN_EXTENT = 0.3   # content must span this much of the cell's width or height
+MAX_BLEED = 0.02   # content share of a cut line (within the cell) that counts as crossing
+PADDING = 0.05     # margin around the content bbox, as a share of the cell's larger side
+
+
+def ratio(aspect):
+    """'2:3' -> 0.667 (width / height)."""
+    w, h = aspect.split(":")
+    return int(w) / int(h)
+
+
+def grid_shape(count, cell_aspect=1.0):
+    """(cols, rows) for count cells of the given width/height ratio, trading
+    empty cells against a sheet far from square."""
+    best = None
+    for cols in range(1, count + 1):
+        rows = math.ceil(count / cols)
+        score = (cols * rows - count) + 2 * abs(math.log(cols * cell_aspect / rows))
+        if best is None or score <= best[0]:
+            best = (score, cols, rows)
+    return best[1], best[2]
+
+
+def sheet_aspect(cols, rows, cell_aspect=1.0):
+    """Supported aspect ratio closest to a cols x rows grid of cells."""
+    target = cols * cell_aspect / rows
+    return min(SHEET_ASPECTS, key=lambda a: abs(math.log(ratio(a) / target)))
+
+
+def find_cuts(occupancy, cells):
+    """Boundaries [0, c1, ..., len] splitting a content profile into cells,
+    each cut at the emptiest line near its nominal position."""
+    size = len(occupancy)
+    step = size / cells
+    window = max(1, int(step * CUT_WINDOW))
+    cuts = [0]
+    for k in range(1, cells):
+        nominal = int(round(k * step))
+        lo, hi = max(cuts[-1] + 1, nominal - window), min(size - 1, nominal + window)
+        span = occupancy[lo:hi + 1]
+        # Emptiest line, ties broken towards the nominal position
+        candidates = np.flatnonzero(span == span.min()) + lo
+        cuts.append(int(candidates[np.argmin(np.abs(candidates - nominal))]))
+    cuts.append(size)
+    return cuts
+
+
+def check_cell(mask, x0, y0, x1, y1):
+    """Reason a cell is unusable, or None. mask is the sheet's content mask."""
+    cell = mask[y0:y1, x0:x1]
+    if cell.mean() < MIN_FILL:
+        return "empty"
+    ys, xs = np.nonzero(cell)
+    if (xs.max() - xs.min() + 1) < MIN_EXTENT * (x1 - x0) and (ys.max() - ys.min() + 1) < MIN_EXTENT * (y1 - y0):
+        return "too small"
+    # Interior cuts only; content may touch the sheet's own edges
+    height, width = mask.shape
+    edges = [mask[y0:y1, x0] if x0 > 0 else None, mask[y0:y1, x1 - 1] if x1 < width else None,
+             mask[y0, x0:x1] if y0 > 0 else None, mask[y1 - 1, x0:x1] if y1 < height else None]
+    if any(edge is not None and edge.mean() > MAX_BLEED for edge in edges):
+        return "crosses cut"
+    return None
+
+
+def save_cell(rgb, rgba, box, output_path, background, aspect):
+    """Content bbox of a cell plus padding, padded to aspect with the background color."""
+    x0, y0, x1, y1 = box
+    cx0, cy0, cx1, cy1 = find_content_bbox(rgba[y0:y1, x0:x1])
+    pad = int(PADDING * max(x1 - x0, y1 - y0))
+    left, top = max(x0, x0 + cx0 - pad), max(y0, y0 + cy0 - pad)
+    right, bottom = min(x1, x0 + cx1 + pad), min(y1, y0 + cy1 + pad)
+    content = Image.fromarray(rgb[top:bottom, left:right])
+
+    w, h = content.size
+    if w / h < aspect:
+        w = int(round(h * aspect))
+    else:
+        h = int(round(w / aspect))
+    canvas = Image.new("RGB", (w, h), background)
+    canvas.paste(content, ((w - content.width) // 2, (h - content.height) // 2))
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=output_path.parent, prefix=f".{output_path.name}.", suffix=".tmp")
+    os.close(fd)
+    canvas.save(tmp, "PNG")
+    os.replace(tmp, output_path)
+
+
+def slice_sheet(sheet_path, cols, rows, outputs, background=MAGENTA, aspect=1.0):
+    """Cut a sheet into cells, left to right then top to bottom.
+
+    outputs: one path per cell (None for cells that are not needed). Returns
+    {cell index: reason} for the cells that were rejected and not written.
+    """
+    rgb = np.array(Image.open(sheet_path).convert("RGB"))
+    rgba = remove_color_bg(rgb, background)
+    mask = rgba[:, :, 3] > 10
+    col_cuts = find_cuts(mask.sum(axis=0), cols)
+    row_cuts = find_cuts(mask.sum(axis=1), rows)
+
+    rejected = {}
+    for index, output_path in enumerate(outputs):
+        if output_path is None:
+            continue
+        row, col = divmod(index, cols)
+        box = (col_cuts[col], row_cuts[row], col_cuts[col + 1], row_cuts[row + 1])
+        reason = check_cell(mask, *box)
+        if reason:
+            rejected[index] = reason
+            continue
+        save_cell(rgb, rgba, box, output_path, background, aspect)
+    return rejected
+
+
+# ============================================================
+# Demo
+# ============================================================
+
+def demo_sheet(path):
+    """3x2 magenta sheet of figures drawn off the nominal grid: cell 3 empty,
+    cell 4 reaching into cell 5."""
+    from PIL import ImageDraw
+
+    image = Image.new("RGB", (960, 720), MAGENTA)
+    draw = ImageDraw.Draw(image)
+    figures = [(150, 170, 90, 150), (500, 190, 100, 140), (790, 160, 80, 150),
+               None, (560, 540, 190, 130), (800, 560, 70, 120)]
+    for figure in figures:
+        if figure:
+            x, y, rx, ry = figure
+            draw.ellipse((x - rx, y - ry, x + rx, y + ry), fill=(40, 60, 200), outline=(250, 250, 250), width=6)
+    image.save(path)
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Grid Sheet Slicer")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    options = {"--background": "magenta", "--aspect": "1:1"}
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+
+    if positional == ["demo"]:
+        out_dir = Path(tempfile.mkdtemp(prefix="grid_sheet_demo_"))
+        sheet, cols, rows = out_dir / "sheet.png", 3, 2
+        demo_sheet(sheet)
+    elif len(positional) == 4:
+        sheet, cols, rows, out_dir = Path(positional[0]), int(positional[1]), int(positional[2]), Path(positional[3])
+    else:
+        print(__doc__)
+        return
+
+    background = BLACK if options["--background"] == "black" else MAGENTA
+    outputs = [out_dir / f"cell_{n}.png" for n in range(cols * rows)]
+    rejected = slice_sheet(sheet, cols, rows, outputs, background, ratio(options["--aspect"]))
+    for index, output_path in enumerate(outputs):
+        if index in rejected:
+            print(f"  cell {index}: REJECTED ({rejected[index]})")
+        else:
+            w, h = Image.open(output_path).size
+            print(f"  cell {index}: {output_path} ({w}x{h})")
+    print(f"  {len(outputs) - len(rejected)} of {len(outputs)} cells saved")
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
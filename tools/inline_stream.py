@@ -0,0 +1,279 @@
+"""
+Stellar Gunners - Streaming Inline Image Decoder
+Reads a generateContent response body chunk by chunk and decodes the base64
+"data" string of its inline image straight into the output file, instead of
+response.json() (whole body as a str, then a dict holding the base64 string)
+followed by base64.b64decode (a third full copy as bytes). Peak memory stays
+around one network chunk no matter how large the image is.
+
+Outside "data" strings the body is kept as-is and parsed at the end, with each
+image's data emptied (""), so candidates, text parts and mime types are still
+available. Each image is decoded to its own temp file; once the body is parsed,
+the last image that is not a thought part ("thought": true, an interim image
+from a thinking model) is renamed into place and the others are deleted, the
+same image json() callers took.
+
+Usage:
+  python tools/inline_stream.py [--image-kb 8192]
+      Peak memory of json()+b64decode vs streaming on a large stub response
+"""
+
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+STREAM_CHUNK = 64 * 1024
+
+QUOTE, BACKSLASH, COLON = ord('"'), ord("\\"), ord(":")
+WHITESPACE = b" \t\r\n"
+INLINE_KEYS = ("inlineData", "inline_data")   # REST camelCase and the snake_case form
+
+
+class InlineImageReader:
+    """Incremental scanner for one response body; feed() chunks, then finish()."""
+
+    def __init__(self, output_path):
+        self.output_path = Path(output_path)
+        self.skeleton = bytearray()   # body with image data strings emptied
+        self.in_string = False
+        self.escape = False
+        self.token = bytearray()      # current string, kept while short enough to be a key
+        self.key = None               # last object key seen
+        self.prev = None              # last significant byte outside strings
+        self.streaming = False        # inside an image "data" string
+        self.carry = b""              # base64 chars not yet forming a 4-char group
+        self.file = None
+        self.tmps = []                # one temp file per image, in body order
+        self.sizes = []
+
+    def feed(self, chunk):
+        i, n = 0, len(chunk)
+        while i < n:
+            if self.streaming:
+                end = chunk.find(b'"', i)
+                self._decode(chunk[i:n if end < 0 else end])
+                if end < 0:
+                    return
+                self._end_image()
+                self.skeleton += b'"'
+                i = end + 1
+                continue
+
+            byte = chunk[i]
+            self.skeleton.append(byte)
+            i += 1
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif byte == BACKSLASH:
+                    self.escape = True
+                elif byte == QUOTE:
+                    self.in_string = False
+                    self.prev = QUOTE
+                elif len(self.token) <= 32:
+                    self.token.append(byte)
+            elif byte == QUOTE:
+                if self.prev == COLON and self.key == b"data":
+                    self._start_image()
+                else:
+                    self.in_string = True
+                    self.token.clear()
+            elif byte not in WHITESPACE:
+                if byte == COLON:
+                    self.key = bytes(self.token)
+                self.prev = byte
+
+    def _start_image(self):
+        self.streaming = True
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.output_path.parent,
+                                   prefix=f".{self.output_path.name}.", suffix=".tmp")
+        self.tmps.append(tmp)
+        self.file = os.fdopen(fd, "wb")
+
+    def _decode(self, text):
+        # base64 never needs JSON escapes, but "\/" is a legal way to write "/"
+        text = self.carry + text.replace(b"\\", b"")
+        whole = len(text) - len(text) % 4
+        self.carry = text[whole:]
+        if whole:
+            self.file.write(base64.b64decode(text[:whole]))
+
+    def _end_image(self):
+        self.streaming = False
+        self.prev = QUOTE
+        self.token.clear()
+        if self.carry:
+            self.file.write(base64.b64decode(self.carry + b"=" * (-len(self.carry) % 4)))
+            self.carry = b""
+        self.sizes.append(self.file.tell())
+        self.file.close()
+        self.file = None
+
+    def finish(self):
+        """Parse the rest of the body and move the chosen image into place.
+
+        Returns (image size in bytes or None, response dict with data emptied).
+        Raises ValueError on a truncated or malformed body.
+        """
+        try:
+            if self.streaming:
+                raise ValueError("Response ended inside inline image data")
+            result = json.loads(bytes(self.skeleton))
+        except ValueError:
+            self.abort()
+            raise
+        parts = []
+        _data_parts(result, parts)
+        chosen = next((i for i in reversed(range(len(parts)))
+                       if parts[i] is not None and not parts[i].get("thought")), None)
+        size = None
+        if chosen is not None and chosen < len(self.tmps):
+            os.replace(self.tmps[chosen], self.output_path)
+            self.tmps[chosen] = None
+            size = self.sizes[chosen]
+        self.abort()
+        return size, result
+
+    def abort(self):
+        """Drop the temp files of images not moved into place (e.g. the
+        connection failed mid-body)."""
+        if self.file:
+            self.file.close()
+            self.file = None
+        for tmp in self.tmps:
+            if tmp:
+                os.unlink(tmp)
+        self.tmps = []
+
+
+def _data_parts(node, parts, part=None):
+    """For each "data" string in body order (the order they were streamed),
+    append the content part holding it as inlineData / inline_data, or None."""
+    if isinstance(node, dict):
+        if any(key in node for key in INLINE_KEYS):
+            part = node
+        for key, value in node.items():
+            if key == "data" and isinstance(value, str):
+                inline = part is not None and any(part.get(k) is node for k in INLINE_KEYS)
+                parts.append(part if inline else None)
+            else:
+                _data_parts(value, parts, part)
+    elif isinstance(node, list):
+        for value in node:
+            _data_parts(value, parts, part)
+
+
+def stream_inline_image(chunks, output_path):
+    """Decode the last non-thought inline image of a response body given as
+    byte chunks into output_path. Returns (image size or None, response with
+    data emptied)."""
+    reader = InlineImageReader(output_path)
+    try:
+        for chunk in chunks:
+            reader.feed(chunk)
+    except BaseException:
+        reader.abort()
+        raise
+    return reader.finish()
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def measure(label, fn):
+    """Run fn under tracemalloc. Returns (result, peak MB, seconds)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<22} peak {peak / 1024 / 1024:7.1f} MB  {elapsed:6.2f}s")
+    return result, peak / 1024 / 1024, elapsed
+
+
+def start_stub_process(image_kb):
+    """gemini_stub.py in its own process, so its allocations stay out of the
+    measurement. Returns (process, base_url)."""
+    import socket
+    import subprocess
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).parent / "gemini_stub.py"), "--port", str(port),
+         "--rpm", "0", "--latency", "0", "--image-kb", str(image_kb)],
+        stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def benchmark(image_kb):
+    import requests
+
+    process, base_url = start_stub_process(image_kb)
+    endpoint = f"{base_url}/v1beta/models/stub:generateContent"
+    payload = {"contents": [{"parts": [{"text": "bench"}]}],
+               "generationConfig": {"responseModalities": ["TEXT", "IMAGE"]}}
+    try:
+        requests.post(endpoint, json=payload, timeout=120)  # stub builds and caches its image
+        with tempfile.TemporaryDirectory() as tmp:
+            old_path, new_path = Path(tmp) / "old.png", Path(tmp) / "new.png"
+
+            def whole_body():
+                result = requests.post(endpoint, json=payload, timeout=60).json()
+                data = result["candidates"][0]["content"]["parts"][1]["inlineData"]["data"]
+                image = base64.b64decode(data)
+                old_path.write_bytes(image)
+                return len(image)
+
+            def streamed():
+                with requests.post(endpoint, json=payload, timeout=60, stream=True) as response:
+                    size, _ = stream_inline_image(response.iter_content(STREAM_CHUNK), new_path)
+                return size
+
+            print(f"  Stub image: {image_kb} KB ({image_kb * 4 / 3 / 1024:.1f} MB as base64)")
+            old_size, old_peak, _ = measure("json() + b64decode", whole_body)
+            new_size, new_peak, _ = measure("streamed decode", streamed)
+            same = old_size == new_size and old_path.read_bytes() == new_path.read_bytes()
+    finally:
+        process.terminate()
+
+    print(f"  Peak memory {old_peak:.1f} MB -> {new_peak:.1f} MB; "
+          f"output {'identical' if same else 'DIFFERS'} ({new_size / 1024:.0f} KB)")
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Streaming Inline Image Decoder")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    options = {"--image-kb": 8192}
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = int(args[i + 1])
+            i += 2
+        else:
+            i += 1
+
+    benchmark(options["--image-kb"])
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
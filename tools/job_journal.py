@@ -0,0 +1,173 @@
+"""
+Stellar Gunners - Job Journal
+SQLite record of each asset-generation job's state, so an interrupted run of
+generate_images.py, generate_area_backgrounds.py or generate_pv_clips.py picks
+up where it stopped instead of relying on "output file exists" alone:
+  queued     - known to a run, not started yet
+  in_flight  - request sent; a VEO clip also stores its operation name as soon
+               as the submit returns, so a restart re-polls that operation
+               instead of paying for a new render
+  done       - output written
+  failed     - reason of the last attempt; the next run retries the job (a
+               failure that kept its operation, e.g. a lost download, re-polls)
+
+One row per (tool, job name) in tools/.cache/jobs.sqlite. Every update is its
+own committed transaction (WAL mode), so a killed run loses at most the state
+change it was making and several tools can use the file at once.
+
+Usage:
+  python tools/job_journal.py [tool ...]               # List jobs that are not done
+  python tools/job_journal.py --forget tool [job ...]  # Drop rows (all of a tool's if no job given)
+"""
+
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+JOURNAL_PATH = Path(__file__).parent / ".cache" / "jobs.sqlite"
+
+STATES = ("queued", "in_flight", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    tool      TEXT NOT NULL,
+    name      TEXT NOT NULL,
+    state     TEXT NOT NULL,
+    operation TEXT,
+    reason    TEXT,
+    attempts  INTEGER NOT NULL DEFAULT 0,
+    updated   REAL NOT NULL,
+    PRIMARY KEY (tool, name)
+)
+"""
+
+
+class JobJournal:
+    """Job states of one tool, backed by the shared SQLite file."""
+
+    def __init__(self, tool, path=None):
+        self.tool = tool
+        path = path or JOURNAL_PATH
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit: each statement below is its own transaction
+        self.db = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(SCHEMA)
+
+    def get(self, name):
+        """Row for a job as a dict, or None if it was never journaled."""
+        row = self.db.execute("SELECT * FROM jobs WHERE tool = ? AND name = ?",
+                              (self.tool, name)).fetchone()
+        return dict(row) if row else None
+
+    def state(self, name):
+        row = self.get(name)
+        return row["state"] if row else None
+
+    def queue(self, names):
+        """Add jobs not journaled yet as queued; existing rows keep their state."""
+        now = time.time()
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany(
+                "INSERT OR IGNORE INTO jobs (tool, name, state, updated) VALUES (?, ?, 'queued', ?)",
+                [(self.tool, name, now) for name in names])
+
+    def _set(self, name, state, operation, reason, attempt=0):
+        self.db.execute(
+            "INSERT INTO jobs (tool, name, state, operation, reason, attempts, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (tool, name) DO UPDATE SET state = excluded.state, "
+            "operation = excluded.operation, reason = excluded.reason, "
+            "attempts = attempts + ?, updated = excluded.updated",
+            (self.tool, name, state, operation, reason, attempt, time.time(), attempt))
+
+    def start(self, name, operation=None):
+        """Mark a job in flight (one more attempt), optionally with its operation id."""
+        self._set(name, "in_flight", operation, None, attempt=1)
+
+    def set_operation(self, name, operation):
+        """Store the long-running operation a started job is waiting on."""
+        self._set(name, "in_flight", operation, None)
+
+    def finish(self, name):
+        self._set(name, "done", None, None)
+
+    def fail(self, name, reason, operation=None):
+        """Mark a job failed. Pass operation to have the next run re-poll it."""
+        self._set(name, "failed", operation, str(reason)[:500])
+
+    def resume_operation(self, name):
+        """Operation id left by an unfinished earlier run, or None."""
+        row = self.get(name)
+        if row and row["state"] != "done":
+            return row["operation"]
+        return None
+
+    def rows(self, states=STATES):
+        marks = ", ".join("?" * len(states))
+        return [dict(row) for row in self.db.execute(
+            f"SELECT * FROM jobs WHERE tool = ? AND state IN ({marks}) ORDER BY name",
+            (self.tool, *states))]
+
+    def forget(self, names=None):
+        """Delete rows for the given jobs (all of this tool's if names is None). Returns the count."""
+        with self.db:
+            self.db.execute("BEGIN")
+            if names is None:
+                cursor = self.db.execute("DELETE FROM jobs WHERE tool = ?", (self.tool,))
+            else:
+                cursor = self.db.executemany("DELETE FROM jobs WHERE tool = ? AND name = ?",
+                                             [(self.tool, name) for name in names])
+        return cursor.rowcount
+
+    def close(self):
+        self.db.close()
+
+
+def journal_tools(path=JOURNAL_PATH):
+    """Names of tools with rows in the journal."""
+    if not Path(path).exists():
+        return []
+    with sqlite3.connect(str(path)) as db:
+        return [row[0] for row in db.execute("SELECT DISTINCT tool FROM jobs ORDER BY tool")]
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Job Journal")
+    print(f"Journal: {JOURNAL_PATH}")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    if args[:1] == ["--forget"]:
+        if len(args) < 2:
+            print("Usage: python tools/job_journal.py --forget tool [job ...]")
+            return
+        journal = JobJournal(args[1])
+        count = journal.forget(args[2:] or None)
+        print(f"  Removed {count} rows for {args[1]}")
+        print("\nDone!")
+        return
+
+    for tool in args or journal_tools():
+        journal = JobJournal(tool)
+        rows = journal.rows()
+        counts = {state: sum(1 for row in rows if row["state"] == state) for state in STATES}
+        print(f"\n{tool}: " + ", ".join(f"{counts[s]} {s}" for s in STATES))
+        for row in rows:
+            if row["state"] == "done":
+                continue
+            age = time.time() - row["updated"]
+            detail = row["reason"] or row["operation"] or ""
+            if row["operation"] and row["reason"]:
+                detail = f"{row['reason']} (operation {row['operation']})"
+            print(f"  {row['state']:<9} {row['name']:<32} tries {row['attempts']}, "
+                  f"{age / 60:.0f} min ago  {detail[:120]}")
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Stellar Gunners - Async Job Scheduler
+Runs a list of generation jobs concurrently on one asyncio loop. Jobs start as
+soon as their dependencies finish; how many API calls are actually in flight
+is left to the rate-limited client the jobs share (gemini_async's RPM bucket
+and in-flight cap), so the scheduler never sleeps a fixed delay between jobs.
+
+  Job(name, run, deps=(), after=(), output=None, spec=None)
+    run    - async callable returning True on success; raising JobFailed
+             fails the job with that reason
+    deps   - names of jobs that must succeed (or be skipped as already done)
+             first; names not in this run are ignored
+    after  - names of jobs to wait for whatever their outcome
+    output - path (or list of paths); the job is skipped if they all exist
+    spec   - optional data describing the request the job sends, for callers
+             that send it another way (generate_images.py batch files)
+
+A job whose dependency failed is not run ("blocked"). Progress prints one line
+per finished job plus a status line every PROGRESS_INTERVAL seconds, with
+throughput (jobs/min over jobs that actually ran) and an ETA for the rest.
+
+With a journal (job_journal.py) every job's state is recorded as it changes:
+queued, in_flight when it starts, then done or failed with the reason. Jobs
+an earlier run left failed or in flight are counted at startup and run again.
+
+Usage:
+  python tools/job_scheduler.py [--jobs 30] [--rpm 60] [--in-flight 6] [--latency 2]
+      Simulated run (no API calls) showing throughput and ETA output
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+PROGRESS_INTERVAL = 15  # seconds between status lines while jobs are running
+
+FINISHED = ("ok", "skipped", "failed", "blocked")
+
+
+class JobFailed(Exception):
+    """Raised by a job's run to fail it with a reason."""
+
+
+class Job:
+    def __init__(self, name, run, deps=(), after=(), output=None, spec=None):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.after = tuple(after)
+        if isinstance(output, (list, tuple)):
+            self.outputs = tuple(Path(p) for p in output)
+        else:
+            self.outputs = (Path(output),) if output else ()
+        self.output = self.outputs[0] if self.outputs else None
+        self.spec = spec
+        self.state = "pending"
+        self.done = asyncio.Event()
+
+    def outputs_exist(self):
+        return bool(self.outputs) and all(p.exists() for p in self.outputs)
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class Progress:
+    """Counts finished jobs and estimates time left from the run rate so far."""
+
+    def __init__(self, total):
+        self.total = total
+        self.start = time.monotonic()
+        self.counts = {state: 0 for state in FINISHED}
+        self.running = 0
+
+    def rate(self):
+        """Jobs per minute over jobs that made API calls (ok or failed)."""
+        ran = self.counts["ok"] + self.counts["failed"]
+        elapsed = time.monotonic() - self.start
+        return ran / elapsed * 60 if ran and elapsed > 0 else 0.0
+
+    def status(self):
+        finished = sum(self.counts.values())
+        rate = self.rate()
+        left = self.total - finished
+        eta = format_duration(left / rate * 60) if rate and left else "-"
+        return (f"{finished}/{self.total} done, {self.running} in progress, "
+                f"{rate:.1f} jobs/min, ETA {eta}")
+
+
+async def _run_job(job, jobs_by_name, progress, journal):
+    for dep in job.deps + job.after:
+        if dep in jobs_by_name:
+            await jobs_by_name[dep].done.wait()
+    blocking = [d for d in job.deps if d in jobs_by_name and jobs_by_name[d].state not in ("ok", "skipped")]
+    reason = None
+
+    if blocking:
+        job.state = "blocked"
+    elif job.outputs_exist():
+        job.state = "skipped"
+        if journal and journal.state(job.name) != "done":
+            journal.finish(job.name)
+    else:
+        progress.running += 1
+        if journal:
+            journal.start(job.name)
+        try:
+            job.state = "ok" if await job.run() else "failed"
+        except JobFailed as e:
+            job.state, reason = "failed", str(e)
+        except Exception as e:
+            job.state, reason = "failed", f"{type(e).__name__}: {e}"
+        finally:
+            progress.running -= 1
+        if journal:
+            if job.state == "ok":
+                journal.finish(job.name)
+            else:
+                journal.fail(job.name, reason or "failed")
+
+    progress.counts[job.state] += 1
+    job.done.set()
+    note = f" (needs {', '.join(blocking)})" if blocking else f" ({reason})" if reason else ""
+    if job.state != "skipped":
+        print(f"  [{sum(progress.counts.values())}/{progress.total}] {job.name}: {job.state}{note}"
+              f" | {progress.status()}", flush=True)
+
+
+async def _report(progress, interval):
+    while True:
+        await asyncio.sleep(interval)
+        print(f"  ... {progress.status()}", flush=True)
+
+
+async def run_jobs(jobs, progress_interval=PROGRESS_INTERVAL, journal=None):
+    """Run jobs respecting dependencies, recording states in journal if given. Returns {name: state}."""
+    jobs_by_name = {job.name: job for job in jobs}
+    if len(jobs_by_name) != len(jobs):
+        raise ValueError("Duplicate job names")
+    progress = Progress(len(jobs))
+    skipped = sum(1 for job in jobs if job.outputs_exist())
+    resumed = ""
+    if journal:
+        journal.queue(jobs_by_name)
+        states = [journal.state(job.name) for job in jobs if not job.outputs_exist()]
+        if states.count("failed") or states.count("in_flight"):
+            resumed = (f", retrying {states.count('failed')} failed and "
+                       f"{states.count('in_flight')} interrupted")
+    print(f"  {len(jobs)} jobs ({skipped} already done{resumed})", flush=True)
+
+    reporter = asyncio.create_task(_report(progress, progress_interval))
+    try:
+        await asyncio.gather(*(_run_job(job, jobs_by_name, progress, journal) for job in jobs))
+    finally:
+        reporter.cancel()
+
+    elapsed = time.monotonic() - progress.start
+    summary = ", ".join(f"{progress.counts[s]} {s}" for s in FINISHED if progress.counts[s])
+    print(f"  Finished in {format_duration(elapsed)}: {summary or 'nothing to do'}", flush=True)
+    return {job.name: job.state for job in jobs}
+
+
+# ============================================================
+# Simulation
+# ============================================================
+
+def simulate(count, rpm, in_flight, latency):
+    from gemini_async import TokenBucket
+
+    async def run():
+        bucket = TokenBucket(rpm)
+        slots = asyncio.Semaphore(in_flight)
+
+        def fake_call(i):
+            async def call():
+                await bucket.acquire()
+                async with slots:
+                    await asyncio.sleep(latency)
+                return i % 17 != 5  # a few failures, to show blocked dependents
+            return call
+
+        jobs = [Job(f"base_{i}", fake_call(i)) for i in range(count // 2)]
+        jobs += [Job(f"derived_{i}", fake_call(i + 1), deps=[f"base_{i}"]) for i in range(count - count // 2)]
+        start = time.perf_counter()
+        await run_jobs(jobs, progress_interval=max(1.0, latency * 2))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(run())
+    serial = count * (latency + 5)
+    print(f"\n  {count} jobs in {elapsed:.1f}s at {rpm} RPM / {in_flight} in flight "
+          f"(serial with a 5s delay: ~{serial:.0f}s)")
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Async Job Scheduler (simulation)")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    options = {"--jobs": 30, "--rpm": 60, "--in-flight": 6, "--latency": 2.0}
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = type(options[args[i]])(args[i + 1])
+            i += 2
+        else:
+            i += 1
+
+    simulate(options["--jobs"], options["--rpm"], options["--in-flight"], options["--latency"])
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
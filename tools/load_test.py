@@ -0,0 +1,257 @@
+"""
+Stellar Gunners - Pipeline Load Test
+Runs the generation tools against gemini_stub.py, with no API key and no
+quota, and reports per tool: wall time, requests/s the stub served, client
+calls and HTTP retries, 429s and the bad replies the stub injected. Use it to
+check throughput and retry changes before spending real requests.
+
+  images    - generate_images.py tasks on its async job scheduler
+  collision - generate_collision_maps.py --force for the first stages,
+              batched like a real run
+  clips     - generate_pv_clips.py: submit, adaptive polling and resumable
+              download; poll and submit intervals are scaled to --op-delay
+
+Each tool runs in-process with its outputs, job journal and response caches
+pointed into a temporary sandbox (sandbox()); the real asset tree is only
+read (stages.json, area backgrounds, reference art). GEMINI_API_KEY is set
+to "stub", so a real key is never loaded.
+
+Usage:
+  python tools/load_test.py [images] [collision] [clips]
+      [--rpm 120] [--latency 0.5] [--error-rate 0.1] [--malformed 0.05] [--partial 0.1]
+      [--op-delay 6] [--image-kb 256] [--seed 0]
+      [--images icons,skillicons,enemies,backgrounds] [--sheets] [--in-flight 8]
+      [--stages 4] [--batch 4] [--clips 6] [--parallel 3] [--keep]
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Before the tools are imported: they read the key at import time
+os.environ["GEMINI_API_KEY"] = "stub"
+
+import collision_extractor
+import collision_nexthop
+import collision_visibility
+import generate_collision_maps as collision_maps
+import generate_images as images
+import generate_pv_clips as pv_clips
+import job_journal
+import upload_images
+from gemini_async import AsyncGeminiClient
+from gemini_client import shared_client
+from gemini_stub import start_stub_server
+from job_journal import JobJournal
+from job_scheduler import format_duration, run_jobs
+from response_cache import ResponseCache
+
+TOOLS = ("images", "collision", "clips")
+DEFAULT_IMAGE_TASKS = "icons,skillicons,enemies,backgrounds"
+
+
+@contextmanager
+def sandbox(root):
+    """Point every file the three tools write into root; the real paths and
+    caches are put back on exit."""
+    root = Path(root)
+    output = root / "collision_maps"
+    patches = [
+        (job_journal, "JOURNAL_PATH", root / "jobs.sqlite"),
+        (images, "PROJECT_ROOT", root),
+        (images, "ASSETS_DIR", root / "assets" / "images"),
+        (images, "SHEET_DIR", root / "sheets"),
+        (images, "image_cache", ResponseCache("images", root=root / "cache")),
+        (upload_images, "upload_cache", ResponseCache("uploads", root=root / "cache")),
+        (collision_maps, "OUTPUT_DIR", output),
+        *((module, "COLLISION_DIR", output)
+          for module in (collision_extractor, collision_nexthop, collision_visibility)),
+        (collision_maps, "vision_cache", ResponseCache("vision", root=root / "cache")),
+        (pv_clips, "OUTPUT_DIR", root / "clips"),
+    ]
+    saved = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, value in patches:
+        setattr(module, name, value)
+    try:
+        yield root
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
+
+
+def scale_veo_timing(op_delay):
+    """VEO poll/submit intervals relative to the stub's render time (real: ~60-120s)."""
+    pv_clips.POLL_MIN = max(0.2, op_delay / 10)
+    pv_clips.POLL_MAX = max(0.5, op_delay / 2)
+    pv_clips.VEO_SUBMIT_INTERVAL = max(0.1, op_delay / 10)
+    pv_clips.VEO_MAX_WAIT = op_delay * 5
+
+
+def client_counts(metrics):
+    """(calls, HTTP retries) from a client's CallMetrics."""
+    calls = sum(len(values) for values in metrics.latencies.values())
+    return calls, metrics.counts["retries"]
+
+
+# ============================================================
+# Tool runs
+# ============================================================
+
+def run_images(base_url, tasks, rpm, max_in_flight, sheets):
+    """generate_images.run_tasks, keeping hold of the client for its metrics."""
+    endpoint = f"{base_url}/v1beta/models/{images.MODEL}:generateContent"
+    builders = {**images.TASKS, **images.SHEET_TASKS} if sheets else images.TASKS
+
+    async def run():
+        client = AsyncGeminiClient(endpoint, "stub", rpm=rpm, max_in_flight=max_in_flight)
+        jobs = [job for name in tasks for job in builders[name](client)]
+        results = await run_jobs(jobs, journal=JobJournal("generate_images"))
+        return client, results
+
+    client, results = asyncio.run(run())
+    ok = sum(1 for state in results.values() if state in ("ok", "skipped"))
+    return client_counts(client.metrics), f"{ok}/{len(results)} jobs ok"
+
+
+def run_collision(base_url, stage_count, rpm, max_in_flight, batch_size):
+    import json
+
+    with open(collision_maps.STAGES_PATH, "r", encoding="utf-8") as f:
+        stage_ids = [stage["id"] for stage in json.load(f) if stage.get("areas")][:stage_count]
+    endpoint = f"{base_url}/v1beta/models/{collision_maps.MODEL}:generateContent"
+
+    async def run():
+        client = AsyncGeminiClient(endpoint, "stub", rpm=rpm, max_in_flight=max_in_flight)
+        vision = collision_maps.VisionBatcher(client, batch_size)
+        await collision_maps.generate_collision_maps_async(stage_ids, vision, force=True)
+        return client, vision
+
+    client, vision = asyncio.run(run())
+    written = len(list(collision_maps.OUTPUT_DIR.glob("collision_*.json")))
+    note = f"{written}/{len(stage_ids)} stages written"
+    if batch_size > 1:
+        note += f", {vision.stats['fallbacks']} single re-sends"
+    return client_counts(client.metrics), note
+
+
+def run_clip_renders(base_url, clip_count, max_active):
+    pv_clips.API_BASE = f"{base_url}/v1beta"
+    characters = [char["charId"] for char in pv_clips.load_characters()
+                  if char["charId"] in pv_clips.CHARACTER_VISUALS][:clip_count]
+    results = pv_clips.generate_all_clips(characters=characters, output_dir=pv_clips.OUTPUT_DIR,
+                                          max_active=max_active)
+    ok = sum(1 for state in results.values() if state == "success")
+    client = shared_client(pv_clips.load_api_key(), backoff_base=pv_clips.VEO_BACKOFF_BASE)
+    return client_counts(client.metrics), f"{ok}/{len(results)} clips saved"
+
+
+# ============================================================
+# Report
+# ============================================================
+
+STAT_KEYS = ("requests", "rate_limited", "injected_429", "malformed", "partial", "polls", "downloads")
+
+
+def measure(server, label, fn, *args):
+    """Run one tool, returning its report row."""
+    print(f"\n{'=' * 60}\n{label}\n{'=' * 60}", flush=True)
+    before = {key: server.state.stats[key] for key in STAT_KEYS}
+    start = time.perf_counter()
+    (calls, retries), outcome = fn(*args)
+    wall = time.perf_counter() - start
+    delta = {key: server.state.stats[key] - before[key] for key in STAT_KEYS}
+    served = delta["requests"] + delta["polls"] + delta["downloads"]
+    return {"tool": label, "wall": wall, "served": served, "rate": served / wall if wall else 0.0,
+            "calls": calls, "retries": retries, "429": delta["rate_limited"] + delta["injected_429"],
+            "bad": delta["malformed"] + delta["partial"], "outcome": outcome}
+
+
+def print_report(rows, options):
+    print(f"\n{'=' * 60}")
+    print(f"Load test: stub at {options['--rpm']:g} RPM, latency {options['--latency']:g}s, "
+          f"429 rate {options['--error-rate']:g}, malformed {options['--malformed']:g}, "
+          f"partial {options['--partial']:g}")
+    print(f"{'=' * 60}")
+    print(f"  {'tool':<10} {'wall':>7} {'requests':>8} {'req/s':>6} {'calls':>6} {'retries':>7} "
+          f"{'429s':>5} {'bad':>4}  outcome")
+    for row in rows:
+        print(f"  {row['tool']:<10} {format_duration(row['wall']):>7} {row['served']:>8} {row['rate']:>6.2f} "
+              f"{row['calls']:>6} {row['retries']:>7} {row['429']:>5} {row['bad']:>4}  {row['outcome']}")
+    print("  requests: HTTP requests the stub served (incl. polls, downloads); calls: client calls,")
+    print("  each possibly retried; bad: malformed or partial replies injected by the stub")
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Pipeline Load Test")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    options = {"--rpm": 120.0, "--latency": 0.5, "--error-rate": 0.1, "--malformed": 0.05,
+               "--partial": 0.1, "--op-delay": 6.0, "--image-kb": 256, "--seed": 0,
+               "--images": DEFAULT_IMAGE_TASKS, "--in-flight": 8, "--stages": 4,
+               "--batch": collision_maps.VISION_BATCH_SIZE, "--clips": 6, "--parallel": pv_clips.VEO_MAX_ACTIVE}
+    flags = {"--sheets": False, "--keep": False}
+    tools = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = type(options[args[i]])(args[i + 1])
+            i += 2
+        elif args[i] in flags:
+            flags[args[i]] = True
+            i += 1
+        elif args[i] in TOOLS:
+            tools.append(args[i])
+            i += 1
+        else:
+            print(f"Unknown argument: {args[i]}")
+            print(__doc__)
+            return
+    tools = tools or list(TOOLS)
+    image_tasks = options["--images"].split(",")
+    unknown = [name for name in image_tasks if name not in images.TASKS]
+    if unknown:
+        print(f"Unknown image task: {', '.join(unknown)}")
+        return
+
+    root = Path(tempfile.mkdtemp(prefix="stellar_load_test_"))
+    print(f"Sandbox: {root}")
+    scale_veo_timing(options["--op-delay"])
+    faults = {"error_rate": options["--error-rate"], "malformed": options["--malformed"],
+              "partial": options["--partial"]}
+    # The stub's quota is the one under test; clients get a little headroom over it
+    server, base_url = start_stub_server(0, int(options["--rpm"]), options["--latency"], 0, options["--image-kb"],
+                                         faults, options["--op-delay"], 1024, options["--seed"])
+    client_rpm = options["--rpm"] * 1.1
+
+    rows = []
+    try:
+        with sandbox(root):
+            if "images" in tools:
+                rows.append(measure(server, "images", run_images, base_url, image_tasks, client_rpm,
+                                    options["--in-flight"], flags["--sheets"]))
+            if "collision" in tools:
+                rows.append(measure(server, "collision", run_collision, base_url, options["--stages"],
+                                    client_rpm, options["--in-flight"], options["--batch"]))
+            if "clips" in tools:
+                rows.append(measure(server, "clips", run_clip_renders, base_url, options["--clips"],
+                                    options["--parallel"]))
+    finally:
+        server.shutdown()
+        if flags["--keep"]:
+            print(f"\nSandbox kept: {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print_report(rows, options)
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,17 +22,20 @@ GRID_ROWS = 4
 
 def remove_magenta_bg(img_array):
     """Remove magenta (#FF00FF) background, replace with transparency."""
-    # Magenta: R=255, G=0, B=255
+    return remove_color_bg(img_array, (255, 0, 255))
+
+def remove_color_bg(img_array, color):
+    """Remove a flat background of the given RGB color, replace with transparency."""
     r, g, b = img_array[:,:,0], img_array[:,:,1], img_array[:,:,2]
 
-    # Calculate distance from magenta
+    # Calculate distance from the background color
     dist = np.sqrt(
-        (r.astype(float) - 255)**2 +
-        g.astype(float)**2 +
-        (b.astype(float) - 255)**2
+        (r.astype(float) - color[0])**2 +
+        (g.astype(float) - color[1])**2 +
+        (b.astype(float) - color[2])**2
     )
 
-    # Create alpha channel: transparent where close to magenta
+    # Create alpha channel: transparent where close to the background
     alpha = np.where(dist < MAGENTA_THRESHOLD, 0, 255).astype(np.uint8)
 
     # Soft edge: anti-alias the boundary
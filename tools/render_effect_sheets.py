@@ -0,0 +1,398 @@
+"""
+Stellar Gunners - Effect Sheet Renderer
+Pre-renders EffectSystem's particle bursts (hitImpact, critSpark, explosion,
+enemyDeath, bossBreak) into frame sequences so the game can play pooled
+sprites instead of spawning a dozen tweened images per hit.
+
+Each effect is rebuilt from the same particle textures PreloadScene draws
+(particle_white / spark / ring / smoke / explosion_circle) and the same tween
+timings EffectSystem uses, then rasterized with vectorized NumPy drawing.
+Attribute-tinted effects get one variant per ATTRIBUTE_COLORS entry.
+
+Output:
+  assets/images/game/effects/fx_atlas.png   (packed frames)
+  assets/images/game/effects/fx_atlas.json  (Phaser JSON-hash atlas; meta holds
+                                             animations + color variants)
+
+Usage: python tools/render_effect_sheets.py
+"""
+
+import json
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+PROJECT_ROOT = Path(__file__).parent.parent
+OUTPUT_DIR = PROJECT_ROOT / "assets" / "images" / "game" / "effects"
+ATLAS_NAME = "fx_atlas"
+
+FPS = 30
+SUPERSAMPLE = 2      # Render at 2x and box-filter down for anti-aliasing
+ATLAS_MAX_WIDTH = 2048
+SEED = 1031
+
+# Mirrors ATTRIBUTE_COLORS in js/constants.js
+ATTRIBUTE_COLORS = {
+    'bio': 0xff4444,
+    'psychic': 0x44cc44,
+    'machine': 0x4488ff,
+    'corrosion': 0xaa44dd,
+    'immunity': 0xddcc44,
+}
+# Grey impact used for bullets hitting obstacles/walls (GameScene.onBulletHitObstacle)
+NEUTRAL_COLOR = 0x888888
+
+
+def _rgb(hex_color):
+    return np.array([(hex_color >> 16) & 0xff, (hex_color >> 8) & 0xff, hex_color & 0xff],
+                    dtype=np.float32) / 255.0
+
+
+# ============================================================
+# Particle textures (ported from PreloadScene.genEffectTextures)
+# Each takes texture-space offsets u, v (pixels from texture center,
+# shape (P, H, W)) and returns (alpha, rgb) in [0, 1].
+# ============================================================
+
+def _gradient(d, stops):
+    """Piecewise-linear radial gradient: stops = [(pos, (r, g, b, a)), ...]."""
+    pos = [s[0] for s in stops]
+    channels = [np.interp(d, pos, [s[1][i] for s in stops]) for i in range(4)]
+    rgb = np.stack(channels[:3], axis=-1) / 255.0
+    return channels[3], rgb
+
+
+def tex_white(u, v):
+    d = np.sqrt(u * u + v * v) / 8.0
+    return _gradient(d, [(0, (255, 255, 255, 1)), (0.3, (255, 255, 255, 0.7)),
+                         (1, (255, 255, 255, 0))])
+
+
+def tex_spark(u, v):
+    au, av = np.abs(u), np.abs(v)
+    inside = (au / 3 + av / 6 <= 1) | (au / 6 + av / 3 <= 1)
+    return inside.astype(np.float32), np.ones(3, dtype=np.float32)
+
+
+def tex_ring(u, v):
+    d = np.sqrt(u * u + v * v)
+    outer = np.clip(1.5 - np.abs(d - 12), 0, 1) * 0.9
+    halo = np.clip(0.5 - np.abs(d - 14), 0, 1) * 0.3
+    return np.maximum(outer, halo), np.ones(3, dtype=np.float32)
+
+
+def tex_smoke(u, v):
+    d = np.sqrt(u * u + v * v) / 12.0
+    return _gradient(d, [(0, (200, 200, 200, 0.5)), (0.5, (150, 150, 150, 0.25)),
+                         (1, (100, 100, 100, 0))])
+
+
+def tex_star(u, v):
+    d = np.sqrt(u * u + v * v)
+    phi = np.arctan2(v, u) + math.pi / 2
+    # 1 at the four points, 0 halfway between them
+    t = np.abs((phi % (math.pi / 2)) / (math.pi / 4) - 1)
+    edge = 16 * 0.18 + (7 - 16 * 0.18) * t
+    return (d <= edge).astype(np.float32), np.ones(3, dtype=np.float32)
+
+
+def tex_explosion(u, v):
+    d = np.sqrt(u * u + v * v) / 32.0
+    alpha, rgb = _gradient(d, [(0, (255, 200, 50, 0.9)), (0.3, (255, 120, 20, 0.6)),
+                               (0.7, (255, 60, 10, 0.2)), (1, (255, 30, 0, 0))])
+    return np.where(d <= 1, alpha, 0), rgb
+
+
+TEXTURES = {
+    'white': tex_white,
+    'spark': tex_spark,
+    'ring': tex_ring,
+    'smoke': tex_smoke,
+    'star': tex_star,
+    'explosion': tex_explosion,
+}
+
+
+# ============================================================
+# Particle tracks (one per tweened image in EffectSystem)
+# ============================================================
+
+def track(kind, color, x=0.0, y=0.0, to_x=None, to_y=None, scale=1.0, to_scale=None,
+          alpha=1.0, to_alpha=None, rot=0.0, to_rot=None, duration=100, delay=0):
+    """Linear tween of one particle from its start state to its end state."""
+    return {
+        'kind': kind, 'color': _rgb(color),
+        'x': (x, x if to_x is None else to_x),
+        'y': (y, y if to_y is None else to_y),
+        'scale': (scale, scale if to_scale is None else to_scale),
+        'alpha': (alpha, alpha if to_alpha is None else to_alpha),
+        'rot': (rot, rot if to_rot is None else to_rot),
+        'duration': duration, 'delay': delay,
+    }
+
+
+def fx_hit_impact(rng, color):
+    tracks = [track('white', color, scale=0.3, to_scale=1.0, alpha=0.8, to_alpha=0, duration=150)]
+    for _ in range(4):
+        angle = rng.uniform(0, math.pi * 2)
+        dist = 15 + rng.uniform(0, 20)
+        tracks.append(track('spark', color, to_x=math.cos(angle) * dist, to_y=math.sin(angle) * dist,
+                            scale=0.4 + rng.uniform(0, 0.4), to_scale=0.1, alpha=0.9, to_alpha=0,
+                            rot=angle, duration=200 + rng.uniform(0, 150)))
+    return tracks
+
+
+def fx_crit_spark(rng, color=None):
+    tracks = [
+        track('white', 0xffff00, scale=0.5, to_scale=1.8, alpha=1, to_alpha=0, duration=250),
+        track('star', 0xffcc00, scale=0.8, to_scale=2.0, alpha=1, to_alpha=0, rot=0, to_rot=1,
+              duration=350),
+    ]
+    for i in range(6):
+        angle = (i / 6) * math.pi * 2 + rng.uniform(0, 0.5)
+        dist = 25 + rng.uniform(0, 20)
+        tracks.append(track('spark', 0xffee44, to_x=math.cos(angle) * dist, to_y=math.sin(angle) * dist,
+                            scale=0.5 + rng.uniform(0, 0.5), to_scale=0.1, alpha=1, to_alpha=0,
+                            rot=angle, duration=300 + rng.uniform(0, 200)))
+    return tracks
+
+
+EXPLOSION_RADIUS = 60  # Launcher explosionRadius; runtime scales by radius / 60
+
+
+def fx_explosion(rng, color=None):
+    r = EXPLOSION_RADIUS
+    scale = r / 32
+    tracks = []
+    for _ in range(3):
+        ox = (rng.uniform() - 0.5) * r * 0.6
+        oy = (rng.uniform() - 0.5) * r * 0.6
+        tracks.append(track('smoke', 0x444444, x=ox, y=oy, to_x=ox, to_y=oy - 20 - rng.uniform(0, 15),
+                            scale=0.4, to_scale=1.2 + rng.uniform(0, 0.5), alpha=0.5, to_alpha=0,
+                            duration=500 + rng.uniform(0, 300), delay=50 + rng.uniform(0, 100)))
+    tracks.append(track('ring', 0xff8800, scale=0.2, to_scale=scale * 1.5, alpha=0.9, to_alpha=0,
+                        duration=400))
+    tracks.append(track('explosion', 0xffffff, scale=0.3, to_scale=scale, alpha=0.9, to_alpha=0,
+                        duration=350))
+    for _ in range(8):
+        angle = rng.uniform(0, math.pi * 2)
+        dist = r * 0.5 + rng.uniform(0, r * 0.6)
+        tracks.append(track('white', 0xff6600 if rng.uniform() > 0.5 else 0xffcc00,
+                            to_x=math.cos(angle) * dist, to_y=math.sin(angle) * dist,
+                            scale=0.3 + rng.uniform(0, 0.4), to_scale=0.05, alpha=1, to_alpha=0,
+                            duration=300 + rng.uniform(0, 300)))
+    return tracks
+
+
+def fx_enemy_death(rng, color):
+    tracks = [track('ring', color, scale=0.2, to_scale=1.2, alpha=0.7, to_alpha=0, duration=350),
+              track('white', 0xffffff, scale=0.5, to_scale=2.0, alpha=1, to_alpha=0, duration=200)]
+    for _ in range(7):
+        angle = rng.uniform(0, math.pi * 2)
+        dist = 20 + rng.uniform(0, 25)
+        tracks.append(track('white', color if rng.uniform() > 0.3 else 0xffffff,
+                            to_x=math.cos(angle) * dist, to_y=math.sin(angle) * dist,
+                            scale=0.2 + rng.uniform(0, 0.3), to_scale=0.05, alpha=0.9, to_alpha=0,
+                            duration=250 + rng.uniform(0, 250)))
+    return tracks
+
+
+def fx_boss_break(rng, color=None):
+    tracks = [track('white', 0xffff00, scale=1, to_scale=4, alpha=1, to_alpha=0, duration=400)]
+    for i in range(3):
+        tracks.append(track('ring', 0xffff00, scale=0.3, to_scale=2.5 + i, alpha=0.8, to_alpha=0,
+                            duration=400 + i * 150, delay=i * 80))
+    for _ in range(15):
+        angle = rng.uniform(0, math.pi * 2)
+        dist = 30 + rng.uniform(0, 50)
+        tracks.append(track('spark', 0xffff00 if rng.uniform() > 0.5 else 0xffaa00,
+                            to_x=math.cos(angle) * dist, to_y=math.sin(angle) * dist,
+                            scale=0.4 + rng.uniform(0, 0.5), to_scale=0.05, alpha=1, to_alpha=0,
+                            rot=rng.uniform(0, math.pi), duration=400 + rng.uniform(0, 400),
+                            delay=rng.uniform(0, 100)))
+    return tracks
+
+
+# name -> (builder, frame size px, color variants)
+ATTRIBUTE_VARIANTS = dict(ATTRIBUTE_COLORS)
+EFFECTS = {
+    'hitImpact': (fx_hit_impact, 80, dict(ATTRIBUTE_VARIANTS, neutral=NEUTRAL_COLOR)),
+    'critSpark': (fx_crit_spark, 112, {'default': None}),
+    'explosion': (fx_explosion, 160, {'default': None}),
+    'enemyDeath': (fx_enemy_death, 112, ATTRIBUTE_VARIANTS),
+    'bossBreak': (fx_boss_break, 192, {'default': None}),
+}
+
+
+# ============================================================
+# Rasterizer
+# ============================================================
+
+def _track_state(tracks, t_ms):
+    """Interpolate every track at time t_ms. Returns dict of (P,) arrays for live particles."""
+    live = []
+    for tr in tracks:
+        p = (t_ms - tr['delay']) / tr['duration']
+        if p >= 1:
+            continue  # onComplete -> destroy()
+        p = max(p, 0.0)
+        state = {k: tr[k][0] + (tr[k][1] - tr[k][0]) * p for k in ('x', 'y', 'scale', 'alpha', 'rot')}
+        state['kind'] = tr['kind']
+        state['color'] = tr['color']
+        live.append(state)
+    return live
+
+
+def render_frame(tracks, t_ms, size):
+    """Rasterize all live particles at t_ms into a (size, size, 4) uint8 RGBA frame."""
+    n = size * SUPERSAMPLE
+    coords = (np.arange(n, dtype=np.float32) + 0.5) / SUPERSAMPLE - size / 2
+    gx, gy = np.meshgrid(coords, coords)
+
+    live = _track_state(tracks, t_ms)
+    out_rgb = np.zeros((n, n, 3), dtype=np.float32)  # premultiplied
+    out_a = np.zeros((n, n), dtype=np.float32)
+    if not live:
+        return np.zeros((size, size, 4), dtype=np.uint8)
+
+    # Evaluate every particle of a texture kind in one broadcast, then composite in draw order
+    alphas = [None] * len(live)
+    colors = [None] * len(live)
+    for kind, tex_fn in TEXTURES.items():
+        idx = [i for i, s in enumerate(live) if s['kind'] == kind]
+        if not idx:
+            continue
+        px = np.array([live[i]['x'] for i in idx], dtype=np.float32)[:, None, None]
+        py = np.array([live[i]['y'] for i in idx], dtype=np.float32)[:, None, None]
+        sc = np.array([max(live[i]['scale'], 1e-3) for i in idx], dtype=np.float32)[:, None, None]
+        rot = np.array([live[i]['rot'] for i in idx], dtype=np.float32)[:, None, None]
+        dx, dy = gx[None] - px, gy[None] - py
+        cos_r, sin_r = np.cos(rot), np.sin(rot)
+        u = (dx * cos_r + dy * sin_r) / sc
+        v = (-dx * sin_r + dy * cos_r) / sc
+        tex_a, tex_rgb = tex_fn(u, v)
+        tex_rgb = np.broadcast_to(tex_rgb, u.shape + (3,))
+        for j, i in enumerate(idx):
+            alphas[i] = tex_a[j] * live[i]['alpha']
+            colors[i] = tex_rgb[j] * live[i]['color']
+
+    for a, c in zip(alphas, colors):
+        out_rgb = c * a[..., None] + out_rgb * (1 - a[..., None])
+        out_a = a + out_a * (1 - a)
+
+    # Box-filter supersamples (premultiplied), then un-premultiply
+    ss = SUPERSAMPLE
+    out_rgb = out_rgb.reshape(size, ss, size, ss, 3).mean(axis=(1, 3))
+    out_a = out_a.reshape(size, ss, size, ss).mean(axis=(1, 3))
+    rgb = np.where(out_a[..., None] > 1e-4, out_rgb / np.maximum(out_a[..., None], 1e-4), 0)
+    rgba = np.dstack([np.clip(rgb, 0, 1), np.clip(out_a, 0, 1)])
+    return (rgba * 255 + 0.5).astype(np.uint8)
+
+
+def render_effect(builder, size, color, seed):
+    """Render one effect variant into a list of frames at FPS."""
+    rng = np.random.default_rng(seed)
+    tracks = builder(rng, color)
+    total_ms = max(tr['delay'] + tr['duration'] for tr in tracks)
+    frame_count = max(1, math.ceil(total_ms / 1000 * FPS))
+    return [render_frame(tracks, i * 1000 / FPS, size) for i in range(frame_count)]
+
+
+# ============================================================
+# Atlas packing
+# ============================================================
+
+def pack_atlas(animations):
+    """Shelf-pack frames. animations = {key: [frame arrays]} -> (image, frame rects)."""
+    rects = {}
+    x = y = shelf_h = 0
+    width = 0
+    for key, frames in animations.items():
+        for i, frame in enumerate(frames):
+            h, w = frame.shape[:2]
+            if x + w > ATLAS_MAX_WIDTH:
+                x, y, shelf_h = 0, y + shelf_h, 0
+            rects[f"{key}/{i:03d}"] = (x, y, w, h, frame)
+            x += w
+            shelf_h = max(shelf_h, h)
+            width = max(width, x)
+    height = y + shelf_h
+
+    atlas = np.zeros((height, width, 4), dtype=np.uint8)
+    for x, y, w, h, frame in rects.values():
+        atlas[y:y + h, x:x + w] = frame
+    return Image.fromarray(atlas, 'RGBA'), {k: v[:4] for k, v in rects.items()}
+
+
+def build_atlas_json(rects, animations, variants, image_size):
+    frames = {}
+    for name, (x, y, w, h) in rects.items():
+        frames[name] = {
+            "frame": {"x": x, "y": y, "w": w, "h": h},
+            "rotated": False,
+            "trimmed": False,
+            "spriteSourceSize": {"x": 0, "y": 0, "w": w, "h": h},
+            "sourceSize": {"w": w, "h": h},
+        }
+    return {
+        "frames": frames,
+        "meta": {
+            "app": "tools/render_effect_sheets.py",
+            "image": f"{ATLAS_NAME}.png",
+            "format": "RGBA8888",
+            "size": {"w": image_size[0], "h": image_size[1]},
+            "scale": "1",
+            "frameRate": FPS,
+            "explosionRadius": EXPLOSION_RADIUS,
+            "animations": {key: [f"{key}/{i:03d}" for i in range(len(frames_))]
+                           for key, frames_ in animations.items()},
+            "variants": variants,
+        },
+    }
+
+
+def render_all():
+    animations = {}
+    variants = {}
+    for effect_idx, (name, (builder, size, colors)) in enumerate(EFFECTS.items()):
+        start = time.perf_counter()
+        for variant, color in colors.items():
+            key = f"fx_{name}_{variant}"
+            # Same seed per effect so every color variant shares one particle layout
+            animations[key] = render_effect(builder, size, color, SEED + effect_idx)
+            if color is not None:
+                variants.setdefault(name, {})[variant] = f"{color:06x}"
+        elapsed = (time.perf_counter() - start) * 1000
+        frame_count = len(animations[key])
+        print(f"  {name}: {len(colors)} variant(s) x {frame_count} frames @ {size}px ({elapsed:.0f} ms)")
+
+    image, rects = pack_atlas(animations)
+    atlas_json = build_atlas_json(rects, animations, variants, image.size)
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    png_path = OUTPUT_DIR / f"{ATLAS_NAME}.png"
+    json_path = OUTPUT_DIR / f"{ATLAS_NAME}.json"
+    image.save(png_path, "PNG", optimize=True)
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(atlas_json, f, separators=(',', ':'))
+
+    size_kb = png_path.stat().st_size / 1024
+    print(f"\n  Atlas: {image.size[0]}x{image.size[1]}, {len(rects)} frames, "
+          f"{len(animations)} animations ({size_kb:.0f} KB) -> {png_path.relative_to(PROJECT_ROOT)}")
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Effect Sheet Renderer")
+    print(f"FPS: {FPS} | Supersample: {SUPERSAMPLE}x | Output: {OUTPUT_DIR}")
+    print("=" * 60)
+
+    render_all()
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Stellar Gunners - API Response Cache
+Content-addressed on-disk cache for results of paid API calls, so re-running a
+tool after tweaking post-processing does not re-send unchanged requests.
+
+Entries are JSON files sharded by the first two hex chars of their key:
+  tools/.cache/<namespace>/<key[:2]>/<key>.json
+Binary results (generated images) are blobs named by the sha256 of their own
+bytes, so identical data is stored once, and referenced from JSON entries:
+  tools/.cache/<namespace>/blobs/<digest[:2]>/<digest><suffix>
+Writes go through a temp file + os.replace, so concurrent writers and killed
+runs never leave a half-written entry.
+
+Usage:
+  python tools/response_cache.py [namespace ...]   # Show entry counts and sizes
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+CACHE_ROOT = Path(__file__).parent / ".cache"
+
+
+def cache_key(*parts):
+    """sha256 over the given parts (bytes or str), length-prefixed so parts cannot run together."""
+    h = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """JSON values stored under content-hash keys in one namespace directory."""
+
+    def __init__(self, namespace, root=CACHE_ROOT, enabled=True, refresh=False):
+        self.dir = Path(root) / namespace
+        self.enabled = enabled
+        self.refresh = refresh  # skip lookups but still store new results
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return self.dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """Cached value for key, or None (always None in refresh mode)."""
+        if not self.enabled or self.refresh:
+            return None
+        value = self.peek(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def peek(self, key):
+        """Stored value for key even in refresh mode, without counting a hit or miss."""
+        if not self.enabled:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        _write_atomic(self._path(key), json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    def _blob_path(self, digest, suffix):
+        return self.dir / "blobs" / digest[:2] / f"{digest}{suffix}"
+
+    def put_blob(self, data, suffix=""):
+        """Store bytes under their sha256 and return the digest (written once per content)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest, suffix)
+        if self.enabled and not path.exists():
+            _write_atomic(path, data)
+        return digest
+
+    def put_blob_file(self, path, suffix=""):
+        """put_blob for a file on disk, hashed and copied in blocks. Returns the digest."""
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        blob = self._blob_path(digest, suffix)
+        if self.enabled and not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=blob.parent, suffix=".tmp")
+            os.close(fd)
+            try:
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, blob)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        return digest
+
+    def blob_path(self, digest, suffix=""):
+        """Path of a stored blob, or None if it is missing."""
+        path = self._blob_path(digest, suffix)
+        return path if path.exists() else None
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - API Response Cache")
+    print(f"Root: {CACHE_ROOT}")
+    print("=" * 60)
+
+    namespaces = sys.argv[1:]
+    if not namespaces and CACHE_ROOT.exists():
+        namespaces = sorted(p.name for p in CACHE_ROOT.iterdir() if p.is_dir())
+    for namespace in namespaces:
+        files = list((CACHE_ROOT / namespace).glob("*/*.json"))
+        blobs = [f for f in (CACHE_ROOT / namespace).glob("blobs/*/*") if f.suffix != ".tmp"]
+        size = sum(f.stat().st_size for f in files + blobs)
+        line = f"  {namespace:<20} {len(files):>6} entries  {size / 1024:8.1f} KB"
+        if blobs:
+            line += f"  ({len(blobs)} blobs)"
+        print(line)
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
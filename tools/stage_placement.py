@@ -0,0 +1,343 @@
+"""
+Stellar Gunners - Stage Placement Precompute
+Computes enemy spawn points and procedural obstacle layouts for every stage
+area offline, so GameScene and ObstacleManager do no sampling when an area
+loads (previously up to 50 Math.random() tries per obstacle).
+
+Per area, with a seeded RNG (seed ^ crc32("<stage_id>:<areaIndex>"), so one
+area's layout does not shift when another changes):
+  spawns    - {"top", "right", "bottom", "left"}: world points enemies enter
+              from, in shuffled order. Connected walkable edge cells of the
+              collision map, else points along the 100px field margin (the
+              runtime fallback) clear of the obstacles
+  obstacles - only without a collision map (an area with one takes its walls
+              from the map, see GameScene.loadArea). Poisson-disk (Bridson)
+              candidate points over the field, taken in shuffled order and
+              typed by the AREA_LAYOUTS template. A candidate is kept if its
+              footprint stays inside the margin, off the player spawn zone and
+              clear of placed obstacles (20px padding, as the runtime sampler)
+
+Output assets/data/stage_placement.json:
+  {"version": 2, "seed": 1, "stages": {"stage_1_1": [
+      {"areaIndex": 0, "layout": "sparse", "navKey": 123, "spawns": {"top": [[x, y], ...], ...},
+       "fallback": {"navKey": null, "obstacles": [["crate", x, y], ...], "spawns": {...}}}]}}
+
+navKey is the area's nav["nextHop"] key (crc32 of its connected cells) when
+the entry was computed against a collision map, else null and the entry
+carries "obstacles". An area with a collision map also gets a "fallback"
+entry for when the game runs without it. The game only uses an entry whose
+navKey and layout match what it loaded, so after regenerating collision maps
+re-run this tool or areas fall back to runtime sampling.
+
+Usage:
+  python tools/stage_placement.py [--seed N] [stage_id ...]   # Write placements, compare with runtime sampling
+"""
+
+import json
+import math
+import os
+import random
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from collision_format import COLLISION_DIR, GRID_COLS, GRID_ROWS, PROJECT_ROOT, decode_grid, load_collision_file
+from collision_nexthop import nexthop_key
+
+STAGES_PATH = PROJECT_ROOT / "assets" / "data" / "stages.json"
+OUTPUT_PATH = PROJECT_ROOT / "assets" / "data" / "stage_placement.json"
+
+FORMAT_VERSION = 2
+DEFAULT_SEED = 1
+
+# Mirrors js/constants.js
+FIELD_WIDTH = 1200
+FIELD_HEIGHT = 900
+CELL_WIDTH = FIELD_WIDTH / GRID_COLS
+CELL_HEIGHT = FIELD_HEIGHT / GRID_ROWS
+OBSTACLE_TYPES = {
+    "wall": (64, 16),
+    "barricade": (48, 12),
+    "pillar": (24, 24),
+    "crate": (32, 32),
+}
+AREA_LAYOUTS = {
+    "open": (0, []),
+    "sparse": (4, ["crate", "barricade"]),
+    "moderate": (8, ["wall", "barricade", "pillar"]),
+    "corridor": (12, ["wall", "wall", "pillar"]),
+    "pillars": (6, ["pillar"]),
+    "arena": (4, ["pillar", "pillar"]),
+    "bunker": (10, ["wall", "barricade", "crate"]),
+}
+
+# Mirrors ObstacleManager / GameScene
+OBSTACLE_MARGIN = 120
+OBSTACLE_PADDING = 20
+PLAYER_ZONE = (FIELD_WIDTH / 2 - 80, FIELD_HEIGHT / 2 - 80, 160, 160)  # x, y, w, h
+SPAWN_MARGIN = 100
+SPAWN_SPACING = 40   # px between fallback spawn points along the margin
+
+POISSON_TRIES = 30   # Bridson candidates per active point
+
+
+def area_seed(seed, stage_id, area_index):
+    return seed ^ zlib.crc32(f"{stage_id}:{area_index}".encode("ascii"))
+
+
+def poisson_disk(rng, bounds, radius, accept, tries=POISSON_TRIES):
+    """Bridson Poisson-disk points in bounds (x0, y0, x1, y1), at least radius
+    apart. accept(x, y) filters points (e.g. off walls); rejected points do not
+    seed new candidates."""
+    x0, y0, x1, y1 = bounds
+    size = radius / math.sqrt(2)
+    cols, rows = int((x1 - x0) / size) + 1, int((y1 - y0) / size) + 1
+    grid = {}
+    points, active = [], []
+
+    def fits(x, y):
+        if not (x0 <= x <= x1 and y0 <= y <= y1) or not accept(x, y):
+            return False
+        gc, gr = int((x - x0) / size), int((y - y0) / size)
+        for r in range(max(0, gr - 2), min(rows, gr + 3)):
+            for c in range(max(0, gc - 2), min(cols, gc + 3)):
+                other = grid.get((r, c))
+                if other is not None and (other[0] - x) ** 2 + (other[1] - y) ** 2 < radius * radius:
+                    return False
+        return True
+
+    def add(x, y):
+        grid[(int((y - y0) / size), int((x - x0) / size))] = (x, y)
+        points.append((x, y))
+        active.append((x, y))
+
+    for _ in range(tries):
+        x, y = rng.uniform(x0, x1), rng.uniform(y0, y1)
+        if fits(x, y):
+            add(x, y)
+            break
+
+    while active:
+        i = rng.randrange(len(active))
+        px, py = active[i]
+        for _ in range(tries):
+            angle = rng.uniform(0, 2 * math.pi)
+            dist = rng.uniform(radius, 2 * radius)
+            x, y = px + dist * math.cos(angle), py + dist * math.sin(angle)
+            if fits(x, y):
+                add(x, y)
+                break
+        else:
+            active[i] = active[-1]
+            active.pop()
+    return points
+
+
+def overlaps_rect(x, y, width, height, rect):
+    rx, ry, rw, rh = rect
+    return not (x + width / 2 < rx or x - width / 2 > rx + rw or
+                y + height / 2 < ry or y - height / 2 > ry + rh)
+
+
+def obstacle_rect(kind, x, y):
+    width, height = OBSTACLE_TYPES[kind]
+    return x - width / 2, y - height / 2, width, height
+
+
+def overlaps_sibling(x, y, width, height, placed):
+    hw, hh = width / 2 + OBSTACLE_PADDING, height / 2 + OBSTACLE_PADDING
+    for kind, ox, oy in placed:
+        ow, oh = OBSTACLE_TYPES[kind]
+        if abs(x - ox) < hw + ow / 2 + OBSTACLE_PADDING and abs(y - oy) < hh + oh / 2 + OBSTACLE_PADDING:
+            return True
+    return False
+
+
+def place_obstacles(rng, layout):
+    """Obstacle layout [(type, x, y)] for an AREA_LAYOUTS template."""
+    count, types = AREA_LAYOUTS.get(layout, (0, []))
+    if count == 0:
+        return []
+
+    def on_floor(x, y):
+        return not overlaps_rect(x, y, 0, 0, PLAYER_ZONE)
+
+    radius = max(max(OBSTACLE_TYPES[t]) for t in types) + 2 * OBSTACLE_PADDING
+    bounds = (OBSTACLE_MARGIN, OBSTACLE_MARGIN, FIELD_WIDTH - OBSTACLE_MARGIN, FIELD_HEIGHT - OBSTACLE_MARGIN)
+    candidates = poisson_disk(rng, bounds, radius, on_floor)
+    rng.shuffle(candidates)
+
+    placed = []
+    for x, y in candidates:
+        if len(placed) == count:
+            break
+        kind = types[len(placed) % len(types)]
+        width, height = OBSTACLE_TYPES[kind]
+        if (x - width / 2 < OBSTACLE_MARGIN or x + width / 2 > FIELD_WIDTH - OBSTACLE_MARGIN or
+                y - height / 2 < OBSTACLE_MARGIN or y + height / 2 > FIELD_HEIGHT - OBSTACLE_MARGIN):
+            continue
+        if overlaps_rect(x, y, width, height, PLAYER_ZONE) or overlaps_sibling(x, y, width, height, placed):
+            continue
+        placed.append((kind, round(x), round(y)))
+    return placed
+
+
+def spawn_points(rng, obstacles, connected=None):
+    """Shuffled enemy spawn points per edge, [[x, y], ...]."""
+    spawns = {}
+    for edge in ("top", "right", "bottom", "left"):
+        if connected is not None:
+            cells = {"top": [(0, c) for c in range(GRID_COLS)],
+                     "bottom": [(GRID_ROWS - 1, c) for c in range(GRID_COLS)],
+                     "left": [(r, 0) for r in range(GRID_ROWS)],
+                     "right": [(r, GRID_COLS - 1) for r in range(GRID_ROWS)]}[edge]
+            points = [[round(c * CELL_WIDTH + CELL_WIDTH / 2), round(r * CELL_HEIGHT + CELL_HEIGHT / 2)]
+                      for r, c in cells if connected[r, c]]
+        else:
+            if edge in ("top", "bottom"):
+                y = SPAWN_MARGIN if edge == "top" else FIELD_HEIGHT - SPAWN_MARGIN
+                points = [[x, y] for x in range(SPAWN_MARGIN, FIELD_WIDTH - SPAWN_MARGIN + 1, SPAWN_SPACING)]
+            else:
+                x = SPAWN_MARGIN if edge == "left" else FIELD_WIDTH - SPAWN_MARGIN
+                points = [[x, y] for y in range(SPAWN_MARGIN, FIELD_HEIGHT - SPAWN_MARGIN + 1, SPAWN_SPACING)]
+            points = [p for p in points
+                      if not any(overlaps_rect(p[0], p[1], 0, 0, obstacle_rect(*o)) for o in obstacles)]
+        rng.shuffle(points)
+        spawns[edge] = points
+    return spawns
+
+
+def area_nav(collision_data, area_index):
+    """(connected bool grid, navKey) for an area's collision map, or (None, None)."""
+    if not collision_data:
+        return None, None
+    area = next((a for a in collision_data.get("areas", []) if a["areaIndex"] == area_index), None)
+    if not area or not area.get("nav"):
+        return None, None
+    nav = area["nav"]
+    connected = np.asarray(decode_grid(nav["connected"], GRID_COLS), dtype=bool)
+    return connected, nexthop_key(nav["connected"])
+
+
+def place_area(seed, stage_id, area_index, layout, collision_data=None):
+    """Placement entry for one stage area."""
+    rng = random.Random(area_seed(seed, stage_id, area_index))
+    obstacles = place_obstacles(rng, layout)
+    fallback = {
+        "navKey": None,
+        "obstacles": [list(o) for o in obstacles],
+        "spawns": spawn_points(rng, obstacles),
+    }
+    connected, nav_key = area_nav(collision_data, area_index)
+    if connected is None:
+        return {"areaIndex": area_index, "layout": layout, **fallback}
+    return {
+        "areaIndex": area_index,
+        "layout": layout,
+        "navKey": nav_key,
+        "spawns": spawn_points(rng, [], connected),
+        "fallback": fallback,
+    }
+
+
+def save_placement_file(path, data):
+    """Write the placement file (temp file + rename)."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+# ============================================================
+# Comparison with runtime sampling
+# ============================================================
+
+def runtime_sample(rng, layout):
+    """The old ObstacleManager.generateForArea rejection sampler.
+
+    Returns (placed [(type, x, y)], random draws used)."""
+    count, types = AREA_LAYOUTS.get(layout, (0, []))
+    placed, draws = [], 0
+    for i in range(count):
+        kind = types[i % len(types)]
+        width, height = OBSTACLE_TYPES[kind]
+        for _ in range(50):
+            x = OBSTACLE_MARGIN + rng.random() * (FIELD_WIDTH - OBSTACLE_MARGIN * 2)
+            y = OBSTACLE_MARGIN + rng.random() * (FIELD_HEIGHT - OBSTACLE_MARGIN * 2)
+            draws += 2
+            if not overlaps_rect(x, y, width, height, PLAYER_ZONE) and not overlaps_sibling(x, y, width, height, placed):
+                placed.append((kind, x, y))
+                break
+    return placed, draws
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Stage Placement Precompute")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    seed = DEFAULT_SEED
+    target_stages = []
+    i = 0
+    while i < len(args):
+        if args[i] == "--seed" and i + 1 < len(args):
+            seed = int(args[i + 1])
+            i += 2
+        else:
+            target_stages.append(args[i])
+            i += 1
+
+    with open(STAGES_PATH, "r", encoding="utf-8") as f:
+        stages = json.load(f)
+
+    data = {"version": FORMAT_VERSION, "seed": seed, "stages": {}}
+    if target_stages and OUTPUT_PATH.exists():
+        with open(OUTPUT_PATH, "r", encoding="utf-8") as f:
+            existing = json.load(f)
+        if existing.get("seed") == seed and existing.get("version") == FORMAT_VERSION:
+            data["stages"] = existing.get("stages", {})
+
+    totals = {"requested": 0, "placed": 0, "runtime_placed": 0, "draws": 0}
+    for stage in stages:
+        stage_id = stage["id"]
+        if target_stages and stage_id not in target_stages:
+            continue
+        collision_path = COLLISION_DIR / f"collision_{stage_id}.json"
+        collision_data = load_collision_file(collision_path) if collision_path.exists() else None
+
+        start = time.perf_counter()
+        entries = [place_area(seed, stage_id, idx, area.get("layout", "open"), collision_data)
+                   for idx, area in enumerate(stage.get("areas", []))]
+        elapsed = (time.perf_counter() - start) * 1000
+        data["stages"][stage_id] = entries
+
+        requested = placed = spawns = 0
+        rng = random.Random(seed)
+        for entry in entries:
+            count = AREA_LAYOUTS.get(entry["layout"], (0, []))[0]
+            requested += count
+            placed += len(entry.get("fallback", entry)["obstacles"])
+            spawns += sum(len(points) for points in entry["spawns"].values())
+            sampled, draws = runtime_sample(rng, entry["layout"])
+            totals["runtime_placed"] += len(sampled)
+            totals["draws"] += draws
+        totals["requested"] += requested
+        totals["placed"] += placed
+        grid_note = "collision map" if collision_data else "no collision map"
+        print(f"  {stage_id:<11} {len(entries)} areas ({grid_note}), obstacles {placed}/{requested}, "
+              f"{spawns} spawn points, {elapsed:5.0f} ms")
+
+    save_placement_file(OUTPUT_PATH, data)
+    print(f"\n  Saved: {OUTPUT_PATH} ({OUTPUT_PATH.stat().st_size / 1024:.1f} KB)")
+    print(f"  Precomputed (no-grid layouts): {totals['placed']}/{totals['requested']} obstacles, "
+          f"0 random draws at area load")
+    print(f"  Runtime sampler (same areas): {totals['runtime_placed']}/{totals['requested']} obstacles, "
+          f"{totals['draws']} random draws")
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Tests for collision_repair.py (pytest, run from tools/)."""
+
+import numpy as np
+import pytest
+
+from collision_repair import BASE_COLS, BASE_ROWS, MIN_EDGE_CELLS, _scaled, edge_reach_counts, repair_grid, repair_grids
+
+
+@pytest.mark.parametrize("cols, rows", [(5, 5), (6, 6), (11, 8), (7, 9), (3, 2), (BASE_COLS, BASE_ROWS)])
+def test_all_wall_grid_is_opened(cols, rows):
+    repaired = repair_grid(np.ones((rows, cols), dtype=int))
+    assert repaired[rows // 2, cols // 2] == 0
+    min_edge = _scaled(MIN_EDGE_CELLS, cols, BASE_COLS)
+    assert min(edge_reach_counts(repaired).values()) >= min(min_edge, rows, cols)
+
+
+def test_batched_matches_single():
+    rng = np.random.default_rng(7)
+    grids = rng.random((20, 8, 11)) < 0.6
+    batched = repair_grids(grids, seeds=range(20))
+    for i, grid in enumerate(grids):
+        assert np.array_equal(batched[i], repair_grid(grid, seed=i))
@@ -0,0 +1,97 @@
+"""Tests for GeminiClient.download against gemini_stub.py (pytest, run from tools/)."""
+
+import pytest
+
+from gemini_client import GeminiClient, GeminiError
+from gemini_stub import start_stub_server, stub_file
+
+SIZE = 256 * 1024
+CHUNK = 16 * 1024
+DROP = 6 * CHUNK  # a whole number of chunks: a chunk cut off by the drop is not kept
+
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub_server(rpm=0, latency=0, drop=DROP)
+    yield server, f"{base_url}/v1beta/files/clip:download?size={SIZE}"
+    server.shutdown()
+
+
+def client(max_retries):
+    return GeminiClient("stub", max_retries=max_retries, backoff_base=0.001)
+
+
+def leftovers(tmp_path):
+    return sorted(p.name for p in tmp_path.iterdir())
+
+
+def interrupted(stub, tmp_path):
+    """Download once with no retries so the first drop leaves a part behind."""
+    server, url = stub
+    out = tmp_path / "clip.mp4"
+    with pytest.raises(GeminiError):
+        client(0).download(url, out, "download", chunk_size=CHUNK)
+    assert (tmp_path / ".clip.mp4.part").stat().st_size == DROP
+    server.state.drop = 0
+    server.state.download_log.clear()
+    return out
+
+
+def test_resumes_dropped_connections(stub, tmp_path):
+    server, url = stub
+    data, md5 = stub_file("clip", SIZE)
+    out = tmp_path / "clip.mp4"
+    assert client(5).download(url, out, "download", chunk_size=CHUNK) == SIZE
+    assert out.read_bytes() == data
+    assert server.state.download_log == [(None, None), (f"bytes={DROP}-", f'"{md5}"'),
+                                         (f"bytes={2 * DROP}-", f'"{md5}"')]
+    assert leftovers(tmp_path) == ["clip.mp4"]
+
+
+def test_resumes_part_left_by_earlier_run(stub, tmp_path):
+    server, url = stub
+    data, md5 = stub_file("clip", SIZE)
+    out = interrupted(stub, tmp_path)
+    assert (tmp_path / ".clip.mp4.etag").read_text() == f'"{md5}"'
+
+    client(0).download(url, out, "download", chunk_size=CHUNK)
+    assert out.read_bytes() == data
+    assert server.state.download_log == [(f"bytes={DROP}-", f'"{md5}"')]
+    assert server.state.stats["ranged"] == 1
+    assert leftovers(tmp_path) == ["clip.mp4"]
+
+
+def test_changed_etag_restarts(stub, tmp_path):
+    server, url = stub
+    _, old_md5 = stub_file("clip", SIZE)
+    out = interrupted(stub, tmp_path)
+    server.state.file_revision = 1
+    data, _ = stub_file("clip", SIZE, 1)
+
+    client(0).download(url, out, "download", chunk_size=CHUNK)
+    assert out.read_bytes() == data
+    assert server.state.download_log == [(f"bytes={DROP}-", f'"{old_md5}"')]
+    assert server.state.stats["ranged"] == 0
+    assert leftovers(tmp_path) == ["clip.mp4"]
+
+
+def test_part_without_etag_restarts(stub, tmp_path):
+    server, url = stub
+    data, _ = stub_file("clip", SIZE)
+    out = interrupted(stub, tmp_path)
+    (tmp_path / ".clip.mp4.etag").unlink()
+
+    client(0).download(url, out, "download", chunk_size=CHUNK)
+    assert out.read_bytes() == data
+    assert server.state.download_log == [(None, None)]
+
+
+def test_md5_mismatch_discards_part(stub, tmp_path):
+    server, url = stub
+    out = interrupted(stub, tmp_path)
+    (tmp_path / ".clip.mp4.part").write_bytes(bytes(DROP))  # right length, wrong bytes
+
+    with pytest.raises(GeminiError, match="checksum"):
+        client(0).download(url, out, "download", chunk_size=CHUNK)
+    assert server.state.download_log[0][0] == f"bytes={DROP}-"
+    assert leftovers(tmp_path) == []
@@ -0,0 +1,70 @@
+"""Tests for inline_stream.py and the batch ingest built on it (pytest, run from tools/)."""
+
+import base64
+import json
+
+import pytest
+
+from batch_jobs import ingest_results
+from inline_stream import INLINE_KEYS, stream_inline_image
+
+FIRST, THOUGHT, FINAL = b"first-image" * 300, b"interim-thought" * 200, b"final-image" * 400
+
+
+def image_part(key, data, **extra):
+    return {**extra, key: {"mimeType": "image/png", "data": base64.b64encode(data).decode()}}
+
+
+def response(parts):
+    return {"candidates": [{"content": {"parts": parts}}]}
+
+
+def chunked(body, size=7):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("key", INLINE_KEYS)
+def test_saves_last_image(tmp_path, key):
+    body = json.dumps(response([image_part(key, FIRST), {"text": "done"}, image_part(key, FINAL)])).encode()
+    out = tmp_path / "out.png"
+    size, result = stream_inline_image(chunked(body), out)
+    assert size == len(FINAL) and out.read_bytes() == FINAL
+    assert result["candidates"][0]["content"]["parts"][1] == {"text": "done"}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out.png"]
+
+
+@pytest.mark.parametrize("key", INLINE_KEYS)
+def test_skips_thought_images(tmp_path, key):
+    parts = [image_part(key, THOUGHT, thought=True), image_part(key, FINAL), image_part(key, THOUGHT, thought=True)]
+    out = tmp_path / "out.png"
+    size, _ = stream_inline_image(chunked(json.dumps(response(parts)).encode()), out)
+    assert size == len(FINAL) and out.read_bytes() == FINAL
+
+
+@pytest.mark.parametrize("key", INLINE_KEYS)
+def test_only_thought_image_is_no_image(tmp_path, key):
+    out = tmp_path / "out.png"
+    body = json.dumps(response([image_part(key, THOUGHT, thought=True)])).encode()
+    size, _ = stream_inline_image(chunked(body), out)
+    assert size is None and not out.exists()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_truncated_body_leaves_nothing(tmp_path):
+    body = json.dumps(response([image_part("inlineData", FIRST), image_part("inlineData", FINAL)])).encode()
+    with pytest.raises(ValueError):
+        stream_inline_image(chunked(body[:len(body) // 2]), tmp_path / "out.png")
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("key", INLINE_KEYS)
+def test_batch_ingest(tmp_path, key):
+    results = tmp_path / "results.jsonl"
+    lines = [{"key": "a", "response": response([{"text": "ok"}, image_part(key, FINAL)])},
+             {"key": "b", "response": response([{"text": "refused"}])}]
+    results.write_text("".join(json.dumps(line) + "\n" for line in lines), encoding="utf-8")
+    manifest = {"jobs": {"a": {"output": str(tmp_path / "a.png")}, "b": {"output": str(tmp_path / "b.png")}}}
+
+    report = ingest_results(results, manifest)
+    assert report["saved"] == 1 and list(report["failed"]) == ["b"]
+    assert (tmp_path / "a.png").read_bytes() == FINAL
@@ -0,0 +1,139 @@
+"""
+Stellar Gunners - Upload Image Encoder
+Prepares images sent inline in Gemini / VEO request bodies. Instead of
+base64-ing the raw PNG (1-2 MB per area background), each image is scaled
+down to what the task needs and re-encoded:
+
+  vision - 600x450 JPEG: 20px per cell of the 30x22 collision grid
+  ref    - 1024px long edge WebP: reference art for image generation,
+           keeps portrait transparency
+  veo    - 1280px long edge JPEG: VEO image-to-video start frame (VEO takes
+           JPEG/PNG only; transparency is flattened onto black)
+
+Images are never upscaled, and the original is sent if re-encoding would not
+make it smaller. Encoded payloads are cached under tools/.cache/uploads by
+source hash and preset, so re-runs skip the encode. upload_stats counts
+bytes before/after for the run; upload_report() formats it.
+
+Usage:
+  python tools/upload_images.py [vision|ref|veo] image ...   # Show upload size per image
+"""
+
+import base64
+import io
+import json
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+from response_cache import ResponseCache, cache_key
+
+UPLOAD_PRESETS = {
+    "vision": {"size": (600, 450), "format": "JPEG", "quality": 85},
+    "ref": {"size": (1024, 1024), "format": "WEBP", "quality": 90},
+    "veo": {"size": (1280, 1280), "format": "JPEG", "quality": 90},
+}
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+# Encoded payloads by sha256(source bytes + preset)
+upload_cache = ResponseCache("uploads")
+
+# Raw bytes (not base64) of every image prepared this run
+upload_stats = {"images": 0, "cached": 0, "source_bytes": 0, "upload_bytes": 0}
+
+
+def upload_spec(preset):
+    """Stable string for a preset, for cache keys of responses to prepared images."""
+    return json.dumps(UPLOAD_PRESETS[preset], sort_keys=True)
+
+
+def encode_image(image_bytes, size, fmt, quality):
+    """Downscale (keeping aspect, never upscaling) and re-encode. Returns bytes."""
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.load()
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if fmt == "JPEG" or not has_alpha:
+            if has_alpha:
+                rgba = img.convert("RGBA")
+                img = Image.new("RGB", rgba.size, (0, 0, 0))
+                img.paste(rgba, mask=rgba.getchannel("A"))
+            else:
+                img = img.convert("RGB")
+        else:
+            img = img.convert("RGBA")
+        img.thumbnail(size, Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, fmt, quality=quality)
+        return out.getvalue()
+
+
+def prepare_image(image_path, preset="vision"):
+    """Encode one image for upload. Returns (mime_type, base64 string)."""
+    with open(image_path, "rb") as f:
+        source = f.read()
+    settings = UPLOAD_PRESETS[preset]
+    key = cache_key(source, upload_spec(preset))
+
+    upload_stats["images"] += 1
+    upload_stats["source_bytes"] += len(source)
+    cached = upload_cache.get(key)
+    if cached is not None:
+        upload_stats["cached"] += 1
+        upload_stats["upload_bytes"] += cached["bytes"]
+        return cached["mimeType"], cached["data"]
+
+    encoded = encode_image(source, settings["size"], settings["format"], settings["quality"])
+    mime_type = MIME_TYPES[settings["format"]]
+    if len(encoded) >= len(source):
+        # Already small (e.g. a tiny PNG icon): re-encoding would only lose quality
+        encoded = source
+        mime_type = MIME_TYPES.get(Image.open(io.BytesIO(source)).format, "image/png")
+
+    data = base64.b64encode(encoded).decode()
+    upload_stats["upload_bytes"] += len(encoded)
+    upload_cache.put(key, {"image": Path(image_path).name, "mimeType": mime_type,
+                           "bytes": len(encoded), "data": data})
+    return mime_type, data
+
+
+def inline_part(image_path, preset="vision"):
+    """generateContent inlineData part for an image."""
+    mime_type, data = prepare_image(image_path, preset)
+    return {"inlineData": {"mimeType": mime_type, "data": data}}
+
+
+def upload_report():
+    """One line on bytes saved by upload encoding this run."""
+    s = upload_stats
+    saved = s["source_bytes"] - s["upload_bytes"]
+    pct = saved / s["source_bytes"] * 100 if s["source_bytes"] else 0
+    return (f"Uploads: {s['images']} images ({s['cached']} cached encodes), "
+            f"{s['source_bytes'] / 1024 / 1024:.1f} MB -> {s['upload_bytes'] / 1024 / 1024:.1f} MB "
+            f"({saved / 1024 / 1024:.1f} MB, {pct:.0f}% saved)")
+
+
+def main():
+    print("=" * 60)
+    print("Stellar Gunners - Upload Image Encoder")
+    print("=" * 60)
+
+    args = sys.argv[1:]
+    preset = "vision"
+    if args and args[0] in UPLOAD_PRESETS:
+        preset = args.pop(0)
+    settings = UPLOAD_PRESETS[preset]
+    print(f"Preset: {preset} ({settings['size'][0]}x{settings['size'][1]} {settings['format']} q{settings['quality']})")
+
+    for path in args:
+        before = upload_stats["upload_bytes"]
+        mime_type, _ = prepare_image(path, preset)
+        size = upload_stats["upload_bytes"] - before
+        print(f"  {Path(path).name:<32} {Path(path).stat().st_size / 1024:8.0f} KB -> {size / 1024:6.0f} KB {mime_type}")
+    print(f"\n  {upload_report()}")
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    main()